@@ -0,0 +1,219 @@
+# Arquivamento das partições antigas da auditoria
+# Partições `auditoria_AAAAMM` mais antigas que a retenção (AUDITORIA_RETENCAO_MESES,
+# 12 por padrão) são exportadas para NDJSON compactado em disco
+# (<diretório>/auditoria_AAAAMM.ndjson.gz), conferidas pela contagem de linhas e só
+# então removidas com drop. Cada arquivo gerado fica registrado em
+# `auditoria_arquivos` com a quantidade de registros e o sha256.
+#
+# Roda no servidor em segundo plano (uma vez por dia, só no worker que detém o lease)
+# e também pela linha de comando. A opção --migrar-legado move os registros da
+# coleção `auditoria` de antes do particionamento para as partições mensais.
+#
+# Uso: python arquivar_auditoria.py [--retencao-meses 12] [--diretorio DIR] [--simular] [--migrar-legado]
+
+import argparse
+import asyncio
+import gzip
+import hashlib
+import logging
+import os
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import BulkWriteError
+
+from auditoria import ParticoesAuditoria, inicio_particao, nome_particao
+from migrar_datas import CAMPOS_DATA, normalizar_datas
+from resposta_rapida import serializar
+from varredura_certificados import LeaseLock
+
+logger = logging.getLogger(__name__)
+
+LOTE = 1000
+LOCK_ID = "arquivamento_auditoria"
+RETENCAO_PADRAO_MESES = 12
+
+
+def limite_retencao(agora: datetime, meses: int) -> datetime:
+    # Primeiro dia do mês mais antigo que ainda fica no banco. O mês corrente
+    # sempre fica: é onde o AuditoriaWriter está gravando.
+    meses = max(1, meses)
+    total = agora.year * 12 + agora.month - 1 - (meses - 1)
+    return datetime(total // 12, total % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+async def particoes_expiradas(particoes: ParticoesAuditoria, meses: int,
+                              agora: Optional[datetime] = None) -> List[str]:
+    limite = limite_retencao(agora or datetime.now(timezone.utc), meses)
+    return sorted(nome for nome in await particoes.existentes() if inicio_particao(nome) < limite)
+
+
+async def exportar(colecao, caminho: str) -> dict:
+    # Escreve em um .tmp e renomeia no final: um arquivo com o nome definitivo está sempre completo
+    temporario = caminho + ".tmp"
+    registros = 0
+    arquivo = await asyncio.to_thread(gzip.open, temporario, "wb")
+    try:
+        linhas: List[bytes] = []
+        async for doc in colecao.find({}, {"_id": 0}).sort([("data_hora", 1), ("id_auditoria", 1)]).batch_size(LOTE):
+            linhas.append(serializar(doc) + b"\n")
+            if len(linhas) >= LOTE:
+                await asyncio.to_thread(arquivo.write, b"".join(linhas))
+                registros += len(linhas)
+                linhas = []
+        if linhas:
+            await asyncio.to_thread(arquivo.write, b"".join(linhas))
+            registros += len(linhas)
+    finally:
+        await asyncio.to_thread(arquivo.close)
+    os.replace(temporario, caminho)
+    return {"registros": registros, "sha256": await asyncio.to_thread(_sha256, caminho)}
+
+
+def _sha256(caminho: str) -> str:
+    resumo = hashlib.sha256()
+    with open(caminho, "rb") as arquivo:
+        for bloco in iter(lambda: arquivo.read(1 << 20), b""):
+            resumo.update(bloco)
+    return resumo.hexdigest()
+
+
+async def arquivar_particao(db, particoes: ParticoesAuditoria, nome: str, diretorio: str) -> dict:
+    esperados = await db[nome].count_documents({})
+    caminho = os.path.join(diretorio, f"{nome}.ndjson.gz")
+    exportado = await exportar(db[nome], caminho)
+    if exportado["registros"] != esperados:
+        # Não removemos nada se o arquivo não bate com a partição
+        raise RuntimeError(f"{nome}: {exportado['registros']} registros exportados, {esperados} no banco")
+    registro = {
+        "_id": nome,
+        "particao": nome,
+        "arquivo": caminho,
+        "registros": esperados,
+        "sha256": exportado["sha256"],
+        "inicio": inicio_particao(nome),
+        "arquivado_em": datetime.now(timezone.utc),
+    }
+    await db.auditoria_arquivos.replace_one({"_id": nome}, registro, upsert=True)
+    await db[nome].drop()
+    particoes.esquecer(nome)
+    return registro
+
+
+async def arquivar(db, particoes: ParticoesAuditoria, diretorio: str,
+                   meses: int = RETENCAO_PADRAO_MESES, simular: bool = False) -> List[dict]:
+    os.makedirs(diretorio, exist_ok=True)
+    resultado = []
+    for nome in await particoes_expiradas(particoes, meses):
+        if simular:
+            resultado.append({"_id": nome, "registros": await db[nome].count_documents({})})
+        else:
+            resultado.append(await arquivar_particao(db, particoes, nome, diretorio))
+    return resultado
+
+
+async def migrar_legado(db, particoes: ParticoesAuditoria, lote: int = LOTE) -> int:
+    # Move a coleção `auditoria` (sem partição) para auditoria_AAAAMM, em lotes por _id.
+    # É retomável: id_auditoria é único nas partições e duplicados são ignorados.
+    movidos = 0
+    while True:
+        docs = await db.auditoria.find({}).sort("_id", 1).limit(lote).to_list(lote)
+        if not docs:
+            return movidos
+        grupos = {}
+        for doc in docs:
+            # O login antigo gravava data_hora com .isoformat(): convertemos antes de escolher
+            # a partição e gravamos a data nativa, que é o que as consultas por intervalo esperam
+            normalizar_datas(doc, CAMPOS_DATA["auditoria"])
+            if doc.get("data_hora") is None:
+                doc["data_hora"] = doc["_id"].generation_time
+            grupos.setdefault(nome_particao(doc["data_hora"]), []).append({k: v for k, v in doc.items() if k != "_id"})
+        for nome, grupo in grupos.items():
+            colecao = await particoes.para_escrita(nome)
+            try:
+                await colecao.insert_many(grupo, ordered=False)
+            except BulkWriteError as exc:
+                if any(e.get("code") != 11000 for e in exc.details.get("writeErrors", [])):
+                    raise
+        await db.auditoria.delete_many({"_id": {"$in": [d["_id"] for d in docs]}})
+        movidos += len(docs)
+
+
+class ArquivamentoAuditoria:
+    def __init__(self, db, particoes: ParticoesAuditoria, diretorio: str,
+                 meses: int = RETENCAO_PADRAO_MESES, intervalo: float = 86400.0):
+        self.db = db
+        self.particoes = particoes
+        self.diretorio = diretorio
+        self.meses = meses
+        self.intervalo = intervalo
+        # Exportar uma partição grande pode levar minutos; o lease cobre a execução inteira
+        self.lock = LeaseLock(db.locks, LOCK_ID, duracao=3600.0)
+        self._tarefa: Optional[asyncio.Task] = None
+        self.ultima_execucao: Optional[dict] = None
+
+    async def executar(self) -> Optional[dict]:
+        # Devolve None quando outro worker detém o lease
+        if not await self.lock.adquirir():
+            return None
+        try:
+            arquivadas = await arquivar(self.db, self.particoes, self.diretorio, self.meses)
+        finally:
+            await self.lock.liberar()
+        self.ultima_execucao = {
+            "arquivadas": [a["_id"] for a in arquivadas],
+            "registros": sum(a["registros"] for a in arquivadas),
+            "executado_em": datetime.now(timezone.utc),
+        }
+        return self.ultima_execucao
+
+    async def _loop(self):
+        while True:
+            try:
+                resultado = await self.executar()
+                if resultado and resultado["arquivadas"]:
+                    logger.info("Arquivamento da auditoria: %s", resultado)
+            except Exception:
+                logger.exception("Falha no arquivamento da auditoria")
+            await asyncio.sleep(self.intervalo)
+
+    def start(self):
+        if self._tarefa is None and self.intervalo > 0:
+            self._tarefa = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._tarefa is not None:
+            self._tarefa.cancel()
+            try:
+                await self._tarefa
+            except asyncio.CancelledError:
+                pass
+            self._tarefa = None
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--retencao-meses', type=int,
+                        default=int(os.environ.get('AUDITORIA_RETENCAO_MESES', str(RETENCAO_PADRAO_MESES))))
+    parser.add_argument('--diretorio', default=os.environ.get('AUDITORIA_ARQUIVO_DIR', 'arquivo_auditoria'))
+    parser.add_argument('--simular', action='store_true', help='apenas lista as partições a arquivar')
+    parser.add_argument('--migrar-legado', action='store_true',
+                        help='move a coleção auditoria antiga para as partições mensais antes de arquivar')
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient(os.environ.get('MONGO_URL', 'mongodb://localhost:27017/'))
+    db = client[os.environ.get('DB_NAME', 'techsolutions_treinamentos')]
+    particoes = ParticoesAuditoria(db)
+    try:
+        if args.migrar_legado and not args.simular:
+            print(f'{await migrar_legado(db, particoes)} registros movidos da coleção auditoria')
+        for item in await arquivar(db, particoes, args.diretorio, args.retencao_meses, args.simular):
+            destino = "a arquivar" if args.simular else f'-> {item["arquivo"]}'
+            print(f'{item["_id"]:<18} {item["registros"]:>9} registros {destino}')
+    finally:
+        client.close()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
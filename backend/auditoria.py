@@ -0,0 +1,385 @@
+# Gravação assíncrona e em lote do log de auditoria
+# Os handlers chamam registrar(), que só coloca o registro em uma fila em memória
+# (O(1), sem I/O). Uma tarefa em segundo plano grava a fila com insert_many a cada
+# `intervalo` segundos ou assim que `lote` registros se acumulam. No encerramento
+# a fila é gravada por completo. Assim a latência das rotas não depende do tempo
+# de escrita da auditoria.
+#
+# A fila é limitada (max_fila): se o banco ficar indisponível por muito tempo, os
+# registros excedentes são descartados e contados em stats()["descartados"] em vez
+# de consumir memória sem limite.
+#
+# Um registro que o banco recusa por si só (validação, documento grande demais) não
+# pode travar a fila: depois de MAX_TENTATIVAS recusas ele sai da fila, vai para o
+# log e para a coleção `auditoria_rejeitados`, e os registros atrás dele seguem.
+#
+# Armazenamento particionado por mês: cada registro vai para `auditoria_AAAAMM`
+# (pelo data_hora). Inserções só tocam os índices da partição do mês corrente,
+# consultas por período abrem apenas as partições do intervalo e o arquivamento
+# de meses antigos é um drop da coleção inteira (ver arquivar_auditoria.py), sem
+# delete_many varrendo o índice.
+
+import asyncio
+import logging
+import re
+from collections import deque
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+from bson.errors import InvalidDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from indexes import IndexSpec, reconcile
+from resposta_rapida import serializar
+from ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Campos que nunca vão para o log
+CAMPOS_OCULTOS = {"_id", "senha_hash", "senha"}
+
+# Recusas do próprio registro antes de tirá-lo da fila (falhas de conexão não contam)
+MAX_TENTATIVAS = 3
+COLECAO_REJEITADOS = "auditoria_rejeitados"
+
+
+PREFIXO_PARTICAO = "auditoria_"
+_NOME_PARTICAO = re.compile(r"^auditoria_(\d{4})(\d{2})$")
+
+# Todas as consultas ordenam por (data_hora, id_auditoria) decrescentes; cada filtro
+# indexado tem esse par como sufixo para paginar sem ordenação em memória
+INDICES_PARTICAO: List[IndexSpec] = [
+    IndexSpec("uniq_id_auditoria", (("id_auditoria", 1),), unique=True),
+    IndexSpec("idx_data", (("data_hora", -1), ("id_auditoria", -1))),
+    IndexSpec("idx_colaborador_data", (("id_colaborador_acao", 1), ("data_hora", -1), ("id_auditoria", -1))),
+    IndexSpec("idx_tabela_data", (("nome_tabela", 1), ("data_hora", -1), ("id_auditoria", -1))),
+    IndexSpec("idx_acao_data", (("acao", 1), ("data_hora", -1), ("id_auditoria", -1))),
+]
+
+
+def _utc(data: datetime) -> datetime:
+    return data.replace(tzinfo=timezone.utc) if data.tzinfo is None else data.astimezone(timezone.utc)
+
+
+def nome_particao(data: datetime) -> str:
+    return f"{PREFIXO_PARTICAO}{_utc(data):%Y%m}"
+
+
+def inicio_particao(nome: str) -> Optional[datetime]:
+    # Primeiro instante do mês da partição; None se o nome não for de partição
+    encontrado = _NOME_PARTICAO.match(nome)
+    if encontrado is None:
+        return None
+    return datetime(int(encontrado.group(1)), int(encontrado.group(2)), 1, tzinfo=timezone.utc)
+
+
+def fim_particao(nome: str) -> datetime:
+    inicio = inicio_particao(nome)
+    if inicio.month == 12:
+        return inicio.replace(year=inicio.year + 1, month=1)
+    return inicio.replace(month=inicio.month + 1)
+
+
+def codificar_cursor(doc: dict) -> str:
+    # "<data_hora em ms desde a época>:<id_auditoria>" do último registro da página
+    return f"{int(_utc(doc['data_hora']).timestamp() * 1000)}:{doc['id_auditoria']}"
+
+
+def decodificar_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        ms, id_auditoria = cursor.split(":", 1)
+        return datetime.fromtimestamp(int(ms) / 1000, tz=timezone.utc), int(id_auditoria)
+    except (ValueError, OverflowError, OSError):
+        raise ValueError(f"Cursor inválido: {cursor}")
+
+
+class ParticoesAuditoria:
+    def __init__(self, db, ttl_lista: float = 60.0):
+        self.db = db
+        self._prontas: Set[str] = set()
+        self._criando = asyncio.Lock()
+        # A lista de partições muda uma vez por mês; relemos no máximo a cada ttl_lista segundos
+        self._lista = TTLCache(ttl=ttl_lista, maxsize=1)
+
+    async def para_escrita(self, nome: str):
+        # Na primeira escrita de cada partição garantimos os índices antes do insert
+        if nome not in self._prontas:
+            async with self._criando:
+                if nome not in self._prontas:
+                    await reconcile(self.db, {nome: INDICES_PARTICAO})
+                    self._prontas.add(nome)
+                    self._lista.invalidate()
+        return self.db[nome]
+
+    async def existentes(self) -> List[str]:
+        # Nomes das partições, da mais recente para a mais antiga
+        async def listar() -> List[str]:
+            nomes = await self.db.list_collection_names(filter={"name": {"$regex": _NOME_PARTICAO.pattern}})
+            return sorted(nomes, reverse=True)
+        return await self._lista.get_or_compute("particoes", listar)
+
+    def esquecer(self, nome: str):
+        # Chamado depois do drop de uma partição arquivada
+        self._prontas.discard(nome)
+        self._lista.invalidate()
+
+    async def consultar(self, filtro: dict, projecao: dict, desde: Optional[datetime] = None,
+                        ate: Optional[datetime] = None, after: Optional[str] = None,
+                        limit: int = 100) -> Tuple[List[dict], Optional[str]]:
+        # Página ordenada por (data_hora, id_auditoria) decrescentes e o cursor da próxima,
+        # percorrendo só as partições que intersectam o período pedido
+        desde = _utc(desde) if desde is not None else None
+        ate = _utc(ate) if ate is not None else None
+        periodo = {}
+        if desde is not None:
+            periodo["$gte"] = desde
+        if ate is not None:
+            periodo["$lte"] = ate
+        consulta = {**filtro, "data_hora": periodo} if periodo else dict(filtro)
+        teto = ate
+        if after is not None:
+            data_cursor, id_cursor = decodificar_cursor(after)
+            consulta["$or"] = [
+                {"data_hora": {"$lt": data_cursor}},
+                {"data_hora": data_cursor, "id_auditoria": {"$lt": id_cursor}},
+            ]
+            teto = data_cursor if teto is None else min(teto, data_cursor)
+
+        docs: List[dict] = []
+        for nome in await self.existentes():
+            if teto is not None and inicio_particao(nome) > teto:
+                continue
+            if desde is not None and fim_particao(nome) <= desde:
+                break  # as demais são ainda mais antigas
+            faltam = limit + 1 - len(docs)
+            docs += await self.db[nome].find(consulta, projecao).sort(
+                [("data_hora", -1), ("id_auditoria", -1)]).limit(faltam).to_list(faltam)
+            if len(docs) > limit:
+                break
+        if len(docs) > limit:
+            docs = docs[:limit]
+            return docs, codificar_cursor(docs[-1])
+        return docs, None
+
+
+def _limpar(doc: Optional[dict]) -> Optional[dict]:
+    if doc is None:
+        return None
+    return {k: v for k, v in doc.items() if k not in CAMPOS_OCULTOS}
+
+
+def diferenca(antes: Optional[dict], depois: Optional[dict]) -> Tuple[Optional[dict], Optional[dict]]:
+    # Em atualizações guardamos só os campos que mudaram; em criação/exclusão, o documento inteiro
+    antes, depois = _limpar(antes), _limpar(depois)
+    if antes is None or depois is None:
+        return antes, depois
+    alterados = [k for k in antes.keys() | depois.keys() if antes.get(k) != depois.get(k)]
+    return {k: antes.get(k) for k in alterados}, {k: depois.get(k) for k in alterados}
+
+
+def _texto(dados: Optional[dict]) -> Optional[str]:
+    # dados_antigos/dados_novos são texto JSON no modelo Auditoria
+    return serializar(dados, ordenar=True).decode("utf-8") if dados is not None else None
+
+
+class AuditoriaWriter:
+    def __init__(self, particoes: ParticoesAuditoria, alocar_ids: Callable[[int], Awaitable[List[int]]],
+                 intervalo: float = 0.2, lote: int = 500, max_fila: int = 10000):
+        self.particoes = particoes
+        self.alocar_ids = alocar_ids
+        self.intervalo = intervalo
+        self.lote = lote
+        self.max_fila = max_fila
+        self._fila: Deque[dict] = deque()
+        self._cheio: Optional[asyncio.Event] = None
+        self._tarefa: Optional[asyncio.Task] = None
+        self._gravando = asyncio.Lock()
+        # Recusas por registro ainda na fila, pelo id() do dict
+        self._tentativas: Dict[int, int] = {}
+        self.gravados = 0
+        self.descartados = 0
+        self.rejeitados = 0
+        self.erros = 0
+        self.ultimo_lote_ms = 0.0
+
+    def registrar(self, id_colaborador_acao: int, acao: str, nome_tabela: str,
+                  id_registro_afetado: Optional[int] = None, antes: Optional[dict] = None,
+                  depois: Optional[dict] = None, ip_origem: Optional[str] = None) -> bool:
+        if len(self._fila) >= self.max_fila:
+            self.descartados += 1
+            if self.descartados % 1000 == 1:
+                logger.error("Fila de auditoria cheia; %d registros descartados até agora", self.descartados)
+            return False
+        antigos, novos = diferenca(antes, depois)
+        self._fila.append({
+            "id_colaborador_acao": id_colaborador_acao,
+            "acao": getattr(acao, "value", acao),
+            "nome_tabela": nome_tabela,
+            "id_registro_afetado": id_registro_afetado,
+            "ip_origem": ip_origem,
+            "dados_antigos": _texto(antigos),
+            "dados_novos": _texto(novos),
+            "data_hora": datetime.now(timezone.utc),
+        })
+        if len(self._fila) >= self.lote and self._cheio is not None:
+            self._cheio.set()
+        return True
+
+    @property
+    def pendentes(self) -> int:
+        return len(self._fila)
+
+    def stats(self) -> dict:
+        return {
+            "pendentes": self.pendentes,
+            "gravados": self.gravados,
+            "descartados": self.descartados,
+            "rejeitados": self.rejeitados,
+            "erros": self.erros,
+            "ultimo_lote_ms": self.ultimo_lote_ms,
+        }
+
+    async def _inserir_um_a_um(self, colecao, grupo: List[dict], gravados: Set[int], recusados: List[dict]):
+        # O driver recusou o lote inteiro sem dizer qual documento: gravamos um a um para isolá-lo
+        for registro in grupo:
+            if id(registro) in gravados:
+                continue
+            try:
+                await colecao.insert_one(registro)
+            except DuplicateKeyError:
+                pass
+            except InvalidDocument:
+                recusados.append(registro)
+                continue
+            gravados.add(id(registro))
+
+    async def _rejeitar(self, registro: dict, erro: BaseException):
+        # Registro recusado MAX_TENTATIVAS vezes: sai da fila. Guardamos um resumo (o
+        # documento original pode ser justamente o que o banco não aceita).
+        self.rejeitados += 1
+        resumo = repr(registro)[:10000]
+        logger.error("Registro de auditoria recusado %d vezes, removido da fila: %s (%s)",
+                     MAX_TENTATIVAS, resumo, erro)
+        try:
+            await self.particoes.db[COLECAO_REJEITADOS].insert_one({
+                "id_auditoria": registro.get("id_auditoria"),
+                "nome_tabela": registro.get("nome_tabela"),
+                "acao": registro.get("acao"),
+                "id_registro_afetado": registro.get("id_registro_afetado"),
+                "data_hora": registro.get("data_hora"),
+                "erro": str(erro)[:1000],
+                "registro": resumo,
+                "rejeitado_em": datetime.now(timezone.utc),
+            })
+        except Exception:
+            logger.exception("Falha ao gravar o registro de auditoria rejeitado")
+
+    async def _contar_recusas(self, recusados: List[dict], erro: BaseException) -> List[dict]:
+        # Soma uma recusa a cada registro e devolve os que ainda voltam para a fila;
+        # quem chega a MAX_TENTATIVAS é rejeitado
+        voltam = []
+        for registro in recusados:
+            tentativas = self._tentativas.get(id(registro), 0) + 1
+            if tentativas >= MAX_TENTATIVAS:
+                self._tentativas.pop(id(registro), None)
+                await self._rejeitar(registro, erro)
+            else:
+                self._tentativas[id(registro)] = tentativas
+                voltam.append(registro)
+        return voltam
+
+    def _devolver(self, registros: List[dict]):
+        for registro in reversed(registros):
+            registro.pop("_id", None)
+            self._fila.appendleft(registro)
+
+    async def descarregar(self) -> int:
+        # Grava tudo o que estava na fila, em blocos de `lote`, com um insert_many por partição
+        total = 0
+        async with self._gravando:
+            while self._fila:
+                bloco = [self._fila.popleft() for _ in range(min(self.lote, len(self._fila)))]
+                inicio = asyncio.get_running_loop().time()
+                grupos: Dict[str, List[dict]] = {}
+                for registro in bloco:
+                    grupos.setdefault(nome_particao(registro["data_hora"]), []).append(registro)
+                gravados: Set[int] = set()
+                # Registros recusados pelo próprio conteúdo, e não por falha de conexão
+                recusados: List[dict] = []
+                erro: Optional[BaseException] = None
+                try:
+                    ids = await self.alocar_ids(len(bloco))
+                    for registro, id_auditoria in zip(bloco, ids):
+                        registro.setdefault("id_auditoria", id_auditoria)
+                    for nome, grupo in grupos.items():
+                        colecao = await self.particoes.para_escrita(nome)
+                        try:
+                            await colecao.insert_many(grupo, ordered=False)
+                        except BulkWriteError as exc:
+                            # Chave duplicada em id_auditoria significa que o registro já
+                            # entrou em uma tentativa anterior
+                            falhas = {e["index"] for e in exc.details.get("writeErrors", []) if e.get("code") != 11000}
+                            gravados.update(id(r) for i, r in enumerate(grupo) if i not in falhas)
+                            recusados.extend(grupo[i] for i in sorted(falhas))
+                            erro = exc
+                        except InvalidDocument as exc:
+                            await self._inserir_um_a_um(colecao, grupo, gravados, recusados)
+                            erro = exc
+                        else:
+                            gravados.update(id(r) for r in grupo)
+                except BaseException:
+                    # Falha de conexão ou cancelamento (encerramento no meio do insert_many):
+                    # tudo o que não foi gravado volta ao início da fila, sem contar recusa
+                    self.erros += 1
+                    pendentes = [r for r in bloco if id(r) not in gravados]
+                    self.gravados += len(bloco) - len(pendentes)
+                    self._devolver(pendentes)
+                    raise
+                voltam: List[dict] = []
+                if recusados:
+                    self.erros += 1
+                    voltam = await self._contar_recusas(recusados, erro)
+                    self._devolver(voltam)
+                for registro in bloco:
+                    if id(registro) in gravados:
+                        self._tentativas.pop(id(registro), None)
+                        total += 1
+                        self.gravados += 1
+                self.ultimo_lote_ms = round((asyncio.get_running_loop().time() - inicio) * 1000, 1)
+                if voltam:
+                    # Nova tentativa dos recusados só no próximo ciclo, depois da espera de erro
+                    raise erro
+        return total
+
+    async def _executar(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._cheio.wait(), timeout=self.intervalo)
+            except asyncio.TimeoutError:
+                pass
+            self._cheio.clear()
+            try:
+                await self.descarregar()
+            except Exception:
+                logger.exception("Falha ao gravar auditoria; nova tentativa no próximo ciclo")
+                await asyncio.sleep(self.intervalo * 10)
+
+    def start(self):
+        if self._tarefa is None:
+            self._cheio = asyncio.Event()
+            self._tarefa = asyncio.create_task(self._executar())
+
+    async def stop(self):
+        if self._tarefa is not None:
+            self._tarefa.cancel()
+            try:
+                await self._tarefa
+            except asyncio.CancelledError:
+                pass
+            self._tarefa = None
+        # Última gravação para não perder registros enfileirados
+        try:
+            await self.descarregar()
+        except Exception:
+            logger.exception("Falha ao gravar a auditoria pendente no encerramento; %d registros perdidos",
+                             self.pendentes)
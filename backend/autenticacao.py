@@ -0,0 +1,83 @@
+# Cache de autenticação: tokens decodificados e contexto do usuário (principal)
+# O verify_token fazia jwt.decode (HMAC + JSON + validação das claims) em toda
+# requisição, e saber quem é o usuário (colaborador, perfil, permissões) custava
+# mais duas consultas ao MongoDB em cada handler que precisasse disso.
+#
+# CacheTokens guarda o payload já validado de cada token em um LRU; a entrada vale
+# até o `exp` do próprio token, então um token expirado nunca sai do cache.
+#
+# CarregadorPrincipal monta o principal a partir de `colaboradores` e `perfis` e o
+# guarda por alguns segundos (TTLCache com single-flight). Inativar um colaborador
+# ou trocar seu perfil incrementa a versão "acesso" em `versoes_cache` (o mesmo
+# mecanismo do cache_referencia.py): o worker que fez a alteração descarta o cache
+# na hora e os demais em no máximo `intervalo` segundos.
+
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+from cache_referencia import VersoesColecoes
+from ttl_cache import TTLCache
+
+VERSAO_ACESSO = "acesso"
+
+PROJECAO_PRINCIPAL = {"_id": 0, "id_colaborador": 1, "nome": 1, "email": 1, "id_perfil": 1,
+                      "id_cargo": 1, "id_area": 1, "ativo": 1}
+
+
+class CacheTokens:
+    def __init__(self, decodificar: Callable[[str], dict], maxsize: int = 10000):
+        # decodificar(token) valida assinatura e claims e levanta exceção se inválido
+        self._decodificar = decodificar
+        self.maxsize = maxsize
+        self._dados: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def decodificar(self, token: str) -> dict:
+        item = self._dados.get(token)
+        if item is not None:
+            if item[0] > time.time():
+                self._dados.move_to_end(token)
+                self.hits += 1
+                return dict(item[1])
+            del self._dados[token]
+        self.misses += 1
+        payload = self._decodificar(token)
+        # Sem exp não sabemos até quando o token vale: não guardamos
+        if isinstance(payload.get("exp"), (int, float)):
+            self._dados[token] = (float(payload["exp"]), payload)
+            if len(self._dados) > self.maxsize:
+                self._dados.popitem(last=False)
+        return dict(payload)
+
+    def stats(self) -> dict:
+        return {"tamanho": len(self._dados), "hits": self.hits, "misses": self.misses}
+
+
+class CarregadorPrincipal:
+    def __init__(self, db, versoes: VersoesColecoes, ttl: float = 30.0, maxsize: int = 10000):
+        self.db = db
+        self.versoes = versoes
+        self.cache = TTLCache(ttl=ttl, maxsize=maxsize)
+
+    async def _carregar(self, id_colaborador: int) -> Optional[dict]:
+        colab = await self.db.colaboradores.find_one({"id_colaborador": id_colaborador}, PROJECAO_PRINCIPAL)
+        if colab is None:
+            return None
+        perfil = None
+        if colab.get("id_perfil") is not None:
+            perfil = await self.db.perfis.find_one({"id_perfil": colab["id_perfil"]}, {"_id": 0})
+        return {**colab, "perfil": perfil, "permissoes": (perfil or {}).get("permissoes", [])}
+
+    async def obter(self, id_colaborador: int) -> Optional[dict]:
+        # None quando o colaborador não existe (também fica em cache pelo TTL)
+        versao = await self.versoes.atuais([VERSAO_ACESSO])
+        return await self.cache.get_or_compute((id_colaborador, versao), lambda: self._carregar(id_colaborador))
+
+    async def invalidar(self):
+        # Todas as entradas passam a ter versão antiga, em todos os workers
+        await self.versoes.incrementar(VERSAO_ACESSO)
+
+    def stats(self) -> Dict[str, object]:
+        return {**self.cache.stats(), "versao": self.versoes.conhecidas().get(VERSAO_ACESSO, 0)}
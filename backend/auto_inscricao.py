@@ -0,0 +1,206 @@
+# Inscrição automática a partir das regras_obrigatorias
+# Quando uma regra é criada ou um colaborador é cadastrado/muda de cargo ou área,
+# comparamos "cursos exigidos pelas regras" com "inscrições existentes" para a
+# população afetada e inscrevemos os que faltam com tipo_inscricao=automatica.
+#
+# A diferença é calculada por uma única agregação em `colaboradores` com $lookup em
+# `inscricoes` (índice idx_colaborador_status), sem consultas por colaborador. As
+# tarefas rodam em segundo plano, uma de cada vez, e o progresso fica gravado em
+# `tarefas_auto_inscricao` para ser consultado por qualquer worker.
+
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+from conformidade import ConformidadeEngine
+
+logger = logging.getLogger(__name__)
+
+LOTE_INSCRICAO = 1000
+# Colaboradores por tarefa em solicitar_colaboradores (o escopo fica gravado na tarefa)
+LOTE_TAREFA = 5000
+
+# Inscrições que já atendem à regra; vencidas e canceladas geram nova inscrição
+STATUS_COBERTOS = ["pendente", "em_andamento", "concluido"]
+
+# (id_curso, ids_colaborador) -> resultados de inscrever_em_lote
+Inscrever = Callable[[int, List[int]], Awaitable[List[dict]]]
+
+
+def _filtro_populacao(regra: dict) -> dict:
+    filtro = {"ativo": {"$ne": False}}
+    if regra.get("id_cargo") is not None:
+        filtro["id_cargo"] = regra["id_cargo"]
+    if regra.get("id_area") is not None:
+        filtro["id_area"] = regra["id_area"]
+    return filtro
+
+
+def pipeline_faltantes(filtro: dict, ids_curso: List[int]) -> List[dict]:
+    # Para cada colaborador da população, os cursos exigidos sem inscrição que os cubra
+    return [
+        {"$match": filtro},
+        {"$project": {"_id": 0, "id_colaborador": 1}},
+        {"$lookup": {
+            "from": "inscricoes",
+            "localField": "id_colaborador",
+            "foreignField": "id_colaborador",
+            "pipeline": [
+                {"$match": {"id_curso": {"$in": ids_curso}, "status": {"$in": STATUS_COBERTOS}}},
+                {"$project": {"_id": 0, "id_curso": 1}},
+            ],
+            "as": "inscricoes",
+        }},
+        {"$project": {"id_colaborador": 1, "faltantes": {"$setDifference": [ids_curso, "$inscricoes.id_curso"]}}},
+    ]
+
+
+class AutoInscricao:
+    def __init__(self, engine: ConformidadeEngine, inscrever: Inscrever):
+        self.engine = engine
+        self.db = engine.db
+        self.inscrever = inscrever
+        self._fila: Optional[asyncio.Queue] = None
+        self._tarefa: Optional[asyncio.Task] = None
+
+    # ---------- solicitação (chamada pelos handlers) ----------
+
+    async def _nova_tarefa(self, escopo: dict) -> dict:
+        tarefa = {
+            "id_tarefa": uuid.uuid4().hex,
+            "escopo": escopo,
+            "status": "pendente",
+            "colaboradores_total": 0,
+            "colaboradores_avaliados": 0,
+            "inscricoes_criadas": 0,
+            "falhas": 0,
+            "criada_em": datetime.now(timezone.utc),
+            "iniciada_em": None,
+            "concluida_em": None,
+            "erro": None,
+        }
+        await self._salvar(tarefa)
+        if self._fila is None:
+            self._fila = asyncio.Queue()
+        self._fila.put_nowait(tarefa)
+        return tarefa
+
+    async def solicitar_regra(self, id_regra: int) -> dict:
+        return await self._nova_tarefa({"id_regra": id_regra})
+
+    async def solicitar_colaborador(self, id_colaborador: int) -> dict:
+        return await self._nova_tarefa({"id_colaborador": id_colaborador})
+
+    async def solicitar_colaboradores(self, ids_colaborador: List[int]) -> List[dict]:
+        # Para cadastros em massa (importação): só os colaboradores novos, em tarefas de até LOTE_TAREFA
+        return [await self._nova_tarefa({"ids_colaborador": ids_colaborador[inicio:inicio + LOTE_TAREFA]})
+                for inicio in range(0, len(ids_colaborador), LOTE_TAREFA)]
+
+    async def solicitar_todas(self) -> dict:
+        return await self._nova_tarefa({})
+
+    async def consultar(self, id_tarefa: str) -> Optional[dict]:
+        return await self.db.tarefas_auto_inscricao.find_one({"id_tarefa": id_tarefa}, {"_id": 0})
+
+    async def recentes(self, limite: int = 50) -> List[dict]:
+        return await self.db.tarefas_auto_inscricao.find({}, {"_id": 0}).sort(
+            "criada_em", -1).limit(limite).to_list(limite)
+
+    # ---------- execução ----------
+
+    async def _salvar(self, tarefa: dict):
+        await self.db.tarefas_auto_inscricao.replace_one({"id_tarefa": tarefa["id_tarefa"]}, tarefa, upsert=True)
+
+    async def _grupos(self, escopo: dict) -> List[dict]:
+        # Cada grupo é uma população (filtro em colaboradores) e os cursos que ela deve ter
+        ctx = await self.engine.carregar_contexto()
+        if "id_colaborador" in escopo:
+            colab = await self.db.colaboradores.find_one(
+                {"id_colaborador": escopo["id_colaborador"], "ativo": {"$ne": False}},
+                {"_id": 0, "id_cargo": 1, "id_area": 1})
+            if colab is None:
+                return []
+            regras = self.engine.regras_aplicaveis(ctx["por_chave"], colab.get("id_cargo"), colab.get("id_area"))
+            return [{"filtro": {"id_colaborador": escopo["id_colaborador"], "ativo": {"$ne": False}},
+                     "cursos": self.engine.cursos_das_regras(regras, ctx["trilha_cursos"])}]
+        if "id_regra" in escopo:
+            regra = ctx["regras"].get(escopo["id_regra"])
+            regras = [regra] if regra is not None else []
+        else:
+            regras = list(ctx["regras"].values())
+        grupos = [{"filtro": _filtro_populacao(regra),
+                   "cursos": self.engine.cursos_das_regras([regra], ctx["trilha_cursos"])}
+                  for regra in regras]
+        if "ids_colaborador" in escopo:
+            # Todas as regras, restritas aos colaboradores do escopo (índice uniq_id_colaborador)
+            for grupo in grupos:
+                grupo["filtro"]["id_colaborador"] = {"$in": escopo["ids_colaborador"]}
+        return grupos
+
+    async def _descarregar(self, tarefa: dict, id_curso: int, ids: List[int]):
+        resultados = await self.inscrever(id_curso, ids)
+        for resultado in resultados:
+            if resultado["resultado"] == "inscrito":
+                tarefa["inscricoes_criadas"] += 1
+            elif resultado["resultado"] == "erro":
+                tarefa["falhas"] += 1
+
+    async def _processar_grupo(self, tarefa: dict, filtro: dict, ids_curso: Set[int]):
+        pendentes: Dict[int, List[int]] = {}
+        cursor = self.db.colaboradores.aggregate(pipeline_faltantes(filtro, sorted(ids_curso)), batchSize=LOTE_INSCRICAO)
+        async for doc in cursor:
+            tarefa["colaboradores_avaliados"] += 1
+            if tarefa["colaboradores_avaliados"] % LOTE_INSCRICAO == 0:
+                await self._salvar(tarefa)
+            for id_curso in doc["faltantes"]:
+                ids = pendentes.setdefault(id_curso, [])
+                ids.append(doc["id_colaborador"])
+                if len(ids) >= LOTE_INSCRICAO:
+                    await self._descarregar(tarefa, id_curso, pendentes.pop(id_curso))
+        for id_curso, ids in pendentes.items():
+            await self._descarregar(tarefa, id_curso, ids)
+
+    async def executar(self, tarefa: dict) -> dict:
+        tarefa.update(status="executando", iniciada_em=datetime.now(timezone.utc))
+        try:
+            grupos = [g for g in await self._grupos(tarefa["escopo"]) if g["cursos"]]
+            for grupo in grupos:
+                tarefa["colaboradores_total"] += await self.db.colaboradores.count_documents(grupo["filtro"])
+            await self._salvar(tarefa)
+            for grupo in grupos:
+                await self._processar_grupo(tarefa, grupo["filtro"], grupo["cursos"])
+            tarefa["status"] = "concluida"
+        except Exception as exc:
+            logger.exception("Falha na inscrição automática %s", tarefa["escopo"])
+            tarefa.update(status="erro", erro=str(exc))
+        tarefa["concluida_em"] = datetime.now(timezone.utc)
+        await self._salvar(tarefa)
+        return tarefa
+
+    async def _executar(self):
+        while True:
+            tarefa = await self._fila.get()
+            try:
+                await self.executar(tarefa)
+            except Exception:
+                # Falha ao gravar o progresso não deve derrubar o laço
+                logger.exception("Falha ao registrar a tarefa de inscrição automática")
+            finally:
+                self._fila.task_done()
+
+    def start(self):
+        if self._tarefa is None:
+            if self._fila is None:
+                self._fila = asyncio.Queue()
+            self._tarefa = asyncio.create_task(self._executar())
+
+    async def stop(self):
+        if self._tarefa is not None:
+            self._tarefa.cancel()
+            try:
+                await self._tarefa
+            except asyncio.CancelledError:
+                pass
+            self._tarefa = None
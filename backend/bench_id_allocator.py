@@ -0,0 +1,78 @@
+# Benchmark: inserções por segundo com get_next_id por documento (um
+# find_one_and_update em db.counters a cada insert) vs. IdAllocator em blocos.
+# Uso: python bench_id_allocator.py [--total 5000] [--concorrencia 50] [--bloco 500]
+# Roda em um banco separado (BENCH_DB_NAME) que é apagado ao final.
+
+import argparse
+import asyncio
+import os
+import time
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument
+
+from id_allocator import IdAllocator
+
+MONGO = os.environ.get('MONGO_URL', 'mongodb://localhost:27017/')
+DBNAME = os.environ.get('BENCH_DB_NAME', 'techsolutions_bench')
+
+
+async def next_id_por_documento(db, nome):
+    # Mesma lógica do get_next_id original
+    counter = await db.counters.find_one_and_update(
+        {"_id": nome},
+        {"$inc": {"seq": 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return counter["seq"]
+
+
+async def rodar(db, nome, gerar_id, total, concorrencia):
+    await db[nome].drop()
+    fila = iter(range(total))
+
+    async def worker():
+        for _ in fila:
+            novo_id = await gerar_id(nome)
+            await db[nome].insert_one({"id_curso": novo_id, "titulo": f"Curso {novo_id}"})
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concorrencia)))
+    duracao = time.perf_counter() - inicio
+
+    # Conferimos que nenhum ID foi repetido
+    distintos = len(await db[nome].distinct("id_curso"))
+    assert distintos == total, f"IDs duplicados: {total - distintos}"
+    return total / duracao
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--total', type=int, default=5000)
+    parser.add_argument('--concorrencia', type=int, default=50)
+    parser.add_argument('--bloco', type=int, default=500)
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient(MONGO)
+    db = client[DBNAME]
+    try:
+        await db.counters.drop()
+        antigo = await rodar(
+            db, 'bench_por_documento', lambda nome: next_id_por_documento(db, nome),
+            args.total, args.concorrencia
+        )
+        allocator = IdAllocator(db.counters, block_size=args.bloco)
+        novo = await rodar(db, 'bench_em_bloco', allocator.next_id, args.total, args.concorrencia)
+
+        print(f'inserções: {args.total}  concorrência: {args.concorrencia}  bloco: {args.bloco}')
+        print(f'get_next_id por documento: {antigo:10.1f} inserções/s')
+        print(f'IdAllocator em blocos:     {novo:10.1f} inserções/s')
+        print(f'ganho: {novo / antigo:.2f}x')
+    finally:
+        await client.drop_database(DBNAME)
+        client.close()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,118 @@
+# Benchmark: planos de execução antes e depois de indexes.reconcile()
+# Popula um banco separado com dados sintéticos, roda explain() nas consultas
+# usadas pelo server.py sem índices (COLLSCAN) e depois de reconciliar o registro
+# (IXSCAN), comparando estágio, documentos examinados e tempo de execução.
+# Uso: python bench_indexes.py [--colaboradores 20000]
+
+import argparse
+import asyncio
+import os
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+import indexes
+
+MONGO = os.environ.get('MONGO_URL', 'mongodb://localhost:27017/')
+DBNAME = os.environ.get('BENCH_DB_NAME', 'techsolutions_bench')
+
+# (coleção, filtro) para cada caminho de consulta do server.py
+CONSULTAS = [
+    ("colaboradores", {"email": "colab500@example.com"}),
+    ("colaboradores", {"id_colaborador": 500}),
+    ("colaboradores", {"id_cargo": 3, "id_area": 2}),
+    ("cursos", {"id_curso": 50}),
+    ("inscricoes", {"id_inscricao": 1234}),
+    ("inscricoes", {"id_colaborador": 500, "status": "pendente"}),
+    ("inscricoes", {"id_curso": 50, "status": "concluido"}),
+    ("curso_trilha", {"id_curso": 50}),
+    ("certificados", {"id_inscricao": 1234}),
+    ("regras_obrigatorias", {"id_cargo": 3}),
+]
+
+
+def estagios(plano):
+    # Percorre o winningPlan coletando os estágios (COLLSCAN, IXSCAN, FETCH...)
+    encontrados = []
+    pilha = [plano]
+    while pilha:
+        no = pilha.pop()
+        if "stage" in no:
+            encontrados.append(no["stage"])
+        if "inputStage" in no:
+            pilha.append(no["inputStage"])
+        pilha.extend(no.get("inputStages", []))
+    return encontrados
+
+
+async def popular(db, total):
+    await db.client.drop_database(DBNAME)
+    status = ["pendente", "em_andamento", "concluido"]
+    await db.colaboradores.insert_many([
+        {"id_colaborador": i, "email": f"colab{i}@example.com", "nome": f"Colab {i}",
+         "id_cargo": i % 10, "id_area": i % 7, "id_perfil": 2, "ativo": True}
+        for i in range(1, total + 1)
+    ])
+    await db.cursos.insert_many([
+        {"id_curso": i, "titulo": f"Curso {i}", "slug": f"curso-{i}", "modalidade": "presencial"}
+        for i in range(1, 201)
+    ])
+    await db.inscricoes.insert_many([
+        {"id_inscricao": i, "id_colaborador": i % total + 1, "id_curso": i % 200 + 1, "status": status[i % 3]}
+        for i in range(1, total * 3 + 1)
+    ])
+    await db.curso_trilha.insert_many([
+        {"id_curso_trilha": i, "id_curso": i % 200 + 1, "id_trilha": i % 20 + 1, "ordem": i % 10}
+        for i in range(1, 1001)
+    ])
+    await db.certificados.insert_many([
+        {"id_certificado": i, "id_inscricao": i * 2, "status": "ativo"} for i in range(1, total + 1)
+    ])
+    await db.regras_obrigatorias.insert_many([
+        {"id_regra": i, "id_cargo": i % 10, "id_curso": i} for i in range(1, 101)
+    ])
+
+
+async def explicar(db):
+    resultado = []
+    for colecao, filtro in CONSULTAS:
+        plano = await db[colecao].find(filtro).explain()
+        stats = plano.get("executionStats", {})
+        resultado.append((
+            f"{colecao} {filtro}",
+            "+".join(reversed(estagios(plano["queryPlanner"]["winningPlan"]))),
+            stats.get("totalDocsExamined"),
+            stats.get("executionTimeMillis"),
+        ))
+    return resultado
+
+
+def imprimir(titulo, linhas):
+    print(f'\n== {titulo} ==')
+    for consulta, estagio, examinados, ms in linhas:
+        print(f'{consulta:<60} {estagio:<22} docs={examinados!s:<7} {ms!s} ms')
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--colaboradores', type=int, default=20000)
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient(MONGO)
+    db = client[DBNAME]
+    try:
+        await popular(db, args.colaboradores)
+        antes = await explicar(db)
+        relatorio = await indexes.reconcile(db)
+        depois = await explicar(db)
+        imprimir('sem índices', antes)
+        imprimir(f'após reconcile ({len(relatorio["criados"])} índices criados)', depois)
+        varreduras = [consulta for consulta, estagio, _, _ in depois if "COLLSCAN" in estagio]
+        if varreduras:
+            print('\nconsultas ainda em COLLSCAN:', *varreduras, sep='\n  ')
+    finally:
+        await client.drop_database(DBNAME)
+        client.close()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
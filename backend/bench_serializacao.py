@@ -0,0 +1,108 @@
+# Benchmark: custo de serialização das listagens, antes e depois do caminho rápido
+# Para cada rota montamos N documentos sintéticos no formato gravado no MongoDB e
+# medimos:
+#   pydantic  o que o FastAPI faz com response_model=List[X] (validação linha a
+#             linha + jsonable_encoder + json.dumps do JSONResponse)
+#   rapido    RespostaJSONRapida (orjson direto sobre os documentos crus)
+# Não precisa de banco: só importa os modelos do server.py.
+# Uso: python bench_serializacao.py [--linhas 100 1000 10000] [--repeticoes 5]
+
+import argparse
+import asyncio
+import os
+import time
+from datetime import datetime, timezone, timedelta
+from typing import List
+
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017/')
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+import resposta_rapida
+import server
+
+AGORA = datetime.now(timezone.utc)
+
+
+def colaborador(i):
+    return {"id_colaborador": i, "nome": f"Colaborador {i}", "email": f"colab{i}@example.com",
+            "cpf": f"{i:011d}", "id_cargo": i % 10, "id_area": i % 7, "id_perfil": 2,
+            "id_gestor": None, "data_admissao": AGORA - timedelta(days=i), "ativo": True}
+
+
+def inscricao(i):
+    return {"id_inscricao": i, "id_colaborador": i, "id_curso": i % 50 + 1, "data_inscricao": AGORA,
+            "data_prevista": AGORA + timedelta(days=30), "status": "em_andamento",
+            "tipo_inscricao": "automatica", "data_conclusao": None, "nota": None, "aprovado": False}
+
+
+def certificado(i):
+    return {"id_certificado": i, "id_inscricao": i, "data_emissao": AGORA,
+            "data_validade": AGORA + timedelta(days=365), "codigo_verificacao": f"{i:08X}", "status": "ativo"}
+
+
+def regra(i):
+    return {"id_regra": i, "id_curso": i % 50 + 1, "id_trilha": None, "id_cargo": i % 10, "id_area": None,
+            "validade_certificado_meses": 12, "alerta_vencimento_dias": 30, "descricao": f"Regra {i}"}
+
+
+def conformidade(i):
+    return {"id_colaborador": i, "nome": f"Colaborador {i}", "id_cargo": i % 10, "id_area": i % 7,
+            "status": "a_vencer", "calculado_em": AGORA,
+            "obrigacoes": [{"id_regra": r, "id_curso": r, "id_trilha": None, "status": "ok",
+                            "data_validade": AGORA + timedelta(days=r)} for r in range(1, 4)]}
+
+
+ROTAS = [
+    ("colaboradores", server.Colaborador, colaborador),
+    ("inscricoes", server.Inscricao, inscricao),
+    ("certificados", server.Certificado, certificado),
+    ("regras", server.RegraObrigatorio, regra),
+    ("conformidade", server.Conformidade, conformidade),
+]
+
+
+async def via_pydantic(campo, docs) -> bytes:
+    conteudo = await serialize_response(field=campo, response_content=docs)
+    return JSONResponse(conteudo).body
+
+
+def via_rapido(docs) -> bytes:
+    return resposta_rapida.RespostaJSONRapida(docs).body
+
+
+def medir(funcao, repeticoes: int) -> float:
+    # Menor tempo entre as repetições, em milissegundos
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--linhas', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--repeticoes', type=int, default=5)
+    args = parser.parse_args()
+
+    loop = asyncio.new_event_loop()
+    encoder = "orjson" if resposta_rapida.orjson is not None else "json (orjson não instalado)"
+    print(f'encoder do caminho rápido: {encoder}\n')
+    print(f'{"rota":<15} {"linhas":>7} {"pydantic ms":>12} {"rapido ms":>10} {"ganho":>7} {"bytes":>10}')
+    for nome, modelo, fabrica in ROTAS:
+        campo = create_response_field(name=f"Response_{nome}", type_=List[modelo])
+        for linhas in args.linhas:
+            docs = [fabrica(i) for i in range(1, linhas + 1)]
+            lento = medir(lambda: loop.run_until_complete(via_pydantic(campo, docs)), args.repeticoes)
+            rapido = medir(lambda: via_rapido(docs), args.repeticoes)
+            tamanho = len(via_rapido(docs))
+            print(f'{nome:<15} {linhas:>7} {lento:>12.2f} {rapido:>10.2f} {lento / rapido:>6.1f}x {tamanho:>10}')
+    loop.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,209 @@
+# Busca textual de cursos (GET /api/cursos/busca)
+# O Cursos.jsx baixava o catálogo inteiro e filtrava no navegador. Aqui mantemos em
+# memória um índice invertido: termo -> {id_curso: peso}. Os termos saem da mesma
+# normalização do slug (NFKD, sem acentos, minúsculas), então "manutencao" encontra
+# "Manutenção" e "NR-12" vira os termos "nr" e "12".
+#
+# Cada palavra da consulta casa por prefixo ("segur" encontra "seguranca") e todas
+# precisam aparecer no curso. A relevância soma, para cada palavra, o peso do campo
+# onde ela aparece (título vale mais que conteúdo programático) multiplicado pelo
+# idf do termo; termo exato vale mais que prefixo. A lista de termos fica ordenada
+# para achar os prefixos com bisect.
+#
+# O índice é reconstruído quando a versão de "cursos" em `versoes_cache` muda (as
+# rotas de escrita já chamam cache_referencia.invalidar("cursos")). Enquanto a nova
+# versão é montada, as buscas continuam usando a anterior.
+
+import asyncio
+import heapq
+import math
+import re
+import time
+import unicodedata
+from bisect import bisect_left
+from collections import Counter, OrderedDict
+from operator import itemgetter
+from typing import Dict, List, Optional, Tuple
+
+from cache_referencia import VersoesColecoes
+
+DEPENDENCIAS = ["cursos"]
+
+# Peso de cada campo na relevância
+PESOS = {
+    "titulo": 5.0,
+    "norma_referencia": 4.0,
+    "descricao": 2.0,
+    "publico_alvo": 1.5,
+    "conteudo_programatico": 1.0,
+}
+PESO_PREFIXO = 0.6
+MIN_PREFIXO = 2  # palavras de uma letra só casam por termo exato
+MAX_EXPANSOES = 200
+MAX_RECENTES = 256
+
+# Não indexamos conectivos: aparecem em quase todo curso e não ajudam a ordenar
+STOPWORDS = frozenset("a ao aos as com da das de do dos e em na nas no nos o os ou para por um uma".split())
+
+_TERMO = re.compile(r"[a-z0-9]+")
+
+
+def remover_acentos(texto: str) -> str:
+    texto = unicodedata.normalize("NFKD", texto.lower())
+    return "".join(ch for ch in texto if not unicodedata.combining(ch))
+
+
+def termos(texto: Optional[str]) -> List[str]:
+    if not texto:
+        return []
+    if texto.isascii():
+        return _TERMO.findall(texto.lower())
+    return _TERMO.findall(remover_acentos(texto))
+
+
+class IndiceCursos:
+    def __init__(self, cursos: List[dict]):
+        self.cursos: Dict[int, dict] = {}
+        pesos_por_termo: Dict[str, Dict[int, float]] = {}
+        for curso in cursos:
+            id_curso = curso["id_curso"]
+            self.cursos[id_curso] = curso
+            acumulado: Dict[str, float] = {}
+            for campo, peso in PESOS.items():
+                # Repetir a palavra no texto ajuda pouco (log): não premiamos conteúdo longo
+                for termo, vezes in Counter(termos(curso.get(campo))).items():
+                    acumulado[termo] = acumulado.get(termo, 0.0) + peso * (1 + math.log(vezes))
+            for termo, peso in acumulado.items():
+                if termo not in STOPWORDS:
+                    pesos_por_termo.setdefault(termo, {})[id_curso] = peso
+        # O idf já entra no peso guardado: na busca sobra só somar
+        total = len(self.cursos)
+        self.postings: Dict[str, Dict[int, float]] = {}
+        for termo, pesos in pesos_por_termo.items():
+            idf = math.log(1 + total / len(pesos))
+            self.postings[termo] = {c: p * idf for c, p in pesos.items()}
+        self.vocabulario: List[str] = sorted(self.postings)
+        # Quem digita refaz a mesma consulta letra a letra: guardamos as palavras recentes
+        self._recentes: "OrderedDict[str, Dict[int, float]]" = OrderedDict()
+
+    def _expandir(self, palavra: str) -> List[Tuple[str, float]]:
+        # Termos do vocabulário que começam com a palavra, com o fator de exato/prefixo
+        if len(palavra) < MIN_PREFIXO:
+            return [(palavra, 1.0)] if palavra in self.postings else []
+        encontrados = []
+        i = bisect_left(self.vocabulario, palavra)
+        while i < len(self.vocabulario) and len(encontrados) < MAX_EXPANSOES:
+            termo = self.vocabulario[i]
+            if not termo.startswith(palavra):
+                break
+            encontrados.append((termo, 1.0 if termo == palavra else PESO_PREFIXO))
+            i += 1
+        return encontrados
+
+    def _custo(self, expansoes: List[Tuple[str, float]]) -> int:
+        return sum(len(self.postings[termo]) for termo, _ in expansoes)
+
+    def _pontuar(self, palavra: str, expansoes: List[Tuple[str, float]]) -> Dict[int, float]:
+        # Por curso, vale o melhor termo que casou com a palavra. O dicionário devolvido
+        # pode ser o próprio posting: quem chama não deve alterá-lo.
+        pontos = self._recentes.get(palavra)
+        if pontos is not None:
+            self._recentes.move_to_end(palavra)
+            return pontos
+        if len(expansoes) == 1 and expansoes[0][1] == 1.0:
+            pontos = self.postings[palavra]
+        else:
+            pontos = {}
+            for termo, fator in expansoes:
+                for id_curso, peso in self.postings[termo].items():
+                    valor = peso * fator
+                    if valor > pontos.get(id_curso, 0.0):
+                        pontos[id_curso] = valor
+        self._recentes[palavra] = pontos
+        if len(self._recentes) > MAX_RECENTES:
+            self._recentes.popitem(last=False)
+        return pontos
+
+    def _restringir(self, total: Dict[int, float], expansoes: List[Tuple[str, float]]) -> Dict[int, float]:
+        # Com poucos candidatos sai mais barato consultar cada um nos postings da
+        # palavra do que montar a pontuação dela para o catálogo inteiro
+        restantes = {}
+        postings = [(self.postings[termo], fator) for termo, fator in expansoes]
+        for id_curso, valor in total.items():
+            melhor = 0.0
+            for pesos, fator in postings:
+                peso = pesos.get(id_curso)
+                if peso is not None and peso * fator > melhor:
+                    melhor = peso * fator
+            if melhor:
+                restantes[id_curso] = valor + melhor
+        return restantes
+
+    def buscar(self, consulta: str, skip: int = 0, limit: int = 20,
+               tipo: Optional[str] = None) -> Tuple[int, List[dict]]:
+        palavras = list(dict.fromkeys(termos(consulta)))
+        palavras = [p for p in palavras if p not in STOPWORDS] or palavras
+        if not palavras:
+            return 0, []
+        # Começamos pela palavra que casa com menos cursos: a interseção só encolhe
+        candidatas = sorted(((self._custo(e), p, e) for p in palavras for e in [self._expandir(p)]),
+                            key=itemgetter(0))
+        if candidatas[0][0] == 0:
+            return 0, []
+        total = self._pontuar(candidatas[0][1], candidatas[0][2])
+        for custo, palavra, expansoes in candidatas[1:]:
+            if len(total) * len(expansoes) < custo:
+                total = self._restringir(total, expansoes)
+            else:
+                pontos = self._pontuar(palavra, expansoes)
+                total = {c: v + pontos[c] for c, v in total.items() if c in pontos}
+            if not total:
+                return 0, []
+        if tipo is not None:
+            total = {c: v for c, v in total.items() if self.cursos[c].get("tipo_treinamento") == tipo}
+        melhores = heapq.nlargest(skip + limit, total.items(), key=itemgetter(1))
+        return len(total), [{**self.cursos[c], "relevancia": round(v, 3)} for c, v in melhores[skip:]]
+
+
+class BuscaCursos:
+    def __init__(self, db, versoes: VersoesColecoes, projecao: dict):
+        self.db = db
+        self.versoes = versoes
+        self.projecao = projecao
+        self._indice: Optional[IndiceCursos] = None
+        self._versao: Optional[tuple] = None
+        self._construcao: Optional[asyncio.Task] = None
+        self.construido_em: Optional[float] = None
+        self.duracao_ms: Optional[float] = None
+
+    async def _construir(self, versao: tuple):
+        inicio = time.perf_counter()
+        # Em ordem de ID: nos empates de relevância o curso mais antigo vem primeiro
+        cursos = await self.db.cursos.find({}, self.projecao).sort("id_curso", 1).to_list(None)
+        # Tokenizar dezenas de milhares de cursos leva centenas de ms: fora do event loop
+        indice = await asyncio.to_thread(IndiceCursos, cursos)
+        self._indice, self._versao = indice, versao
+        self.construido_em = time.time()
+        self.duracao_ms = round((time.perf_counter() - inicio) * 1000, 1)
+
+    async def indice(self) -> IndiceCursos:
+        versao = await self.versoes.atuais(DEPENDENCIAS)
+        if versao != self._versao and (self._construcao is None or self._construcao.done()):
+            self._construcao = asyncio.create_task(self._construir(versao))
+        if self._indice is None:
+            # Primeira busca do worker: não há versão anterior para servir
+            await asyncio.shield(self._construcao)
+        return self._indice
+
+    async def buscar(self, consulta: str, skip: int = 0, limit: int = 20,
+                     tipo: Optional[str] = None) -> Tuple[int, List[dict]]:
+        return (await self.indice()).buscar(consulta, skip, limit, tipo)
+
+    def stats(self) -> dict:
+        return {
+            "cursos": len(self._indice.cursos) if self._indice else 0,
+            "termos": len(self._indice.vocabulario) if self._indice else 0,
+            "versao": self._versao[0] if self._versao else None,
+            "construido_em": self.construido_em,
+            "duracao_ms": self.duracao_ms,
+        }
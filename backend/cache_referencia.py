@@ -0,0 +1,90 @@
+# Cache de leitura para dados de referência (cargos, perfis, cursos, trilhas)
+# Esses dados mudam poucas vezes por mês, mas eram lidos do MongoDB a cada GET.
+# Guardamos em memória a resposta já validada e serializada em JSON, junto com um
+# ETag forte, e respondemos sem consultar o banco nem revalidar com Pydantic.
+#
+# Invalidação entre workers: cada coleção tem um contador de versão em
+# `versoes_cache`. Os handlers de escrita incrementam o contador; cada worker relê
+# os contadores no máximo a cada `intervalo` segundos e as entradas com versão
+# antiga deixam de ser usadas. (Change streams exigiriam replica set.)
+
+import asyncio
+import hashlib
+import time
+from typing import Awaitable, Callable, Dict, Hashable, List, Sequence, Tuple
+
+from pydantic import TypeAdapter
+from pymongo import ReturnDocument
+
+from ttl_cache import TTLCache
+
+# carregar() -> (documentos, cabeçalhos extras da resposta)
+Carregar = Callable[[], Awaitable[Tuple[List[dict], Dict[str, str]]]]
+
+
+class VersoesColecoes:
+    def __init__(self, colecao, intervalo: float = 1.0):
+        self.colecao = colecao
+        self.intervalo = intervalo
+        self._versoes: Dict[str, int] = {}
+        self._lido_em = float("-inf")
+        self._lock = asyncio.Lock()
+
+    async def _reler(self):
+        async with self._lock:
+            if time.monotonic() - self._lido_em < self.intervalo:
+                return  # outra corrotina acabou de reler
+            self._versoes = {d["_id"]: d["versao"] async for d in self.colecao.find({})}
+            self._lido_em = time.monotonic()
+
+    def conhecidas(self) -> Dict[str, int]:
+        return dict(self._versoes)
+
+    async def atuais(self, nomes: Sequence[str]) -> Tuple[int, ...]:
+        if time.monotonic() - self._lido_em >= self.intervalo:
+            await self._reler()
+        return tuple(self._versoes.get(nome, 0) for nome in nomes)
+
+    async def incrementar(self, nome: str) -> int:
+        doc = await self.colecao.find_one_and_update(
+            {"_id": nome}, {"$inc": {"versao": 1}}, upsert=True, return_document=ReturnDocument.AFTER)
+        # O próprio worker enxerga a nova versão imediatamente
+        self._versoes[nome] = doc["versao"]
+        return doc["versao"]
+
+
+class CacheReferencia:
+    def __init__(self, versoes: VersoesColecoes, ttl: float = 300.0, maxsize: int = 256):
+        self.versoes = versoes
+        # O TTL é só uma rede de segurança; a invalidação normal é pela versão na chave
+        self.cache = TTLCache(ttl=ttl, maxsize=maxsize)
+        self._adaptadores: Dict[type, TypeAdapter] = {}
+
+    def _adaptador(self, modelo: type) -> TypeAdapter:
+        if modelo not in self._adaptadores:
+            self._adaptadores[modelo] = TypeAdapter(List[modelo])
+        return self._adaptadores[modelo]
+
+    async def obter(self, chave: Hashable, dependencias: Sequence[str], modelo: type,
+                    carregar: Carregar) -> dict:
+        # Devolve {"corpo": bytes, "etag": str, "cabecalhos": {...}}
+        versao = await self.versoes.atuais(dependencias)
+
+        async def montar() -> dict:
+            docs, cabecalhos = await carregar()
+            adaptador = self._adaptador(modelo)
+            corpo = adaptador.dump_json(adaptador.validate_python(docs))
+            return {
+                "corpo": corpo,
+                "etag": '"' + hashlib.sha1(corpo).hexdigest() + '"',
+                "cabecalhos": cabecalhos,
+            }
+
+        return await self.cache.get_or_compute((chave, versao), montar)
+
+    async def invalidar(self, *colecoes: str):
+        for colecao in colecoes:
+            await self.versoes.incrementar(colecao)
+
+    def stats(self) -> dict:
+        return {**self.cache.stats(), "versoes": self.versoes.conhecidas()}
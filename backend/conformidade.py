@@ -0,0 +1,503 @@
+# Motor de conformidade: avalia as regras_obrigatorias para cada colaborador
+# Em uma única passada carregamos regras, vínculos curso_trilha, inscrições e
+# certificados com agregações, cruzamos tudo em memória por hash (dicionários) e
+# gravamos o resultado na coleção materializada `conformidade`, com um documento
+# por colaborador contendo a situação de cada obrigação:
+#
+#   ok        certificado/conclusão válido
+#   a_vencer  válido, mas dentro de alerta_vencimento_dias da regra
+#   vencido   a validade já passou
+#   ausente   nenhuma conclusão ou certificado para o curso/trilha exigido
+#
+# Uma regra se aplica ao colaborador quando id_cargo e id_area batem com os do
+# colaborador; campos nulos na regra valem para qualquer cargo/área.
+#
+# Depois da carga inicial, FilaConformidade mantém a coleção atualizada de forma
+# incremental: os handlers marcam o que mudou e apenas os pares colaborador×regra
+# afetados são recalculados por uma tarefa em segundo plano.
+
+import asyncio
+import calendar
+import logging
+import time
+from datetime import datetime, timezone, timedelta
+from enum import Enum
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from pymongo import ReplaceOne
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+
+
+class StatusConformidade(str, Enum):
+    OK = "ok"
+    A_VENCER = "a_vencer"
+    VENCIDO = "vencido"
+    AUSENTE = "ausente"
+
+
+# Ordem de gravidade usada para consolidar trilhas e o status geral do colaborador
+GRAVIDADE = {
+    StatusConformidade.OK: 0,
+    StatusConformidade.A_VENCER: 1,
+    StatusConformidade.VENCIDO: 2,
+    StatusConformidade.AUSENTE: 3,
+}
+
+
+def as_datetime(valor) -> Optional[datetime]:
+    # As datas podem estar gravadas como string ISO ou como datetime do BSON
+    if valor is None or valor == "":
+        return None
+    if isinstance(valor, str):
+        valor = datetime.fromisoformat(valor)
+    if valor.tzinfo is None:
+        valor = valor.replace(tzinfo=timezone.utc)
+    return valor
+
+
+def somar_meses(data: datetime, meses: int) -> datetime:
+    mes = data.month - 1 + meses
+    ano = data.year + mes // 12
+    mes = mes % 12 + 1
+    dia = min(data.day, calendar.monthrange(ano, mes)[1])
+    return data.replace(year=ano, month=mes, day=dia)
+
+
+# Evidência de conclusão de um curso: (data base, validade explícita do certificado)
+Evidencia = Tuple[Optional[datetime], Optional[datetime]]
+
+
+class ConformidadeEngine:
+    def __init__(self, db):
+        self.db = db
+
+    # ---------- carga ----------
+
+    async def _carregar_regras(self) -> List[dict]:
+        return await self.db.regras_obrigatorias.find({}, {"_id": 0}).to_list(None)
+
+    async def _carregar_trilhas(self, ids_trilha: Iterable[int]) -> Dict[int, List[int]]:
+        # Cursos obrigatórios de cada trilha exigida por alguma regra
+        ids_trilha = list(ids_trilha)
+        trilha_cursos: Dict[int, List[int]] = {id_trilha: [] for id_trilha in ids_trilha}
+        if not ids_trilha:
+            return trilha_cursos
+        cursor = self.db.curso_trilha.find(
+            {"id_trilha": {"$in": ids_trilha}, "obrigatorio": {"$ne": False}},
+            {"_id": 0, "id_trilha": 1, "id_curso": 1},
+        )
+        async for ct in cursor:
+            trilha_cursos[ct["id_trilha"]].append(ct["id_curso"])
+        return trilha_cursos
+
+    async def _carregar_evidencias(self, ids_curso: List[int],
+                                   ids_colaborador: Optional[List[int]] = None
+                                   ) -> Dict[Tuple[int, int], List[Evidencia]]:
+        # Inscrições (não canceladas) nos cursos exigidos, unidas aos certificados por id_inscricao
+        match = {"id_curso": {"$in": ids_curso}, "status": {"$ne": "cancelado"}}
+        if ids_colaborador is not None:
+            match["id_colaborador"] = {"$in": ids_colaborador}
+        inscricoes: Dict[int, dict] = {}
+        cursor = self.db.inscricoes.aggregate([
+            {"$match": match},
+            {"$project": {"_id": 0, "id_inscricao": 1, "id_colaborador": 1, "id_curso": 1,
+                          "status": 1, "data_conclusao": 1}},
+        ])
+        async for insc in cursor:
+            inscricoes[insc["id_inscricao"]] = insc
+
+        certificados: Dict[int, dict] = {}
+        if inscricoes:
+            filtro_cert = {"status": {"$ne": "revogado"}}
+            if ids_colaborador is not None:
+                # Recalculo parcial: restringimos aos certificados das inscrições carregadas
+                filtro_cert["id_inscricao"] = {"$in": list(inscricoes)}
+            cursor = self.db.certificados.aggregate([
+                {"$match": filtro_cert},
+                {"$project": {"_id": 0, "id_inscricao": 1, "data_emissao": 1, "data_validade": 1, "status": 1}},
+            ])
+            async for cert in cursor:
+                if cert["id_inscricao"] in inscricoes:
+                    certificados[cert["id_inscricao"]] = cert
+
+        evidencias: Dict[Tuple[int, int], List[Evidencia]] = {}
+        for id_inscricao, insc in inscricoes.items():
+            cert = certificados.get(id_inscricao)
+            if cert is not None:
+                base = as_datetime(cert.get("data_emissao")) or as_datetime(insc.get("data_conclusao"))
+                validade = as_datetime(cert.get("data_validade"))
+                if cert.get("status") == "vencido" and validade is None:
+                    validade = base
+            elif insc.get("status") == "concluido":
+                base, validade = as_datetime(insc.get("data_conclusao")), None
+            else:
+                continue
+            evidencias.setdefault((insc["id_colaborador"], insc["id_curso"]), []).append((base, validade))
+        return evidencias
+
+    # ---------- avaliação ----------
+
+    @staticmethod
+    def _indexar_regras(regras: List[dict]) -> Dict[Tuple[Optional[int], Optional[int]], List[dict]]:
+        por_chave: Dict[Tuple[Optional[int], Optional[int]], List[dict]] = {}
+        for regra in regras:
+            por_chave.setdefault((regra.get("id_cargo"), regra.get("id_area")), []).append(regra)
+        return por_chave
+
+    @staticmethod
+    def regras_aplicaveis(por_chave, id_cargo: int, id_area: int) -> List[dict]:
+        # Quatro buscas O(1) cobrem regras específicas e as que valem para qualquer cargo/área
+        # Com cargo ou área nulos no colaborador as chaves se repetem; o dict.fromkeys
+        # evita devolver a mesma regra (e a mesma obrigação) mais de uma vez
+        aplicaveis = []
+        for chave in dict.fromkeys(((id_cargo, id_area), (id_cargo, None), (None, id_area), (None, None))):
+            aplicaveis.extend(por_chave.get(chave, ()))
+        return aplicaveis
+
+    @staticmethod
+    def _avaliar_curso(evidencias: List[Evidencia], regra: dict, agora: datetime
+                       ) -> Tuple[StatusConformidade, Optional[datetime]]:
+        if not evidencias:
+            return StatusConformidade.AUSENTE, None
+        melhor: Optional[datetime] = None
+        sem_validade = False
+        for base, validade in evidencias:
+            if validade is None:
+                if base is None:
+                    sem_validade = True
+                    continue
+                validade = somar_meses(base, regra["validade_certificado_meses"])
+            if melhor is None or validade > melhor:
+                melhor = validade
+        if sem_validade or melhor is None:
+            # Concluído sem data conhecida: não há como calcular vencimento
+            return StatusConformidade.OK, None
+        if melhor <= agora:
+            return StatusConformidade.VENCIDO, melhor
+        if melhor - agora <= timedelta(days=regra.get("alerta_vencimento_dias", 30)):
+            return StatusConformidade.A_VENCER, melhor
+        return StatusConformidade.OK, melhor
+
+    def avaliar_obrigacoes(self, id_colaborador: int, regras: List[dict], trilha_cursos: Dict[int, List[int]],
+                           evidencias: Dict[Tuple[int, int], List[Evidencia]], agora: datetime) -> List[dict]:
+        obrigacoes = []
+        for regra in regras:
+            if regra.get("id_curso"):
+                status, validade = self._avaliar_curso(
+                    evidencias.get((id_colaborador, regra["id_curso"]), []), regra, agora)
+            else:
+                # Trilha: vale o pior status e a menor validade entre os cursos obrigatórios
+                status, validade = StatusConformidade.OK, None
+                for id_curso in trilha_cursos.get(regra.get("id_trilha"), []):
+                    s, v = self._avaliar_curso(evidencias.get((id_colaborador, id_curso), []), regra, agora)
+                    if GRAVIDADE[s] > GRAVIDADE[status]:
+                        status = s
+                    if v is not None and (validade is None or v < validade):
+                        validade = v
+            obrigacoes.append({
+                "id_regra": regra["id_regra"],
+                "id_curso": regra.get("id_curso"),
+                "id_trilha": regra.get("id_trilha"),
+                "status": status.value,
+                "data_validade": validade,
+            })
+        return obrigacoes
+
+    @staticmethod
+    def montar_documento(colab: dict, obrigacoes: List[dict], agora: datetime) -> dict:
+        pior = StatusConformidade.OK
+        for obrigacao in obrigacoes:
+            status = StatusConformidade(obrigacao["status"])
+            if GRAVIDADE[status] > GRAVIDADE[pior]:
+                pior = status
+        return {
+            "id_colaborador": colab["id_colaborador"],
+            "nome": colab.get("nome"),
+            "id_cargo": colab.get("id_cargo"),
+            "id_area": colab.get("id_area"),
+            "status": pior.value,
+            "obrigacoes": sorted(obrigacoes, key=lambda o: o["id_regra"]),
+            "calculado_em": agora,
+        }
+
+    # ---------- persistência ----------
+
+    async def _gravar(self, docs: List[dict]):
+        if docs:
+            await self.db.conformidade.bulk_write(
+                [ReplaceOne({"id_colaborador": d["id_colaborador"]}, d, upsert=True) for d in docs],
+                ordered=False,
+            )
+
+    async def carregar_contexto(self) -> dict:
+        # Regras (poucas) e cursos das trilhas exigidas ficam em memória durante o cálculo
+        regras = await self._carregar_regras()
+        trilha_cursos = await self._carregar_trilhas({r["id_trilha"] for r in regras
+                                                      if not r.get("id_curso") and r.get("id_trilha")})
+        return {
+            "regras": {r["id_regra"]: r for r in regras},
+            "por_chave": self._indexar_regras(regras),
+            "trilha_cursos": trilha_cursos,
+        }
+
+    @staticmethod
+    def cursos_das_regras(regras: Iterable[dict], trilha_cursos: Dict[int, List[int]]) -> set:
+        ids_curso = set()
+        for regra in regras:
+            if regra.get("id_curso"):
+                ids_curso.add(regra["id_curso"])
+            else:
+                ids_curso.update(trilha_cursos.get(regra.get("id_trilha"), []))
+        return ids_curso
+
+    async def _calcular(self, filtro_colaboradores: dict, ids_colaborador: Optional[List[int]]) -> dict:
+        inicio = time.perf_counter()
+        agora = datetime.now(timezone.utc)
+        ctx = await self.carregar_contexto()
+        ids_curso = self.cursos_das_regras(ctx["regras"].values(), ctx["trilha_cursos"])
+        evidencias = await self._carregar_evidencias(list(ids_curso), ids_colaborador) if ids_curso else {}
+
+        total = 0
+        lote: List[dict] = []
+        cursor = self.db.colaboradores.find(
+            {**filtro_colaboradores, "ativo": {"$ne": False}},
+            {"_id": 0, "id_colaborador": 1, "nome": 1, "id_cargo": 1, "id_area": 1},
+        )
+        async for colab in cursor:
+            aplicaveis = self.regras_aplicaveis(ctx["por_chave"], colab.get("id_cargo"), colab.get("id_area"))
+            obrigacoes = self.avaliar_obrigacoes(colab["id_colaborador"], aplicaveis,
+                                                 ctx["trilha_cursos"], evidencias, agora)
+            lote.append(self.montar_documento(colab, obrigacoes, agora))
+            total += 1
+            if len(lote) >= BATCH_SIZE:
+                await self._gravar(lote)
+                lote = []
+        await self._gravar(lote)
+        return {"colaboradores": total, "agora": agora, "duracao_ms": round((time.perf_counter() - inicio) * 1000, 1)}
+
+    async def recalcular_tudo(self) -> dict:
+        resultado = await self._calcular({}, None)
+        # Remove colaboradores que deixaram de existir ou foram inativados
+        removidos = await self.db.conformidade.delete_many({"calculado_em": {"$lt": resultado.pop("agora")}})
+        resultado["removidos"] = removidos.deleted_count
+        return resultado
+
+    async def recalcular_colaboradores(self, ids_colaborador: List[int]) -> dict:
+        ids_colaborador = list(ids_colaborador)
+        resultado = await self._calcular({"id_colaborador": {"$in": ids_colaborador}}, ids_colaborador)
+        removidos = await self.db.conformidade.delete_many({
+            "id_colaborador": {"$in": ids_colaborador},
+            "calculado_em": {"$lt": resultado.pop("agora")},
+        })
+        resultado["removidos"] = removidos.deleted_count
+        return resultado
+
+    async def recalcular_pares(self, pares: Dict[int, Set[int]], ctx: dict) -> int:
+        # Recalcula apenas os pares colaborador×regra informados, preservando as demais
+        # obrigações já materializadas. Colaboradores sem documento em `conformidade`
+        # são recalculados por inteiro. Devolve o número de pares avaliados.
+        ids = list(pares)
+        agora = datetime.now(timezone.utc)
+        colabs = {c["id_colaborador"]: c async for c in self.db.colaboradores.find(
+            {"id_colaborador": {"$in": ids}, "ativo": {"$ne": False}},
+            {"_id": 0, "id_colaborador": 1, "nome": 1, "id_cargo": 1, "id_area": 1},
+        )}
+        atuais = {d["id_colaborador"]: d async for d in self.db.conformidade.find(
+            {"id_colaborador": {"$in": ids}}, {"_id": 0})}
+
+        sem_documento = [i for i in colabs if i not in atuais]
+        if sem_documento:
+            await self.recalcular_colaboradores(sem_documento)
+        removidos = [i for i in ids if i not in colabs]
+        if removidos:
+            await self.db.conformidade.delete_many({"id_colaborador": {"$in": removidos}})
+
+        alvo = {i: pares[i] for i in colabs if i in atuais}
+        regras_alvo = [ctx["regras"][r] for r in set().union(*alvo.values()) if r in ctx["regras"]] if alvo else []
+        ids_curso = self.cursos_das_regras(regras_alvo, ctx["trilha_cursos"])
+        evidencias = await self._carregar_evidencias(list(ids_curso), list(alvo)) if ids_curso else {}
+
+        docs = []
+        for id_colaborador, ids_regra in alvo.items():
+            colab = colabs[id_colaborador]
+            aplicaveis = [r for r in self.regras_aplicaveis(ctx["por_chave"], colab.get("id_cargo"), colab.get("id_area"))
+                          if r["id_regra"] in ids_regra]
+            novas = self.avaliar_obrigacoes(id_colaborador, aplicaveis, ctx["trilha_cursos"], evidencias, agora)
+            # Mantemos as obrigações das regras que não foram tocadas; regras excluídas ou que
+            # deixaram de se aplicar simplesmente não voltam para a lista
+            mantidas = [o for o in atuais[id_colaborador].get("obrigacoes", []) if o["id_regra"] not in ids_regra]
+            docs.append(self.montar_documento(colab, mantidas + novas, agora))
+        await self._gravar(docs)
+        return sum(len(r) for r in alvo.values())
+
+
+class FilaConformidade:
+    # Fila de "sujeira" drenada por uma tarefa asyncio em segundo plano. Os handlers
+    # apenas marcam o que mudou (operação O(1), sem I/O); a tarefa resolve quais pares
+    # colaborador×regra foram afetados e recalcula só esses, em lotes.
+
+    def __init__(self, engine: ConformidadeEngine, intervalo: float = 0.5):
+        self.engine = engine
+        self.intervalo = intervalo  # janela para agrupar eventos próximos
+        self._colaboradores: Set[int] = set()            # recalcular todas as regras
+        self._cursos: Dict[int, Set[int]] = {}           # colaborador -> cursos alterados
+        self._regras: Set[int] = set()                   # regra criada/excluída
+        self._trilhas: Set[int] = set()                  # vínculos da trilha alterados
+        self._desde: Optional[float] = None              # instante do evento pendente mais antigo
+        self._sinal: Optional[asyncio.Event] = None
+        self._tarefa: Optional[asyncio.Task] = None
+        self.processados = 0
+        self.colaboradores_recalculados = 0
+        self.ciclos = 0
+        self.erros = 0
+        self.ultimo_ciclo_ms = 0.0
+        self.ultimo_lag = 0.0
+
+    # ---------- marcação (chamada pelos handlers) ----------
+
+    def _sujar(self):
+        if self._desde is None:
+            self._desde = time.monotonic()
+        if self._sinal is not None:
+            self._sinal.set()
+
+    def marcar_colaborador(self, id_colaborador: int):
+        self._colaboradores.add(id_colaborador)
+        self._sujar()
+
+    def marcar_curso(self, id_colaborador: int, id_curso: int):
+        self._cursos.setdefault(id_colaborador, set()).add(id_curso)
+        self._sujar()
+
+    def marcar_regra(self, id_regra: int):
+        self._regras.add(id_regra)
+        self._sujar()
+
+    def marcar_trilha(self, id_trilha: int):
+        self._trilhas.add(id_trilha)
+        self._sujar()
+
+    @property
+    def pendentes(self) -> int:
+        return len(self._colaboradores) + len(self._cursos) + len(self._regras) + len(self._trilhas)
+
+    def stats(self) -> dict:
+        lag = time.monotonic() - self._desde if self._desde is not None else 0.0
+        return {
+            "pendentes": self.pendentes,
+            "lag_segundos": round(lag, 3),
+            "ultimo_lag_segundos": round(self.ultimo_lag, 3),
+            "pares_processados": self.processados,
+            "colaboradores_recalculados": self.colaboradores_recalculados,
+            "ciclos": self.ciclos,
+            "erros": self.erros,
+            "ultimo_ciclo_ms": self.ultimo_ciclo_ms,
+        }
+
+    # ---------- drenagem ----------
+
+    async def _populacao_da_regra(self, regra: Optional[dict], id_regra: int) -> Set[int]:
+        # Quem a regra atinge agora + quem já tinha a obrigação materializada
+        ids = {d["id_colaborador"] async for d in self.engine.db.conformidade.find(
+            {"obrigacoes.id_regra": id_regra}, {"_id": 0, "id_colaborador": 1})}
+        if regra is not None:
+            filtro = {"ativo": {"$ne": False}}
+            if regra.get("id_cargo") is not None:
+                filtro["id_cargo"] = regra["id_cargo"]
+            if regra.get("id_area") is not None:
+                filtro["id_area"] = regra["id_area"]
+            ids.update([c["id_colaborador"] async for c in self.engine.db.colaboradores.find(
+                filtro, {"_id": 0, "id_colaborador": 1})])
+        return ids
+
+    async def drenar(self) -> int:
+        if self._desde is None:
+            return 0
+        inicio = time.perf_counter()
+        self.ultimo_lag = time.monotonic() - self._desde
+        colaboradores, cursos, regras, trilhas = self._colaboradores, self._cursos, self._regras, self._trilhas
+        self._colaboradores, self._cursos, self._regras, self._trilhas = set(), {}, set(), set()
+        self._desde = None
+        try:
+            ctx = await self.engine.carregar_contexto()
+            pares: Dict[int, Set[int]] = {}
+
+            regras = set(regras)
+            regras.update(r["id_regra"] for r in ctx["regras"].values() if r.get("id_trilha") in trilhas)
+            for id_regra in regras:
+                for id_colaborador in await self._populacao_da_regra(ctx["regras"].get(id_regra), id_regra):
+                    pares.setdefault(id_colaborador, set()).add(id_regra)
+
+            if cursos:
+                # Mapa curso -> regras que o exigem (diretamente ou via trilha)
+                regras_do_curso: Dict[int, Set[int]] = {}
+                for regra in ctx["regras"].values():
+                    for id_curso in self.engine.cursos_das_regras([regra], ctx["trilha_cursos"]):
+                        regras_do_curso.setdefault(id_curso, set()).add(regra["id_regra"])
+                for id_colaborador, ids_curso in cursos.items():
+                    afetadas = set().union(*(regras_do_curso.get(c, set()) for c in ids_curso))
+                    if afetadas:
+                        pares.setdefault(id_colaborador, set()).update(afetadas)
+
+            for id_colaborador in colaboradores:
+                pares.pop(id_colaborador, None)
+            ids = list(colaboradores)
+            for i in range(0, len(ids), BATCH_SIZE):
+                await self.engine.recalcular_colaboradores(ids[i:i + BATCH_SIZE])
+            self.colaboradores_recalculados += len(ids)
+
+            processados = 0
+            ids = list(pares)
+            for i in range(0, len(ids), BATCH_SIZE):
+                processados += await self.engine.recalcular_pares(
+                    {k: pares[k] for k in ids[i:i + BATCH_SIZE]}, ctx)
+            self.processados += processados
+        except Exception:
+            # Devolvemos os eventos para a fila para tentar de novo no próximo ciclo
+            self.erros += 1
+            self._colaboradores.update(colaboradores)
+            for id_colaborador, ids_curso in cursos.items():
+                self._cursos.setdefault(id_colaborador, set()).update(ids_curso)
+            self._regras.update(regras)
+            self._trilhas.update(trilhas)
+            self._sujar()
+            raise
+        finally:
+            self.ciclos += 1
+            self.ultimo_ciclo_ms = round((time.perf_counter() - inicio) * 1000, 1)
+        return processados
+
+    async def _executar(self):
+        while True:
+            await self._sinal.wait()
+            await asyncio.sleep(self.intervalo)
+            self._sinal.clear()
+            try:
+                await self.drenar()
+            except Exception:
+                logger.exception("Falha ao recalcular conformidade; nova tentativa no próximo ciclo")
+                await asyncio.sleep(self.intervalo * 10)
+
+    def start(self):
+        if self._tarefa is None:
+            self._sinal = asyncio.Event()
+            if self._desde is not None:
+                self._sinal.set()
+            self._tarefa = asyncio.create_task(self._executar())
+
+    async def stop(self):
+        if self._tarefa is not None:
+            self._tarefa.cancel()
+            try:
+                await self._tarefa
+            except asyncio.CancelledError:
+                pass
+            self._tarefa = None
+        # Última drenagem para não perder eventos já marcados
+        try:
+            await self.drenar()
+        except Exception:
+            logger.exception("Falha ao drenar a fila de conformidade no encerramento")
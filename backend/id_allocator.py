@@ -0,0 +1,75 @@
+# Alocador de IDs sequenciais em blocos
+# Em vez de um find_one_and_update em db.counters para cada documento inserido,
+# arrendamos faixas de IDs (ex: 500 de cada vez) com um único $inc e entregamos
+# os IDs a partir da memória. Como o $inc é atômico no MongoDB, cada worker do
+# uvicorn recebe faixas disjuntas, então os IDs continuam únicos entre processos.
+# Os IDs não usados de uma faixa são perdidos quando o processo reinicia (gaps),
+# o que é aceitável para chaves substitutas.
+
+import asyncio
+from typing import Dict, List
+
+from pymongo import ReturnDocument
+
+DEFAULT_BLOCK_SIZE = 500
+
+
+class IdAllocator:
+    def __init__(self, counters, block_size: int = DEFAULT_BLOCK_SIZE):
+        # counters é a coleção db.counters, no mesmo formato usado por get_next_id:
+        # {"_id": <nome da coleção>, "seq": <último id entregue>}
+        if block_size < 1:
+            raise ValueError("block_size deve ser >= 1")
+        self._counters = counters
+        self._block_size = block_size
+        # Para cada coleção guardamos [próximo id livre, último id da faixa]
+        self._faixas: Dict[str, List[int]] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    def _lock(self, nome: str) -> asyncio.Lock:
+        lock = self._locks.get(nome)
+        if lock is None:
+            lock = self._locks[nome] = asyncio.Lock()
+        return lock
+
+    async def _arrendar(self, nome: str, tamanho: int) -> List[int]:
+        # Um único round trip reserva `tamanho` IDs para este processo
+        counter = await self._counters.find_one_and_update(
+            {"_id": nome},
+            {"$inc": {"seq": tamanho}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        fim = counter["seq"]
+        return [fim - tamanho + 1, fim]
+
+    async def next_id(self, nome: str) -> int:
+        faixa = self._faixas.get(nome)
+        # Caminho rápido: sem await entre a leitura e a escrita da faixa, então
+        # não há troca de contexto e dispensamos o lock
+        if faixa is not None and faixa[0] <= faixa[1]:
+            valor = faixa[0]
+            faixa[0] += 1
+            return valor
+        return (await self.next_ids(nome, 1))[0]
+
+    async def next_ids(self, nome: str, quantidade: int) -> List[int]:
+        # Reservamos vários IDs de uma vez (usado em inserções em lote)
+        if quantidade <= 0:
+            return []
+        ids: List[int] = []
+        async with self._lock(nome):
+            while len(ids) < quantidade:
+                faixa = self._faixas.get(nome)
+                if faixa is None or faixa[0] > faixa[1]:
+                    falta = quantidade - len(ids)
+                    faixa = await self._arrendar(nome, max(self._block_size, falta))
+                    self._faixas[nome] = faixa
+                fim = min(faixa[1], faixa[0] + (quantidade - len(ids)) - 1)
+                ids.extend(range(faixa[0], fim + 1))
+                faixa[0] = fim + 1
+        return ids
+
+    def reset(self):
+        # Descarta as faixas em memória (ex: após restaurar o banco)
+        self._faixas.clear()
@@ -0,0 +1,264 @@
+# Importação em lote de colaboradores a partir de CSV ou XLSX
+# Cadastrar uma safra de temporários pelo /auth/register custava, por pessoa, um
+# bcrypt, um find_one de email e um get_next_id. Aqui o arquivo é lido em streaming
+# (o upload fica em arquivo temporário, nunca inteiro em memória) em blocos de
+# `lote` linhas. Para cada bloco:
+#   1. validamos as linhas com o modelo ColaboradorCreate e as referências
+#      (cargo, área, perfil) cujas coleções estão preenchidas;
+#   2. checamos emails/CPFs repetidos no próprio arquivo e, com uma única consulta
+#      $in, os já cadastrados;
+#   3. geramos os hashes das senhas em um pool de processos dedicado (não disputa
+#      com o password_pool do login);
+#   4. reservamos os IDs de uma vez e gravamos com insert_many.
+# O resultado traz contadores e o relatório de erros por linha (limitado a max_erros).
+#
+# XLSX depende do openpyxl (opcional): sem ele só CSV é aceito.
+
+import asyncio
+import csv
+import io
+import logging
+import os
+import re
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Awaitable, Callable, Dict, Iterator, List, Optional, Set
+
+from pydantic import ValidationError
+from pymongo.errors import BulkWriteError
+
+from password_pool import hash_senhas
+
+try:
+    import openpyxl
+except ImportError:  # pragma: no cover - dependência opcional
+    openpyxl = None
+
+logger = logging.getLogger(__name__)
+
+LOTE_PADRAO = 1000
+
+_DATA_BR = re.compile(r"^(\d{2})/(\d{2})/(\d{4})$")
+_BOOLEANOS = {"sim": True, "s": True, "nao": False, "não": False, "n": False}
+
+
+class ArquivoInvalido(Exception):
+    pass
+
+
+def _normalizar(valor):
+    # Células vazias somem (valem os padrões do modelo); datas dd/mm/aaaa viram ISO
+    if valor is None:
+        return None
+    if isinstance(valor, str):
+        valor = valor.strip()
+        if not valor:
+            return None
+        encontrada = _DATA_BR.match(valor)
+        if encontrada:
+            return f"{encontrada.group(3)}-{encontrada.group(2)}-{encontrada.group(1)}"
+        return _BOOLEANOS.get(valor.lower(), valor)
+    return valor
+
+
+def _linha(cabecalho: List[str], valores) -> dict:
+    dados = {}
+    for campo, valor in zip(cabecalho, valores):
+        valor = _normalizar(valor)
+        if campo and valor is not None:
+            dados[campo] = valor
+    return dados
+
+
+def _cabecalho(valores) -> List[str]:
+    return [str(v).strip().lower() if v is not None else "" for v in valores]
+
+
+def linhas_csv(arquivo) -> Iterator[dict]:
+    # Lê o arquivo binário aos poucos; aceita ',' ou ';' (padrão do Excel em pt-BR)
+    texto = io.TextIOWrapper(arquivo, encoding="utf-8-sig", newline="")
+    primeira = texto.readline()
+    if not primeira:
+        return
+    delimitador = ";" if primeira.count(";") > primeira.count(",") else ","
+    cabecalho = _cabecalho(next(csv.reader([primeira], delimiter=delimitador)))
+    try:
+        for valores in csv.reader(texto, delimiter=delimitador):
+            if any(v.strip() for v in valores):
+                yield _linha(cabecalho, valores)
+            else:
+                yield {}
+    finally:
+        # Não fechamos o arquivo do upload junto com o wrapper
+        texto.detach()
+
+
+def linhas_xlsx(arquivo) -> Iterator[dict]:
+    # read_only percorre a planilha sem carregar todas as células
+    planilha = openpyxl.load_workbook(arquivo, read_only=True, data_only=True)
+    try:
+        linhas = planilha.worksheets[0].iter_rows(values_only=True)
+        cabecalho = _cabecalho(next(linhas, ()))
+        for valores in linhas:
+            yield _linha(cabecalho, valores)
+    finally:
+        planilha.close()
+
+
+def abrir_linhas(arquivo, nome: str) -> Iterator[dict]:
+    extensao = os.path.splitext(nome or "")[1].lower()
+    if extensao == ".xlsx":
+        if openpyxl is None:
+            raise ArquivoInvalido("Importação de XLSX requer o pacote openpyxl")
+        return linhas_xlsx(arquivo)
+    if extensao in (".csv", ".txt", ""):
+        return linhas_csv(arquivo)
+    raise ArquivoInvalido(f"Formato de arquivo não suportado: {extensao}")
+
+
+def _proximo_bloco(linhas: Iterator[dict], tamanho: int) -> List[dict]:
+    try:
+        return list(islice(linhas, tamanho))
+    except (UnicodeDecodeError, csv.Error, zipfile.BadZipFile) as exc:
+        raise ArquivoInvalido(f"Arquivo inválido: {exc}")
+
+
+def _mensagens(exc: ValidationError) -> List[str]:
+    return [f"{'.'.join(map(str, e['loc'])) or 'linha'}: {e['msg']}" for e in exc.errors()]
+
+
+class ImportadorColaboradores:
+    def __init__(self, db, modelo: type, alocar_ids: Callable[[int], Awaitable[List[int]]],
+                 workers: Optional[int] = None, lote: int = LOTE_PADRAO, max_erros: int = 1000):
+        self.db = db
+        self.modelo = modelo
+        self.alocar_ids = alocar_ids
+        self.workers = workers or max(1, (os.cpu_count() or 2) - 1)
+        self.lote = lote
+        self.max_erros = max_erros
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    async def _hashes(self, senhas: List[str]) -> List[str]:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        loop = asyncio.get_running_loop()
+        tamanho = max(1, -(-len(senhas) // self.workers))
+        partes = await asyncio.gather(*[
+            loop.run_in_executor(self._executor, hash_senhas, senhas[i:i + tamanho])
+            for i in range(0, len(senhas), tamanho)
+        ])
+        return [h for parte in partes for h in parte]
+
+    async def _referencias(self) -> Dict[str, Set[int]]:
+        # Cargos, áreas e perfis são poucos: carregamos os IDs uma vez por importação.
+        # Não há rota que cadastre áreas (só o scripts_seed_db.py): coleção vazia não é
+        # conferida, como já acontece no /auth/register e no POST /colaboradores
+        referencias = {
+            "id_cargo": {d["id_cargo"] async for d in self.db.cargos.find({}, {"_id": 0, "id_cargo": 1})},
+            "id_area": {d["id_area"] async for d in self.db.areas.find({}, {"_id": 0, "id_area": 1})},
+            "id_perfil": {d["id_perfil"] async for d in self.db.perfis.find({}, {"_id": 0, "id_perfil": 1})},
+        }
+        return {campo: ids for campo, ids in referencias.items() if ids}
+
+    async def importar(self, linhas: Iterator[dict], simular: bool = False,
+                       ao_inserir: Optional[Callable[[List[int]], None]] = None) -> dict:
+        resultado = {"linhas": 0, "importados": 0, "rejeitados": 0, "erros": []}
+        referencias = await self._referencias()
+        emails_vistos: Set[str] = set()
+        cpfs_vistos: Set[str] = set()
+        numero = 1  # a linha 1 é o cabeçalho
+
+        def rejeitar(linha: int, erros: List[str]):
+            resultado["rejeitados"] += 1
+            if len(resultado["erros"]) < self.max_erros:
+                resultado["erros"].append({"linha": linha, "erros": erros})
+
+        while True:
+            # A leitura do arquivo é bloqueante: cada bloco é lido fora do event loop
+            bloco = await asyncio.to_thread(_proximo_bloco, linhas, self.lote)
+            if not bloco:
+                break
+            validos = []
+            for dados in bloco:
+                numero += 1
+                if not dados:
+                    continue  # linhas em branco são ignoradas, mas contam na numeração
+                resultado["linhas"] += 1
+                try:
+                    colaborador = self.modelo.model_validate(dados)
+                except ValidationError as exc:
+                    rejeitar(numero, _mensagens(exc))
+                    continue
+                erros = [f"{campo}: {getattr(colaborador, campo)} não existe"
+                         for campo, ids in referencias.items() if getattr(colaborador, campo) not in ids]
+                email = colaborador.email
+                if email in emails_vistos:
+                    erros.append("email: repetido no arquivo")
+                if colaborador.cpf and colaborador.cpf in cpfs_vistos:
+                    erros.append("cpf: repetido no arquivo")
+                if erros:
+                    rejeitar(numero, erros)
+                    continue
+                emails_vistos.add(email)
+                if colaborador.cpf:
+                    cpfs_vistos.add(colaborador.cpf)
+                validos.append((numero, email, colaborador))
+            if validos:
+                await self._gravar(validos, simular, resultado, rejeitar, ao_inserir)
+        resultado["erros"].sort(key=lambda e: e["linha"])
+        return resultado
+
+    async def _gravar(self, validos: list, simular: bool, resultado: dict, rejeitar,
+                      ao_inserir: Optional[Callable[[List[int]], None]]):
+        # Uma consulta por bloco para emails e CPFs já cadastrados
+        emails = [email for _, email, _ in validos]
+        cpfs = [c.cpf for _, _, c in validos if c.cpf]
+        condicoes = [{"email": {"$in": emails}}] + ([{"cpf": {"$in": cpfs}}] if cpfs else [])
+        existentes = await self.db.colaboradores.find(
+            {"$or": condicoes}, {"_id": 0, "email": 1, "cpf": 1}).to_list(None)
+        emails_existentes = {d["email"] for d in existentes if d.get("email")}
+        cpfs_existentes = {d["cpf"] for d in existentes if d.get("cpf")}
+        novos = []
+        for numero, email, colaborador in validos:
+            erros = []
+            if email in emails_existentes:
+                erros.append("email: já cadastrado")
+            if colaborador.cpf and colaborador.cpf in cpfs_existentes:
+                erros.append("cpf: já cadastrado")
+            if erros:
+                rejeitar(numero, erros)
+            else:
+                novos.append((numero, email, colaborador))
+        if not novos or simular:
+            resultado["importados"] += len(novos)
+            return
+
+        hashes = await self._hashes([c.senha for _, _, c in novos])
+        ids = await self.alocar_ids(len(novos))
+        docs = []
+        for (_, _, colaborador), senha_hash, id_colaborador in zip(novos, hashes, ids):
+            doc = colaborador.model_dump(exclude={"senha"})
+            doc.update(id_colaborador=id_colaborador, senha_hash=senha_hash)
+            docs.append(doc)
+        falhas = set()
+        try:
+            await self.db.colaboradores.insert_many(docs, ordered=False)
+        except BulkWriteError as exc:
+            # Corrida com outro cadastro do mesmo email (índice uniq_email)
+            for erro in exc.details.get("writeErrors", []):
+                falhas.add(erro["index"])
+                if erro.get("code") == 11000:
+                    motivo = f"{next(iter(erro.get('keyPattern') or {'registro': 1}))}: já cadastrado"
+                else:
+                    motivo = erro.get("errmsg", "erro ao gravar")
+                rejeitar(novos[erro["index"]][0], [motivo])
+        inseridos = [doc["id_colaborador"] for i, doc in enumerate(docs) if i not in falhas]
+        resultado["importados"] += len(inseridos)
+        if ao_inserir is not None and inseridos:
+            ao_inserir(inseridos)
@@ -0,0 +1,197 @@
+# Registro declarativo de índices do MongoDB
+# Listamos aqui os índices de que cada coleção precisa para os caminhos de
+# consulta do server.py. Na inicialização, reconcile() cria os que faltam e
+# reporta divergências (índices com mesmo nome e definição diferente, ou índices
+# extras no banco que não estão no registro). Não removemos nada automaticamente:
+# a divergência é apenas registrada no log para decisão manual.
+
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class IndexSpec:
+    name: str
+    keys: Tuple[Tuple[str, int], ...]
+    unique: bool = False
+    partial: Optional[dict] = None
+    expire_after_seconds: Optional[int] = None
+
+    def options(self) -> dict:
+        opts = {"name": self.name, "unique": self.unique}
+        if self.partial is not None:
+            opts["partialFilterExpression"] = self.partial
+        if self.expire_after_seconds is not None:
+            opts["expireAfterSeconds"] = self.expire_after_seconds
+        return opts
+
+
+def _unico(campo: str) -> IndexSpec:
+    return IndexSpec(f"uniq_{campo}", ((campo, 1),), unique=True)
+
+
+def _simples(campo: str) -> IndexSpec:
+    return IndexSpec(f"idx_{campo.replace('.', '_')}", ((campo, 1),))
+
+
+INDEX_REGISTRY: Dict[str, List[IndexSpec]] = {
+    "areas": [_unico("id_area")],
+    "cargos": [_unico("id_cargo")],
+    "perfis": [_unico("id_perfil")],
+    "tags": [_unico("id_tag")],
+    "colaboradores": [
+        _unico("id_colaborador"),
+        _unico("email"),
+        # A checagem de duplicados da importação faz $or entre email e cpf: sem índice
+        # nos dois ramos o $or vira COLLSCAN a cada bloco
+        _simples("cpf"),
+        _simples("ativo"),
+        IndexSpec("idx_cargo_area", (("id_cargo", 1), ("id_area", 1))),
+    ],
+    "cursos": [
+        _unico("id_curso"),
+        # Índice único em (slug, modalidade) para evitar duplicidade de título por modalidade.
+        # partialFilterExpression evita conflitos com documentos antigos sem slug.
+        IndexSpec(
+            "uniq_slug_modalidade",
+            (("slug", 1), ("modalidade", 1)),
+            unique=True,
+            partial={"slug": {"$exists": True}},
+        ),
+        IndexSpec("idx_tipo_treinamento_id", (("tipo_treinamento", 1), ("id_curso", 1))),
+    ],
+    "trilhas": [
+        _unico("id_trilha"),
+        IndexSpec("idx_obrigatoria_id", (("obrigatoria", 1), ("id_trilha", 1))),
+    ],
+    "curso_trilha": [
+        _unico("id_curso_trilha"),
+        _simples("id_curso"),
+        IndexSpec("idx_trilha_ordem", (("id_trilha", 1), ("ordem", 1))),
+    ],
+    "regras_obrigatorias": [
+        _unico("id_regra"),
+        _simples("id_cargo"),
+        _simples("id_area"),
+    ],
+    "inscricoes": [
+        _unico("id_inscricao"),
+        IndexSpec("idx_colaborador_status", (("id_colaborador", 1), ("status", 1))),
+        IndexSpec("idx_curso_status", (("id_curso", 1), ("status", 1))),
+        _simples("status"),
+        _simples("data_inscricao"),
+    ],
+    "progressos": [
+        _unico("id_progresso"),
+        _simples("id_inscricao"),
+    ],
+    "evidencias": [
+        _unico("id_evidencia"),
+        _simples("id_inscricao"),
+    ],
+    "certificados": [
+        _unico("id_certificado"),
+        _simples("id_inscricao"),
+        _simples("status"),
+        _simples("data_emissao"),
+        # Varredura de vencimento: certificados ativos por data_validade
+        IndexSpec("idx_status_validade", (("status", 1), ("data_validade", 1))),
+    ],
+    "alertas_vencimento": [
+        IndexSpec("uniq_certificado_tipo", (("id_certificado", 1), ("tipo", 1)), unique=True),
+        IndexSpec("idx_colaborador_criado", (("id_colaborador", 1), ("criado_em", -1))),
+    ],
+    "conformidade": [
+        _unico("id_colaborador"),
+        IndexSpec("idx_area_cargo_colaborador", (("id_area", 1), ("id_cargo", 1), ("id_colaborador", 1))),
+        IndexSpec("idx_cargo_colaborador", (("id_cargo", 1), ("id_colaborador", 1))),
+        IndexSpec("idx_obrigacoes_status", (("obrigacoes.status", 1), ("id_colaborador", 1))),
+        _simples("calculado_em"),
+    ],
+    "auditoria_arquivos": [
+        IndexSpec("idx_inicio", (("inicio", -1),)),
+    ],
+    "tarefas_relatorio": [
+        _unico("id_tarefa"),
+        IndexSpec("idx_criada_em", (("criada_em", -1),)),
+        # Listagem das tarefas de quem pediu (GET /relatorios/tarefas)
+        IndexSpec("idx_colaborador_criada_em", (("id_colaborador", 1), ("criada_em", -1))),
+    ],
+    "tarefas_auto_inscricao": [
+        _unico("id_tarefa"),
+        IndexSpec("idx_criada_em", (("criada_em", -1),)),
+    ],
+    # Coleção única de antes do particionamento mensal; as partições auditoria_AAAAMM
+    # têm seus índices em auditoria.INDICES_PARTICAO, criados na primeira escrita
+    "auditoria": [
+        _unico("id_auditoria"),
+        IndexSpec("idx_colaborador_data", (("id_colaborador_acao", 1), ("data_hora", -1))),
+    ],
+}
+
+
+def _normalizar(info: dict) -> dict:
+    # Extrai de index_information() apenas o que comparamos com o registro
+    return {
+        # Índices "text", "2dsphere" e "hashed" (criados à mão) têm o tipo como valor
+        "keys": tuple((k, v if isinstance(v, str) else int(v)) for k, v in info["key"]),
+        "unique": bool(info.get("unique", False)),
+        "partial": info.get("partialFilterExpression"),
+        "expire_after_seconds": info.get("expireAfterSeconds"),
+    }
+
+
+def _esperado(spec: IndexSpec) -> dict:
+    return {
+        "keys": spec.keys,
+        "unique": spec.unique,
+        "partial": spec.partial,
+        "expire_after_seconds": spec.expire_after_seconds,
+    }
+
+
+async def reconcile(db, registry: Dict[str, List[IndexSpec]] = None) -> dict:
+    # Cria os índices ausentes e devolve um relatório de divergências por coleção:
+    # {"criados": [...], "divergentes": [...], "extras": [...], "erros": [...]}
+    registry = INDEX_REGISTRY if registry is None else registry
+    relatorio = {"criados": [], "divergentes": [], "extras": [], "erros": []}
+    for colecao, specs in registry.items():
+        try:
+            existentes = await db[colecao].index_information()
+        except OperationFailure:
+            existentes = {}
+        por_chave = {_normalizar(info)["keys"]: nome for nome, info in existentes.items()}
+        esperados = set()
+        for spec in specs:
+            esperados.add(spec.name)
+            atual = existentes.get(spec.name)
+            if atual is not None:
+                if _normalizar(atual) != _esperado(spec):
+                    relatorio["divergentes"].append(f"{colecao}.{spec.name}")
+                continue
+            if spec.keys in por_chave:
+                # Mesmo conjunto de chaves com outro nome: já atende às consultas
+                relatorio["divergentes"].append(f"{colecao}.{spec.name} (existe como {por_chave[spec.keys]})")
+                esperados.add(por_chave[spec.keys])
+                continue
+            try:
+                await db[colecao].create_index(list(spec.keys), **spec.options())
+                relatorio["criados"].append(f"{colecao}.{spec.name}")
+            except OperationFailure as exc:
+                # Ex: dados duplicados impedem um índice único
+                relatorio["erros"].append(f"{colecao}.{spec.name}: {exc}")
+        for nome in existentes:
+            if nome != "_id_" and nome not in esperados:
+                relatorio["extras"].append(f"{colecao}.{nome}")
+
+    for tipo in ("criados", "divergentes", "extras"):
+        if relatorio[tipo]:
+            logger.info("Índices %s: %s", tipo, ", ".join(relatorio[tipo]))
+    for erro in relatorio["erros"]:
+        logger.error("Falha ao criar índice %s", erro)
+    return relatorio
@@ -0,0 +1,461 @@
+# Teste de carga da API: massa sintética, misturas de cenários e comparação com baseline
+# O backend_test.py só confere, em sequência, se cada rota responde. Aqui medimos
+# desempenho de forma reproduzível:
+#
+#   1) semear: recria o banco LOAD_DB_NAME com uma massa sintética na escala pedida
+#      (colaboradores, cursos, inscrições, certificados) e reconcilia os índices.
+#      Todos os colaboradores têm a senha LOAD_SENHA; o hash do bcrypt é calculado
+#      uma vez só e reaproveitado, senão semear 50 mil levaria horas.
+#   2) rodar: `--concorrencia` usuários virtuais fazem login e, durante `--duracao`
+#      segundos, sorteiam operações com os pesos da mistura escolhida (mesma
+#      `--semente`, mesma sequência de sorteios por usuário). O aquecimento não entra
+#      nas medidas. Por operação: requisições, erros, vazão e p50/p95/p99.
+#
+# Reprodutibilidade: POST /api/inscricoes só usa os `--reservados` colaboradores que
+# o semear cria sem nenhuma inscrição (IDs depois da massa), em pares (colaborador,
+# curso) que não se repetem na execução. As inscrições e progressos desses
+# colaboradores são apagados antes e depois de cada `rodar`, então toda execução
+# começa com o mesmo volume de dados. A escala semeada fica em db.carga, e o
+# `rodar` a lê de lá (precisa de MONGO_URL além da URL do servidor). Só a
+# auditoria cresce entre execuções, e nenhum cenário a consulta.
+#
+# O resultado vai para load_test_results.json, ao lado do test_results_detailed.json.
+# Com --baseline, cada operação é comparada com a execução guardada: p95 acima de
+# (1 + tolerância) x baseline (mais `--folga-ms`, para latências muito pequenas),
+# vazão abaixo de (1 - tolerância) x baseline ou taxa de erros maior que a do
+# baseline + 1 ponto percentual contam como regressão e o script sai com código 1.
+#
+# O servidor precisa estar rodando com DB_NAME igual ao LOAD_DB_NAME. Requer o httpx
+# (pip install -r requirements-dev.txt).
+# Uso:
+#   python load_test.py semear --colaboradores 50000 --cursos 2000 --inscricoes 1000000
+#   DB_NAME=techsolutions_carga uvicorn server:app --port 8001 --workers 4
+#   python load_test.py rodar --mistura misto --concorrencia 100 --duracao 60 --salvar-baseline
+#   python load_test.py rodar --mistura misto --concorrencia 100 --duracao 60 --baseline ../load_test_baseline.json
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import bcrypt
+import httpx
+from motor.motor_asyncio import AsyncIOMotorClient
+
+import indexes
+from load_test_login import percentil
+from migrar_datas import MIGRACAO_ID
+
+BASE_URL = os.environ.get('BACKEND_URL', 'http://localhost:8001')
+MONGO = os.environ.get('MONGO_URL', 'mongodb://localhost:27017/')
+DBNAME = os.environ.get('LOAD_DB_NAME', 'techsolutions_carga')
+SENHA = os.environ.get('LOAD_SENHA', 'carga123')
+
+RAIZ = Path(__file__).parent.parent
+RESULTADOS = RAIZ / 'load_test_results.json'
+BASELINE = RAIZ / 'load_test_baseline.json'
+
+TIPOS = ["nr31", "operacao_maquinas", "agrotoxicos", "primeiros_socorros", "prevencao_acidentes", "outros"]
+MODALIDADES = ["presencial", "online_sincrono", "online_assincrono"]
+# Distribuição dos status das inscrições semeadas (aproxima uma base em uso)
+STATUS = ["pendente"] * 3 + ["em_andamento"] * 2 + ["concluido"] * 4 + ["vencido", "cancelado"]
+PALAVRAS = ("seguranca trabalho rural maquinas agricolas tratores colheitadeiras defensivos aplicacao "
+            "armazenamento primeiros socorros prevencao acidentes ergonomia epi manutencao irrigacao "
+            "animais silos eletricidade incendio altura espacos confinados").split()
+NUM_CARGOS = 10
+NUM_AREAS = 7
+
+# =============== SEMEADURA ===============
+
+def _texto(rnd: random.Random, palavras: int) -> str:
+    return " ".join(rnd.choice(PALAVRAS) for _ in range(palavras))
+
+
+async def _inserir_em_lotes(colecao, gerar, total: int, lote: int, paralelos: int = 4):
+    # gerar(inicio, fim) devolve os documentos com IDs de inicio+1 a fim
+    semaforo = asyncio.Semaphore(paralelos)
+
+    async def inserir(inicio: int):
+        async with semaforo:
+            await colecao.insert_many(gerar(inicio, min(inicio + lote, total)), ordered=False)
+
+    await asyncio.gather(*(inserir(inicio) for inicio in range(0, total, lote)))
+
+
+async def semear(args):
+    client = AsyncIOMotorClient(MONGO, tz_aware=True)
+    db = client[DBNAME]
+    rnd = random.Random(args.semente)
+    agora = datetime.now(timezone.utc)
+    inicio = time.perf_counter()
+    try:
+        await client.drop_database(DBNAME)
+        senha_hash = bcrypt.hashpw(SENHA.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+
+        await db.perfis.insert_many([
+            {"id_perfil": 1, "nome": "Administrador", "permissoes": ["admin"]},
+            {"id_perfil": 2, "nome": "Colaborador", "permissoes": []},
+        ])
+        await db.cargos.insert_many([
+            {"id_cargo": i, "nome": f"Cargo {i}", "descricao": None, "requer_nr31": i % 2 == 0}
+            for i in range(1, NUM_CARGOS + 1)
+        ])
+        await db.areas.insert_many([
+            {"id_area": i, "nome": f"Área {i}", "departamento": "Produção", "localizacao": None}
+            for i in range(1, NUM_AREAS + 1)
+        ])
+
+        total_colab, total_cursos, total_insc = args.colaboradores, args.cursos, args.inscricoes
+        if total_insc > total_colab * total_cursos:
+            raise SystemExit("--inscricoes maior que colaboradores x cursos")
+
+        # Colaborador 1 é o administrador (usado nos cenários que exigem permissão)
+        await _inserir_em_lotes(db.colaboradores, lambda a, b: [
+            {"id_colaborador": i, "nome": f"Colaborador {i}", "email": f"carga{i}@example.com",
+             "cpf": f"{i:011d}", "senha_hash": senha_hash, "id_cargo": i % NUM_CARGOS + 1,
+             "id_area": i % NUM_AREAS + 1, "id_perfil": 1 if i == 1 else 2, "id_gestor": None,
+             "data_admissao": agora - timedelta(days=i % 3650), "ativo": i % 50 != 0 or i > total_colab}
+            for i in range(a + 1, b + 1)
+        ], total_colab + args.reservados, args.lote)
+
+        await db.cursos.insert_many([
+            {"id_curso": i, "titulo": f"{_texto(rnd, 3).title()} {i}", "slug": f"curso-{i}",
+             "descricao": _texto(rnd, 20), "carga_horaria": rnd.choice([4, 8, 16, 20, 40]),
+             "modalidade": rnd.choice(MODALIDADES), "tipo_treinamento": rnd.choice(TIPOS),
+             "norma_referencia": rnd.choice(["NR-31", "NR-12", "NR-10", None]), "publico_alvo": _texto(rnd, 4),
+             "instrutores": None, "permite_auto_inscricao": i % 4 == 0, "tags": [],
+             "conteudo_programatico": _texto(rnd, 40)}
+            for i in range(1, total_cursos + 1)
+        ])
+
+        # Pares (colaborador, curso) sem repetição: o colaborador c recebe os cursos
+        # c+1, c+2, ... (módulo o total de cursos), um por "volta" sobre os colaboradores
+        def inscricao(i: int) -> dict:
+            id_colaborador = i % total_colab + 1
+            status = STATUS[i % len(STATUS)]
+            data = agora - timedelta(days=i % 720, minutes=i % 1440)
+            return {
+                "id_inscricao": i + 1, "id_colaborador": id_colaborador,
+                "id_curso": (i // total_colab + id_colaborador) % total_cursos + 1,
+                "data_inscricao": data, "data_prevista": data + timedelta(days=30), "status": status,
+                "tipo_inscricao": "manual" if i % 3 else "automatica",
+                "data_conclusao": data + timedelta(days=10) if status in ("concluido", "vencido") else None,
+                "nota": 8.0 if status == "concluido" else None, "aprovado": status == "concluido",
+            }
+
+        await _inserir_em_lotes(db.inscricoes, lambda a, b: [inscricao(i) for i in range(a, b)],
+                                total_insc, args.lote)
+
+        # Certificados para as primeiras inscrições concluídas ou vencidas (até --certificados)
+        concluidas = [i for i in range(min(total_insc, args.certificados * 3))
+                      if STATUS[i % len(STATUS)] in ("concluido", "vencido")][:args.certificados]
+        await _inserir_em_lotes(db.certificados, lambda a, b: [
+            {"id_certificado": n + 1, "id_inscricao": concluidas[n] + 1, "codigo_verificacao": f"CARGA-{n + 1}",
+             "data_emissao": agora - timedelta(days=concluidas[n] % 720),
+             "data_validade": agora + timedelta(days=365 - concluidas[n] % 720),
+             "status": "vencido" if STATUS[concluidas[n] % len(STATUS)] == "vencido" else "ativo"}
+            for n in range(a, b)
+        ], len(concluidas), args.lote)
+
+        # O servidor continua a numeração depois da massa e já lê as datas como nativas
+        await asyncio.gather(*(
+            db.counters.update_one({"_id": nome}, {"$set": {"seq": seq}}, upsert=True)
+            for nome, seq in (("perfis", 2), ("cargos", NUM_CARGOS), ("areas", NUM_AREAS),
+                              ("colaboradores", total_colab + args.reservados), ("cursos", total_cursos),
+                              ("inscricoes", total_insc), ("certificados", len(concluidas)))
+        ))
+        await db.migracoes.update_one({"_id": MIGRACAO_ID}, {"$set": {"concluida": True}}, upsert=True)
+        await db.carga.replace_one({"_id": "escala"}, {
+            "colaboradores": total_colab, "cursos": total_cursos, "reservados": args.reservados}, upsert=True)
+        relatorio = await indexes.reconcile(db)
+    finally:
+        client.close()
+    print(f'{DBNAME}: {total_colab} colaboradores (+{args.reservados} reservados), {total_cursos} cursos, '
+          f'{total_insc} inscrições, '
+          f'{len(concluidas)} certificados, {len(relatorio["criados"])} índices em '
+          f'{time.perf_counter() - inicio:.1f}s')
+
+async def limpar_reservados(db, escala: dict) -> int:
+    # Apaga o que o cenário de inscrição criou: deixa a massa como o semear deixou
+    filtro = {"id_colaborador": {"$gt": escala["colaboradores"]}}
+    ids = await db.inscricoes.distinct("id_inscricao", filtro)
+    for inicio in range(0, len(ids), 10000):
+        await db.progressos.delete_many({"id_inscricao": {"$in": ids[inicio:inicio + 10000]}})
+    await db.inscricoes.delete_many(filtro)
+    return len(ids)
+
+# =============== CENÁRIOS ===============
+
+class UsuarioVirtual:
+    def __init__(self, client: httpx.AsyncClient, rnd: random.Random, escala: dict, pares: Iterator[int]):
+        self.client = client
+        self.rnd = rnd
+        self.escala = escala
+        # Contador compartilhado entre os usuários: cada inscrição usa um par novo
+        self.pares = pares
+        self.headers: Dict[str, str] = {}
+
+    def _id_colaborador(self) -> int:
+        return self.rnd.randint(1, self.escala['colaboradores'])
+
+    async def logar(self, id_colaborador: Optional[int] = None) -> httpx.Response:
+        # Colaboradores múltiplos de 50 foram semeados inativos: sorteamos outro
+        id_colaborador = id_colaborador or self._id_colaborador()
+        if id_colaborador % 50 == 0:
+            id_colaborador += 1
+        return await self.client.post('/api/auth/login', json={
+            'email': f'carga{id_colaborador}@example.com', 'senha': SENHA})
+
+    async def entrar(self):
+        # Todos entram como administrador: algumas rotas dos cenários exigem a permissão
+        resp = await self.logar(1)
+        resp.raise_for_status()
+        self.headers = {'Authorization': f"Bearer {resp.json()['access_token']}"}
+
+    async def login(self):
+        return await self.logar()
+
+    async def dashboard(self):
+        return await self.client.get('/api/dashboard/stats', headers=self.headers)
+
+    async def painel(self):
+        return await self.client.get(f'/api/colaboradores/{self._id_colaborador()}/painel', headers=self.headers)
+
+    async def inscricao(self):
+        # Par n: colaborador reservado n % reservados, curso n // reservados (sem repetição)
+        n = next(self.pares)
+        reservados = self.escala['reservados']
+        return await self.client.post('/api/inscricoes', headers=self.headers, json={
+            'id_colaborador': self.escala['colaboradores'] + 1 + n % reservados,
+            'id_curso': (n // reservados) % self.escala['cursos'] + 1})
+
+    async def lista_cursos(self):
+        return await self.client.get('/api/cursos', headers=self.headers, params={'limit': 100})
+
+    async def lista_colaboradores(self):
+        # Página a partir de um ponto aleatório (paginação por cursor ?after=)
+        return await self.client.get('/api/colaboradores', headers=self.headers,
+                                     params={'after': self._id_colaborador(), 'limit': 100})
+
+    async def lista_inscricoes(self):
+        return await self.client.get('/api/inscricoes', headers=self.headers,
+                                     params={'id_colaborador': self._id_colaborador()})
+
+    async def busca_cursos(self):
+        return await self.client.get('/api/cursos/busca', headers=self.headers,
+                                     params={'q': self.rnd.choice(PALAVRAS)[:self.rnd.randint(3, 6)]})
+
+
+# Nome da operação no relatório -> método do UsuarioVirtual
+OPERACOES = {
+    'POST /api/auth/login': UsuarioVirtual.login,
+    'GET /api/dashboard/stats': UsuarioVirtual.dashboard,
+    'GET /api/colaboradores/{id}/painel': UsuarioVirtual.painel,
+    'POST /api/inscricoes': UsuarioVirtual.inscricao,
+    'GET /api/cursos': UsuarioVirtual.lista_cursos,
+    'GET /api/colaboradores': UsuarioVirtual.lista_colaboradores,
+    'GET /api/inscricoes': UsuarioVirtual.lista_inscricoes,
+    'GET /api/cursos/busca': UsuarioVirtual.busca_cursos,
+}
+
+# Pesos de cada operação por mistura
+MISTURAS: Dict[str, Dict[str, float]] = {
+    'login': {'POST /api/auth/login': 1},
+    'dashboard': {'GET /api/dashboard/stats': 3, 'GET /api/colaboradores/{id}/painel': 1},
+    'inscricao': {'POST /api/inscricoes': 1},
+    'lista': {'GET /api/cursos': 2, 'GET /api/colaboradores': 1, 'GET /api/inscricoes': 2},
+    'misto': {
+        'POST /api/auth/login': 1,
+        'GET /api/dashboard/stats': 3,
+        'GET /api/colaboradores/{id}/painel': 2,
+        'POST /api/inscricoes': 1,
+        'GET /api/cursos': 4,
+        'GET /api/colaboradores': 1,
+        'GET /api/inscricoes': 3,
+        'GET /api/cursos/busca': 2,
+    },
+}
+
+
+async def _usuario(usuario: UsuarioVirtual, mistura: Dict[str, float], medir_a_partir: float, fim: float,
+                   latencias: Dict[str, List[float]], status: Dict[str, Counter]):
+    nomes, pesos = list(mistura), list(mistura.values())
+    while time.perf_counter() < fim:
+        nome = usuario.rnd.choices(nomes, pesos)[0]
+        inicio = time.perf_counter()
+        try:
+            codigo = (await OPERACOES[nome](usuario)).status_code
+        except httpx.HTTPError as exc:
+            codigo = type(exc).__name__
+        if inicio >= medir_a_partir:
+            latencias[nome].append(time.perf_counter() - inicio)
+            status[nome][str(codigo)] += 1
+
+
+def _resumo(latencias: List[float], status: Counter, duracao: float) -> dict:
+    ms = [v * 1000 for v in latencias]
+    erros = sum(n for codigo, n in status.items() if not codigo.startswith('2'))
+    return {
+        'requisicoes': len(ms),
+        'erros': erros,
+        'taxa_erros': round(erros / len(ms), 4) if ms else 0.0,
+        'status': dict(status),
+        'vazao_rps': round(len(ms) / duracao, 2),
+        'media_ms': round(sum(ms) / len(ms), 2) if ms else 0.0,
+        'p50_ms': round(percentil(ms, 50), 2),
+        'p95_ms': round(percentil(ms, 95), 2),
+        'p99_ms': round(percentil(ms, 99), 2),
+        'max_ms': round(max(ms), 2) if ms else 0.0,
+    }
+
+
+async def rodar(args) -> dict:
+    mongo = AsyncIOMotorClient(MONGO, tz_aware=True)
+    db = mongo[DBNAME]
+    try:
+        escala = await db.carga.find_one({"_id": "escala"})
+        if escala is None:
+            raise SystemExit(f'{DBNAME} sem massa de carga: rode "python load_test.py semear" antes')
+        if 'POST /api/inscricoes' in MISTURAS[args.mistura] and not escala['reservados']:
+            raise SystemExit('a mistura inscreve colaboradores: semeie com --reservados maior que zero')
+        await limpar_reservados(db, escala)
+        try:
+            return await _rodar(args, escala)
+        finally:
+            await limpar_reservados(db, escala)
+    finally:
+        mongo.close()
+
+
+async def _rodar(args, escala: dict) -> dict:
+    mistura = MISTURAS[args.mistura]
+    latencias: Dict[str, List[float]] = {nome: [] for nome in mistura}
+    status: Dict[str, Counter] = {nome: Counter() for nome in mistura}
+    limites = httpx.Limits(max_connections=args.concorrencia + 10)
+    pares = itertools.count()
+    async with httpx.AsyncClient(base_url=args.url, timeout=60, limits=limites) as client:
+        usuarios = [UsuarioVirtual(client, random.Random(args.semente * 100003 + i), escala, pares)
+                    for i in range(args.concorrencia)]
+        await asyncio.gather(*(usuario.entrar() for usuario in usuarios))
+        inicio = time.perf_counter()
+        medir_a_partir = inicio + args.aquecimento
+        fim = medir_a_partir + args.duracao
+        await asyncio.gather(*(_usuario(usuario, mistura, medir_a_partir, fim, latencias, status)
+                               for usuario in usuarios))
+        duracao = time.perf_counter() - medir_a_partir
+
+    todas = [v for valores in latencias.values() for v in valores]
+    return {
+        'executado_em': datetime.now(timezone.utc).isoformat(),
+        'url': args.url,
+        'mistura': args.mistura,
+        'concorrencia': args.concorrencia,
+        'duracao_s': round(duracao, 2),
+        'aquecimento_s': args.aquecimento,
+        'semente': args.semente,
+        'escala': {campo: escala[campo] for campo in ('colaboradores', 'cursos', 'reservados')},
+        'total': _resumo(todas, sum(status.values(), Counter()), duracao),
+        'operacoes': {nome: _resumo(latencias[nome], status[nome], duracao) for nome in mistura},
+    }
+
+# =============== BASELINE ===============
+
+def comparar(atual: dict, baseline: dict, tolerancia: float, folga_ms: float) -> List[str]:
+    regressoes = []
+    if (atual['mistura'], atual['concorrencia']) != (baseline['mistura'], baseline['concorrencia']):
+        print(f"aviso: baseline com mistura/concorrência diferentes "
+              f"({baseline['mistura']}/{baseline['concorrencia']})")
+    if atual.get('escala') != baseline.get('escala'):
+        print(f"aviso: baseline medido com outra massa ({baseline.get('escala')})")
+    for nome, base in baseline['operacoes'].items():
+        if not base['requisicoes']:
+            continue
+        medida = atual['operacoes'].get(nome)
+        if medida is None or not medida['requisicoes']:
+            # Rota que caiu de vez (ou cujas conexões falharam todas) não pode passar
+            # pelo portão por não ter latência para comparar
+            regressoes.append(f"{nome}: nenhuma requisição medida (baseline {base['requisicoes']})")
+            continue
+        if medida['p95_ms'] > base['p95_ms'] * (1 + tolerancia) + folga_ms:
+            regressoes.append(f"{nome}: p95 {medida['p95_ms']} ms (baseline {base['p95_ms']} ms)")
+        if medida['vazao_rps'] < base['vazao_rps'] * (1 - tolerancia):
+            regressoes.append(f"{nome}: vazão {medida['vazao_rps']} req/s (baseline {base['vazao_rps']} req/s)")
+        if medida['taxa_erros'] > base['taxa_erros'] + 0.01:
+            regressoes.append(f"{nome}: erros {medida['taxa_erros']:.2%} (baseline {base['taxa_erros']:.2%})")
+    return regressoes
+
+
+def imprimir(resultado: dict):
+    print(f"\nmistura={resultado['mistura']} concorrência={resultado['concorrencia']} "
+          f"duração={resultado['duracao_s']}s")
+    linhas = [*resultado['operacoes'].items(), ('TOTAL', resultado['total'])]
+    for nome, r in linhas:
+        print(f"{nome:<36} n={r['requisicoes']:<7} {r['vazao_rps']:8.1f} req/s  p50={r['p50_ms']:8.1f}  "
+              f"p95={r['p95_ms']:8.1f}  p99={r['p99_ms']:8.1f} ms  erros={r['erros']}")
+
+
+def _gravar(caminho: Path, dados: dict):
+    with open(caminho, 'w', encoding='utf-8') as f:
+        json.dump(dados, f, indent=2, ensure_ascii=False)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    comandos = parser.add_subparsers(dest='comando', required=True)
+
+    p_semear = comandos.add_parser('semear', help=f'recria o banco {DBNAME} com massa sintética')
+    p_semear.add_argument('--colaboradores', type=int, default=50000)
+    p_semear.add_argument('--cursos', type=int, default=2000)
+    p_semear.add_argument('--inscricoes', type=int, default=1000000)
+    p_semear.add_argument('--certificados', type=int, default=100000)
+    p_semear.add_argument('--reservados', type=int, default=5000,
+                          help='colaboradores sem inscrições, usados só pelo cenário de inscrição')
+    p_semear.add_argument('--lote', type=int, default=10000)
+    p_semear.add_argument('--semente', type=int, default=42)
+
+    p_rodar = comandos.add_parser('rodar', help='executa uma mistura de cenários contra o servidor')
+    p_rodar.add_argument('--url', default=BASE_URL)
+    p_rodar.add_argument('--mistura', choices=sorted(MISTURAS), default='misto')
+    p_rodar.add_argument('--concorrencia', type=int, default=50)
+    p_rodar.add_argument('--duracao', type=float, default=30.0, help='segundos medidos')
+    p_rodar.add_argument('--aquecimento', type=float, default=5.0, help='segundos iniciais descartados')
+    p_rodar.add_argument('--semente', type=int, default=42)
+    p_rodar.add_argument('--saida', type=Path, default=RESULTADOS)
+    p_rodar.add_argument('--baseline', type=Path, help='compara com esta execução e falha se houver regressão')
+    p_rodar.add_argument('--salvar-baseline', action='store_true', help=f'grava esta execução em {BASELINE.name}')
+    p_rodar.add_argument('--tolerancia', type=float, default=0.2, help='fração de piora aceita (0.2 = 20%%)')
+    p_rodar.add_argument('--folga-ms', type=float, default=5.0, help='piora absoluta de p95 sempre aceita')
+    args = parser.parse_args()
+
+    if args.comando == 'semear':
+        asyncio.run(semear(args))
+        return 0
+
+    resultado = asyncio.run(rodar(args))
+    imprimir(resultado)
+    _gravar(args.saida, resultado)
+    print(f'\nresultados em {args.saida}')
+    if args.salvar_baseline:
+        _gravar(BASELINE, resultado)
+        print(f'baseline gravado em {BASELINE}')
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressoes = comparar(resultado, baseline, args.tolerancia, args.folga_ms)
+        if regressoes:
+            print('\nREGRESSÕES em relação ao baseline:', *regressoes, sep='\n  ')
+            return 1
+        print('\nsem regressões em relação ao baseline')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
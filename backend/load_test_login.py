@@ -0,0 +1,93 @@
+# Teste de carga: latência de GET /api/cursos durante uma tempestade de logins
+# Mede p50/p95/p99 de chamadas "não relacionadas" a /api/cursos primeiro sem carga
+# e depois enquanto N logins concorrentes atingem /api/auth/login. Com o bcrypt
+# fora do event loop, a latência de /api/cursos deve ficar praticamente estável.
+#
+# Requer um servidor rodando e o httpx (pip install -r requirements-dev.txt).
+# Uso: python load_test_login.py --email joao@example.com --senha senha123 [--logins 200]
+
+import argparse
+import asyncio
+import os
+import time
+from collections import Counter
+
+import httpx
+
+BASE_URL = os.environ.get('BACKEND_URL', 'http://localhost:8001')
+
+
+def percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    k = min(len(ordenados) - 1, max(0, int(round(p / 100 * len(ordenados))) - 1))
+    return ordenados[k]
+
+
+def resumo(nome, latencias):
+    ms = [v * 1000 for v in latencias]
+    print(f'{nome:<28} n={len(ms):<5} p50={percentil(ms, 50):8.1f} ms  '
+          f'p95={percentil(ms, 95):8.1f} ms  p99={percentil(ms, 99):8.1f} ms')
+
+
+async def sondar_cursos(client, headers, parar, latencias):
+    # Chamadas sequenciais a /api/cursos até o evento `parar`
+    while not parar.is_set():
+        inicio = time.perf_counter()
+        resp = await client.get('/api/cursos', headers=headers)
+        resp.raise_for_status()
+        latencias.append(time.perf_counter() - inicio)
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--email', required=True)
+    parser.add_argument('--senha', required=True)
+    parser.add_argument('--logins', type=int, default=200)
+    parser.add_argument('--sondas', type=int, default=4, help='clientes concorrentes em /api/cursos')
+    parser.add_argument('--baseline', type=float, default=3.0, help='segundos de medição sem carga')
+    args = parser.parse_args()
+
+    limites = httpx.Limits(max_connections=args.logins + args.sondas + 10)
+    async with httpx.AsyncClient(base_url=BASE_URL, timeout=60, limits=limites) as client:
+        credenciais = {'email': args.email, 'senha': args.senha}
+        resp = await client.post('/api/auth/login', json=credenciais)
+        resp.raise_for_status()
+        headers = {'Authorization': f"Bearer {resp.json()['access_token']}"}
+
+        # 1) Linha de base: /api/cursos sem logins concorrentes
+        parar = asyncio.Event()
+        base = []
+        sondas = [asyncio.create_task(sondar_cursos(client, headers, parar, base)) for _ in range(args.sondas)]
+        await asyncio.sleep(args.baseline)
+        parar.set()
+        await asyncio.gather(*sondas)
+
+        # 2) Tempestade de logins com as sondas rodando em paralelo
+        parar = asyncio.Event()
+        sob_carga = []
+        sondas = [asyncio.create_task(sondar_cursos(client, headers, parar, sob_carga)) for _ in range(args.sondas)]
+        status_logins = Counter()
+        latencias_login = []
+
+        async def logar():
+            inicio = time.perf_counter()
+            r = await client.post('/api/auth/login', json=credenciais)
+            latencias_login.append(time.perf_counter() - inicio)
+            status_logins[r.status_code] += 1
+
+        inicio = time.perf_counter()
+        await asyncio.gather(*(logar() for _ in range(args.logins)))
+        duracao = time.perf_counter() - inicio
+        parar.set()
+        await asyncio.gather(*sondas)
+
+    print(f'{args.logins} logins concorrentes em {duracao:.2f}s  status: {dict(status_logins)}')
+    resumo('GET /api/cursos (sem carga)', base)
+    resumo('GET /api/cursos (com logins)', sob_carga)
+    resumo('POST /api/auth/login', latencias_login)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
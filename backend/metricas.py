@@ -0,0 +1,408 @@
+# Métricas no formato de texto do Prometheus (GET /metrics)
+# Latência por rota (histograma), requisições em andamento, erros, atraso do event
+# loop, espera por conexão no pool do Motor e fila do pool de senhas (bcrypt).
+#
+# Sem locks: contadores e histogramas guardam um fragmento por thread (o listener do
+# pool de conexões roda nas threads do Motor). Cada thread só altera o próprio
+# fragmento e a leitura soma cópias feitas com dict()/list(), que são atômicas sob o
+# GIL. Medidores (gauges) só são alterados no event loop.
+#
+# Vários workers do uvicorn: com METRICAS_DIR, cada worker grava seu instantâneo em
+# <dir>/metricas_<pid>.json a cada `intervalo` segundos (escrita em .tmp + rename).
+# Quem atende o /metrics junta o próprio estado atual com os arquivos dos outros:
+# contadores e histogramas somam (inclusive de workers que já morreram, para o total
+# não voltar para trás); medidores só contam workers vivos, somados ou pelo máximo.
+# O diretório deve começar vazio a cada deploy (tmpfs, por exemplo).
+
+import asyncio
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+
+LIMITES_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LIMITES_ESPERA = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+
+Rotulos = Tuple[str, ...]
+
+
+def _escapar(valor: str) -> str:
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _rotulos_texto(nomes: Sequence[str], valores: Sequence[str], extra: str = "") -> str:
+    pares = [f'{nome}="{_escapar(valor)}"' for nome, valor in zip(nomes, valores)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+def _numero(valor: float) -> str:
+    if valor == float("inf"):
+        return "+Inf"
+    return repr(float(valor))
+
+
+class _Metrica:
+    tipo = ""
+
+    def __init__(self, nome: str, ajuda: str, rotulos: Sequence[str] = ()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+
+    def descricao(self) -> dict:
+        return {"tipo": self.tipo, "ajuda": self.ajuda, "rotulos": list(self.rotulos)}
+
+
+class _Fragmentada(_Metrica):
+    def __init__(self, nome: str, ajuda: str, rotulos: Sequence[str] = ()):
+        super().__init__(nome, ajuda, rotulos)
+        self._fragmentos: Dict[int, dict] = {}
+
+    def _fragmento(self) -> dict:
+        ident = threading.get_ident()
+        fragmento = self._fragmentos.get(ident)
+        if fragmento is None:
+            fragmento = self._fragmentos[ident] = {}
+        return fragmento
+
+    def _copias(self) -> List[dict]:
+        return [dict(fragmento) for fragmento in list(self._fragmentos.values())]
+
+
+class Contador(_Fragmentada):
+    tipo = "counter"
+
+    def inc(self, rotulos: Rotulos = (), valor: float = 1.0):
+        fragmento = self._fragmento()
+        fragmento[rotulos] = fragmento.get(rotulos, 0.0) + valor
+
+    def valores(self) -> Dict[Rotulos, float]:
+        total: Dict[Rotulos, float] = {}
+        for fragmento in self._copias():
+            for rotulos, valor in fragmento.items():
+                total[rotulos] = total.get(rotulos, 0.0) + valor
+        return total
+
+
+class Histograma(_Fragmentada):
+    tipo = "histogram"
+
+    def __init__(self, nome: str, ajuda: str, rotulos: Sequence[str] = (),
+                 limites: Sequence[float] = LIMITES_LATENCIA):
+        super().__init__(nome, ajuda, rotulos)
+        self.limites = tuple(sorted(limites))
+
+    def observar(self, valor: float, rotulos: Rotulos = ()):
+        fragmento = self._fragmento()
+        # [contagem por faixa (não acumulada)..., +Inf, soma, contagem]
+        dados = fragmento.get(rotulos)
+        if dados is None:
+            dados = fragmento[rotulos] = [0.0] * (len(self.limites) + 3)
+        dados[bisect_left(self.limites, valor)] += 1
+        dados[-2] += valor
+        dados[-1] += 1
+
+    def valores(self) -> Dict[Rotulos, List[float]]:
+        total: Dict[Rotulos, List[float]] = {}
+        for fragmento in self._copias():
+            for rotulos, dados in fragmento.items():
+                dados = list(dados)
+                atual = total.get(rotulos)
+                total[rotulos] = dados if atual is None else [a + b for a, b in zip(atual, dados)]
+        return total
+
+    def descricao(self) -> dict:
+        return {**super().descricao(), "limites": list(self.limites)}
+
+
+class Medidor(_Metrica):
+    tipo = "gauge"
+
+    def __init__(self, nome: str, ajuda: str, rotulos: Sequence[str] = (), agregacao: str = "soma"):
+        # agregacao entre workers: "soma" (em andamento, fila) ou "max" (atraso do loop)
+        super().__init__(nome, ajuda, rotulos)
+        self.agregacao = agregacao
+        self._valores: Dict[Rotulos, float] = {}
+
+    def definir(self, valor: float, rotulos: Rotulos = ()):
+        self._valores[rotulos] = valor
+
+    def inc(self, rotulos: Rotulos = (), valor: float = 1.0):
+        self._valores[rotulos] = self._valores.get(rotulos, 0.0) + valor
+
+    def dec(self, rotulos: Rotulos = (), valor: float = 1.0):
+        self._valores[rotulos] = self._valores.get(rotulos, 0.0) - valor
+
+    def valores(self) -> Dict[Rotulos, float]:
+        return dict(self._valores)
+
+    def descricao(self) -> dict:
+        return {**super().descricao(), "agregacao": self.agregacao}
+
+
+def _pid_vivo(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class RegistroMetricas:
+    def __init__(self, diretorio: Optional[str] = None, intervalo: float = 5.0):
+        self.diretorio = diretorio
+        self.intervalo = intervalo
+        self._metricas: Dict[str, _Metrica] = {}
+        # Funções chamadas antes de cada leitura, para medidores que refletem estado
+        # de outros componentes (ex.: fila do pool de senhas)
+        self._coletores: List[Callable[[], None]] = []
+        self._tarefa: Optional[asyncio.Task] = None
+
+    def _registrar(self, metrica: _Metrica):
+        if metrica.nome in self._metricas:
+            raise ValueError(f"Métrica já registrada: {metrica.nome}")
+        self._metricas[metrica.nome] = metrica
+        return metrica
+
+    def contador(self, nome: str, ajuda: str, rotulos: Sequence[str] = ()) -> Contador:
+        return self._registrar(Contador(nome, ajuda, rotulos))
+
+    def histograma(self, nome: str, ajuda: str, rotulos: Sequence[str] = (),
+                   limites: Sequence[float] = LIMITES_LATENCIA) -> Histograma:
+        return self._registrar(Histograma(nome, ajuda, rotulos, limites))
+
+    def medidor(self, nome: str, ajuda: str, rotulos: Sequence[str] = (), agregacao: str = "soma") -> Medidor:
+        return self._registrar(Medidor(nome, ajuda, rotulos, agregacao))
+
+    def coletor(self, funcao: Callable[[], None]):
+        self._coletores.append(funcao)
+
+    def instantaneo(self) -> dict:
+        for funcao in self._coletores:
+            try:
+                funcao()
+            except Exception:
+                logger.exception("Falha em coletor de métricas")
+        return {
+            "pid": os.getpid(),
+            "metricas": {
+                nome: {**metrica.descricao(),
+                       "valores": [[list(rotulos), valor] for rotulos, valor in metrica.valores().items()]}
+                for nome, metrica in self._metricas.items()
+            },
+        }
+
+    # ---- multiprocesso ----
+
+    def _arquivo(self, pid: int) -> str:
+        return os.path.join(self.diretorio, f"metricas_{pid}.json")
+
+    def gravar(self):
+        if not self.diretorio:
+            return
+        os.makedirs(self.diretorio, exist_ok=True)
+        caminho = self._arquivo(os.getpid())
+        with open(caminho + ".tmp", "w", encoding="utf-8") as arquivo:
+            json.dump(self.instantaneo(), arquivo)
+        os.replace(caminho + ".tmp", caminho)
+
+    def _outros(self) -> List[dict]:
+        if not self.diretorio:
+            return []
+        instantaneos = []
+        for caminho in glob.glob(os.path.join(self.diretorio, "metricas_*.json")):
+            try:
+                with open(caminho, encoding="utf-8") as arquivo:
+                    dados = json.load(arquivo)
+            except (OSError, ValueError):
+                continue  # arquivo sendo substituído ou corrompido: fica para a próxima leitura
+            if dados.get("pid") != os.getpid():
+                instantaneos.append(dados)
+        return instantaneos
+
+    @staticmethod
+    def _juntar(instantaneos: Iterable[dict]) -> Dict[str, dict]:
+        juntas: Dict[str, dict] = {}
+        for instantaneo in instantaneos:
+            vivo = _pid_vivo(instantaneo["pid"])
+            for nome, metrica in instantaneo["metricas"].items():
+                destino = juntas.setdefault(nome, {**metrica, "valores": {}})
+                if metrica["tipo"] == "gauge" and not vivo:
+                    continue
+                for rotulos, valor in metrica["valores"]:
+                    chave = tuple(rotulos)
+                    atual = destino["valores"].get(chave)
+                    if atual is None:
+                        destino["valores"][chave] = valor
+                    elif metrica["tipo"] == "histogram":
+                        destino["valores"][chave] = [a + b for a, b in zip(atual, valor)]
+                    elif metrica["tipo"] == "gauge" and metrica.get("agregacao") == "max":
+                        destino["valores"][chave] = max(atual, valor)
+                    else:
+                        destino["valores"][chave] = atual + valor
+        return juntas
+
+    def texto(self) -> str:
+        juntas = self._juntar([self.instantaneo(), *self._outros()])
+        linhas: List[str] = []
+        for nome, metrica in juntas.items():
+            linhas.append(f"# HELP {nome} {metrica['ajuda']}")
+            linhas.append(f"# TYPE {nome} {metrica['tipo']}")
+            nomes = metrica["rotulos"]
+            for rotulos, valor in sorted(metrica["valores"].items()):
+                if metrica["tipo"] != "histogram":
+                    linhas.append(f"{nome}{_rotulos_texto(nomes, rotulos)} {_numero(valor)}")
+                    continue
+                acumulado = 0.0
+                for limite, quantidade in zip([*metrica["limites"], float("inf")], valor[:-2]):
+                    acumulado += quantidade
+                    le = 'le="' + _numero(limite) + '"'
+                    linhas.append(f"{nome}_bucket{_rotulos_texto(nomes, rotulos, le)} {_numero(acumulado)}")
+                linhas.append(f"{nome}_sum{_rotulos_texto(nomes, rotulos)} {_numero(valor[-2])}")
+                linhas.append(f"{nome}_count{_rotulos_texto(nomes, rotulos)} {_numero(valor[-1])}")
+        return "\n".join(linhas) + "\n"
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.intervalo)
+            try:
+                await asyncio.to_thread(self.gravar)
+            except Exception:
+                logger.exception("Falha ao gravar métricas em %s", self.diretorio)
+
+    def start(self):
+        if self.diretorio and self._tarefa is None:
+            self._tarefa = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._tarefa is not None:
+            self._tarefa.cancel()
+            try:
+                await self._tarefa
+            except asyncio.CancelledError:
+                pass
+            self._tarefa = None
+        # Último instantâneo: os contadores deste worker continuam somando depois que ele sai
+        if self.diretorio:
+            await asyncio.to_thread(self.gravar)
+
+
+class MonitorEventLoop:
+    # Dorme `intervalo` segundos e mede quanto acordou atrasado: trabalho síncrono no
+    # loop (bcrypt fora do pool, serialização pesada) aparece aqui
+    def __init__(self, registro: RegistroMetricas, intervalo: float = 0.5):
+        self.intervalo = intervalo
+        self.atraso = registro.medidor("event_loop_atraso_segundos",
+                                       "Último atraso medido do event loop", agregacao="max")
+        self.historico = registro.histograma("event_loop_atraso_historico_segundos",
+                                             "Distribuição do atraso do event loop", limites=LIMITES_ESPERA)
+        self._tarefa: Optional[asyncio.Task] = None
+
+    async def _loop(self):
+        while True:
+            inicio = time.monotonic()
+            await asyncio.sleep(self.intervalo)
+            atraso = max(0.0, time.monotonic() - inicio - self.intervalo)
+            self.atraso.definir(atraso)
+            self.historico.observar(atraso)
+
+    def start(self):
+        if self._tarefa is None:
+            self._tarefa = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._tarefa is not None:
+            self._tarefa.cancel()
+            try:
+                await self._tarefa
+            except asyncio.CancelledError:
+                pass
+            self._tarefa = None
+
+
+class MonitorPoolConexoes(monitoring.ConnectionPoolListener):
+    # Tempo entre pedir uma conexão ao pool do driver e recebê-la. Os eventos de uma
+    # mesma retirada acontecem na mesma thread, então o início fica em um threading.local.
+    def __init__(self, registro: RegistroMetricas):
+        self.espera = registro.histograma("mongo_pool_espera_segundos",
+                                          "Espera para obter conexão do pool do MongoDB",
+                                          ("resultado",), limites=LIMITES_ESPERA)
+        self._local = threading.local()
+
+    def connection_check_out_started(self, event):
+        self._local.inicio = time.perf_counter()
+
+    def _fim(self, resultado: str):
+        inicio = getattr(self._local, "inicio", None)
+        if inicio is not None:
+            self._local.inicio = None
+            self.espera.observar(time.perf_counter() - inicio, (resultado,))
+
+    def connection_checked_out(self, event):
+        self._fim("ok")
+
+    def connection_check_out_failed(self, event):
+        self._fim("falha")
+
+    # Os demais eventos do pool não interessam aqui
+    def pool_created(self, event): pass
+    def pool_ready(self, event): pass
+    def pool_cleared(self, event): pass
+    def pool_closed(self, event): pass
+    def connection_created(self, event): pass
+    def connection_ready(self, event): pass
+    def connection_closed(self, event): pass
+    def connection_checked_in(self, event): pass
+
+
+class MetricasMiddleware:
+    # Middleware ASGI puro. A rota é o modelo do caminho (/api/cursos/{id_curso}),
+    # não o caminho recebido, para não criar uma série por ID.
+    def __init__(self, app, registro: RegistroMetricas, ignorar: Sequence[str] = ("/metrics",)):
+        self.app = app
+        self.ignorar = set(ignorar)
+        self.duracao = registro.histograma("http_requisicao_duracao_segundos",
+                                           "Latência das requisições HTTP por rota", ("metodo", "rota"))
+        self.em_andamento = registro.medidor("http_requisicoes_em_andamento",
+                                             "Requisições HTTP sendo atendidas", ("metodo",))
+        self.total = registro.contador("http_requisicoes_total",
+                                       "Requisições HTTP atendidas", ("metodo", "rota", "status"))
+        self.erros = registro.contador("http_erros_total",
+                                       "Respostas 5xx e exceções não tratadas", ("metodo", "rota"))
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.ignorar:
+            await self.app(scope, receive, send)
+            return
+        metodo = scope["method"]
+        status = {"codigo": 500}
+
+        async def enviar(mensagem):
+            if mensagem["type"] == "http.response.start":
+                status["codigo"] = mensagem["status"]
+            await send(mensagem)
+
+        self.em_andamento.inc((metodo,))
+        inicio = time.perf_counter()
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            duracao = time.perf_counter() - inicio
+            self.em_andamento.dec((metodo,))
+            rota = getattr(scope.get("route"), "path", None) or "sem_rota"
+            self.duracao.observar(duracao, (metodo, rota))
+            self.total.inc((metodo, rota, str(status["codigo"])))
+            if status["codigo"] >= 500:
+                self.erros.inc((metodo, rota))
@@ -0,0 +1,113 @@
+# Migração de datas gravadas como string ISO para datas nativas do BSON
+# Versões antigas do server.py salvavam datas com .isoformat(), o que obrigava as
+# listagens a chamar datetime.fromisoformat em cada documento e impedia consultas
+# por intervalo usando índice. Esta ferramenta converte os documentos em lotes
+# (bulk_write) e, ao final, grava a marca `datas_nativas` em db.migracoes. Enquanto
+# a marca não existe, o server.py mantém a leitura dupla (string ou data).
+#
+# Uso: python migrar_datas.py [--lote 1000] [--simular]
+
+import argparse
+import asyncio
+import os
+from datetime import datetime, timezone
+from typing import Dict, List
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+
+MIGRACAO_ID = "datas_nativas"
+
+# Campos de data de cada coleção
+CAMPOS_DATA: Dict[str, List[str]] = {
+    "colaboradores": ["data_admissao"],
+    "inscricoes": ["data_inscricao", "data_prevista", "data_conclusao"],
+    "progressos": ["data_conclusao"],
+    "evidencias": ["data_registro"],
+    "certificados": ["data_emissao", "data_validade"],
+    "auditoria": ["data_hora"],
+}
+
+
+def para_datetime(valor):
+    # Converte string ISO em datetime UTC; outros valores passam inalterados
+    if isinstance(valor, str) and valor:
+        valor = datetime.fromisoformat(valor.replace("Z", "+00:00"))
+        if valor.tzinfo is None:
+            valor = valor.replace(tzinfo=timezone.utc)
+        return valor.astimezone(timezone.utc)
+    return valor
+
+
+def normalizar_datas(doc: dict, campos: List[str]) -> dict:
+    # Leitura dupla: só converte os campos que ainda estão como string
+    for campo in campos:
+        if isinstance(doc.get(campo), str):
+            doc[campo] = para_datetime(doc[campo]) or None
+    return doc
+
+
+async def migracao_concluida(db) -> bool:
+    return await db.migracoes.find_one({"_id": MIGRACAO_ID, "concluida": True}) is not None
+
+
+async def migrar_colecao(db, colecao: str, campos: List[str], lote: int = 1000, simular: bool = False) -> int:
+    filtro = {"$or": [{campo: {"$type": "string"}} for campo in campos]}
+    projecao = {campo: 1 for campo in campos}
+    convertidos = 0
+    ultimo_id = None
+    while True:
+        # Paginação por _id para não revisitar documentos já convertidos
+        consulta = filtro if ultimo_id is None else {**filtro, "_id": {"$gt": ultimo_id}}
+        docs = await db[colecao].find(consulta, projecao).sort("_id", 1).limit(lote).to_list(lote)
+        if not docs:
+            return convertidos
+        ultimo_id = docs[-1]["_id"]
+        operacoes = []
+        for doc in docs:
+            novos = {}
+            for campo in campos:
+                valor = doc.get(campo)
+                if isinstance(valor, str):
+                    # Strings vazias viram null
+                    novos[campo] = para_datetime(valor) or None
+            if novos:
+                operacoes.append(UpdateOne({"_id": doc["_id"]}, {"$set": novos}))
+        if operacoes and not simular:
+            await db[colecao].bulk_write(operacoes, ordered=False)
+        convertidos += len(operacoes)
+
+
+async def migrar(db, lote: int = 1000, simular: bool = False) -> Dict[str, int]:
+    resultado = {}
+    for colecao, campos in CAMPOS_DATA.items():
+        resultado[colecao] = await migrar_colecao(db, colecao, campos, lote, simular)
+    if not simular:
+        await db.migracoes.update_one(
+            {"_id": MIGRACAO_ID},
+            {"$set": {"concluida": True, "concluida_em": datetime.now(timezone.utc), "convertidos": resultado}},
+            upsert=True,
+        )
+    return resultado
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--lote', type=int, default=1000)
+    parser.add_argument('--simular', action='store_true', help='apenas conta os documentos a converter')
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient(os.environ.get('MONGO_URL', 'mongodb://localhost:27017/'))
+    db = client[os.environ.get('DB_NAME', 'techsolutions_treinamentos')]
+    try:
+        resultado = await migrar(db, args.lote, args.simular)
+        for colecao, total in resultado.items():
+            print(f'{colecao:<15} {total} documentos {"a converter" if args.simular else "convertidos"}')
+        if not args.simular:
+            print('migração concluída; reinicie os workers para desligar a leitura dupla')
+    finally:
+        client.close()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
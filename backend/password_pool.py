@@ -0,0 +1,97 @@
+# Pool de execução para hashing/verificação de senhas com bcrypt
+# O bcrypt leva ~250 ms por chamada; rodando direto no handler async ele trava o
+# event loop e todas as outras requisições do worker. Aqui mandamos esse trabalho
+# para um executor (threads ou processos) de tamanho configurável e aplicamos
+# controle de admissão: se a fila passar de PASSWORD_MAX_QUEUE, recusamos na hora
+# em vez de deixar a latência crescer sem limite.
+#
+# Variáveis de ambiente:
+#   PASSWORD_EXECUTOR   "thread" (padrão) ou "process"
+#   PASSWORD_WORKERS    número de workers (padrão: número de CPUs)
+#   PASSWORD_MAX_QUEUE  máximo de operações pendentes (padrão: 8 por worker)
+
+import asyncio
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import List, Optional
+
+import bcrypt
+
+
+class PasswordPoolSaturated(Exception):
+    # Levantada quando a fila de operações de senha está cheia
+    pass
+
+
+# Funções de módulo (e não métodos) para poderem ser serializadas pelo ProcessPoolExecutor
+def _hashpw(password: str) -> str:
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+
+
+def _checkpw(password: str, hashed: str) -> bool:
+    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+
+
+def hash_senhas(passwords: List[str]) -> List[str]:
+    # Em lote, para importações: uma única ida ao processo para várias senhas
+    return [_hashpw(password) for password in passwords]
+
+
+class PasswordPool:
+    def __init__(self, kind: str = "thread", workers: Optional[int] = None, max_queue: Optional[int] = None):
+        if kind not in ("thread", "process"):
+            raise ValueError("kind deve ser 'thread' ou 'process'")
+        self.kind = kind
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queue = max_queue or self.workers * 8
+        self._executor: Optional[Executor] = None
+        self._pending = 0
+        # Recusas por fila cheia desde a subida (exposto em /metrics)
+        self.rejected = 0
+
+    @classmethod
+    def from_env(cls) -> "PasswordPool":
+        workers = os.environ.get('PASSWORD_WORKERS')
+        max_queue = os.environ.get('PASSWORD_MAX_QUEUE')
+        return cls(
+            kind=os.environ.get('PASSWORD_EXECUTOR', 'thread').strip().lower(),
+            workers=int(workers) if workers else None,
+            max_queue=int(max_queue) if max_queue else None,
+        )
+
+    @property
+    def pending(self) -> int:
+        # Operações em execução + aguardando na fila do executor
+        return self._pending
+
+    def start(self):
+        if self._executor is not None:
+            return
+        if self.kind == "process":
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    async def _run(self, fn, *args):
+        if self._pending >= self.max_queue:
+            self.rejected += 1
+            raise PasswordPoolSaturated()
+        if self._executor is None:
+            self.start()
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, fn, *args)
+        finally:
+            self._pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(_hashpw, password)
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        return await self._run(_checkpw, password, hashed)
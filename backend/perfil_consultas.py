@@ -0,0 +1,161 @@
+# Perfil das consultas ao MongoDB por requisição e log de consultas lentas
+# Handlers como create_inscricao e get_dashboard_stats fazem vários awaits seguidos
+# ao banco e não havia como saber qual deles pesava. O MonitorComandos é um
+# CommandListener do pymongo: recebe o início e o fim de cada comando, com a
+# duração medida pelo próprio driver.
+#
+# Atribuição à requisição: o middleware guarda um PerfilRequisicao em uma contextvar.
+# O Motor executa os comandos em threads, mas copia o contexto da corrotina que os
+# chamou, então o listener enxerga o perfil da requisição certa. Cada comando vira
+# uma tupla em uma lista (append é atômico); os totais só são calculados no fim e
+# vão no cabeçalho Server-Timing:
+#     Server-Timing: db;dur=12.4;desc="7 comandos", db-max;dur=6.1;desc="aggregate inscricoes"
+#
+# Comandos acima de `lento_ms` vão para o log com o formato do filtro (valores
+# trocados por "?"), com ou sem requisição ativa (as tarefas em segundo plano também).
+# Desligado (MONGO_PERFIL=0), o listener nem é registrado no cliente: custo zero.
+#
+# Cada comando também vai para registrar_consulta (repositorios/base.py), que conta
+# as idas ao banco para quem estiver observando (observar_consultas nos testes).
+
+import json
+import logging
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from pymongo import monitoring
+
+from repositorios.base import registrar_consulta
+
+logger = logging.getLogger(__name__)
+
+# Comandos do próprio driver (handshake, sessões), que não dizem nada sobre a rota
+IGNORADOS = frozenset({"hello", "ismaster", "isMaster", "ping", "endSessions", "buildInfo",
+                       "saslStart", "saslContinue", "killCursors"})
+
+# Onde fica o filtro em cada comando
+_CAMPO_FILTRO = {"find": "filter", "count": "query", "distinct": "query", "findAndModify": "query"}
+
+
+class PerfilRequisicao:
+    __slots__ = ("rota", "comandos")
+
+    def __init__(self, rota: str = ""):
+        self.rota = rota
+        # (nome do comando, coleção, duração em ms)
+        self.comandos: List[Tuple[str, str, float]] = []
+
+    def resumo(self) -> Optional[dict]:
+        if not self.comandos:
+            return None
+        mais_lento = max(self.comandos, key=lambda c: c[2])
+        return {
+            "comandos": len(self.comandos),
+            "total_ms": sum(c[2] for c in self.comandos),
+            "mais_lento": mais_lento,
+        }
+
+    def server_timing(self) -> Optional[str]:
+        resumo = self.resumo()
+        if resumo is None:
+            return None
+        nome, colecao, duracao = resumo["mais_lento"]
+        return (f'db;dur={resumo["total_ms"]:.1f};desc="{resumo["comandos"]} comandos", '
+                f'db-max;dur={duracao:.1f};desc="{nome} {colecao}"')
+
+
+perfil_atual: ContextVar[Optional[PerfilRequisicao]] = ContextVar("perfil_atual", default=None)
+
+
+def formato(valor):
+    # Mantém chaves e operadores, troca os valores por "?": agrupa consultas iguais no log
+    # e não grava dados dos colaboradores (emails, CPFs) nele
+    if isinstance(valor, dict):
+        return {chave: formato(v) for chave, v in valor.items()}
+    if isinstance(valor, list) and valor and all(isinstance(v, dict) for v in valor):
+        return [formato(v) for v in valor]
+    return "?"
+
+
+def formato_comando(nome: str, comando) -> dict:
+    if nome in _CAMPO_FILTRO:
+        return {"filter": formato(comando.get(_CAMPO_FILTRO[nome], {}))}
+    if nome == "aggregate":
+        # Estágios pela ordem, com o formato dos $match
+        return {"pipeline": [formato(e) if "$match" in e else next(iter(e), "?") for e in comando.get("pipeline", [])]}
+    if nome in ("update", "delete"):
+        operacoes = comando.get("updates" if nome == "update" else "deletes", [])
+        return {"filter": formato(operacoes[0].get("q", {})) if operacoes else {}, "operacoes": len(operacoes)}
+    if nome == "insert":
+        return {"documentos": len(comando.get("documents", []))}
+    return {}
+
+
+class MonitorComandos(monitoring.CommandListener):
+    def __init__(self, lento_ms: float = 100.0, max_pendentes: int = 10000):
+        self.lento_ms = lento_ms
+        self.max_pendentes = max_pendentes
+        # (conexão, request_id) -> (nome, coleção, comando): o fim do comando não traz o filtro
+        self._pendentes: Dict[tuple, tuple] = {}
+        self.lentos = 0
+
+    def started(self, event):
+        nome = event.command_name
+        if nome in IGNORADOS:
+            return
+        comando = event.command
+        colecao = comando.get(nome)
+        if nome == "getMore":
+            colecao = comando.get("collection")
+        colecao = colecao if isinstance(colecao, str) else ""
+        registrar_consulta(colecao, nome)
+        if len(self._pendentes) >= self.max_pendentes:
+            # Comandos cujo fim nunca chegou (conexão perdida): não deixamos acumular
+            self._pendentes.clear()
+        self._pendentes[(event.connection_id, event.request_id)] = (nome, colecao, comando)
+
+    def _terminou(self, event, falhou: bool):
+        pendente = self._pendentes.pop((event.connection_id, event.request_id), None)
+        if pendente is None:
+            return
+        nome, colecao, comando = pendente
+        duracao = event.duration_micros / 1000
+        perfil = perfil_atual.get()
+        if perfil is not None:
+            perfil.comandos.append((nome, colecao, duracao))
+        if duracao >= self.lento_ms:
+            self.lentos += 1
+            logger.warning("Comando lento no MongoDB: %s %s em %.1f ms%s (%s) %s", nome, colecao, duracao,
+                           " com falha" if falhou else "", perfil.rota if perfil else "segundo plano",
+                           json.dumps(formato_comando(nome, comando), ensure_ascii=False, default=str))
+
+    def succeeded(self, event):
+        self._terminou(event, falhou=False)
+
+    def failed(self, event):
+        self._terminou(event, falhou=True)
+
+
+class PerfilConsultasMiddleware:
+    # Middleware ASGI puro: roda na mesma task da rota, então a contextvar vale para ela
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        perfil = PerfilRequisicao(f'{scope["method"]} {scope["path"]}')
+        token = perfil_atual.set(perfil)
+
+        async def enviar(mensagem):
+            if mensagem["type"] == "http.response.start":
+                valor = perfil.server_timing()
+                if valor is not None:
+                    mensagem["headers"] = list(mensagem.get("headers", [])) + [(b"server-timing", valor.encode("latin-1"))]
+            await send(mensagem)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            perfil_atual.reset(token)
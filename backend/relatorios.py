@@ -0,0 +1,426 @@
+# Relatórios gerados no servidor com exportação em CSV e XLSX
+# Cada relatório é uma agregação no MongoDB cujo cursor é percorrido em lotes e
+# escrito linha a linha, então a memória usada não depende da quantidade de linhas:
+#
+#   conclusao             inscrições e conclusões por área e cargo
+#   certificados_vencer   certificados ativos que vencem nos próximos N dias
+#   horas_treinadas       soma da carga_horaria dos cursos concluídos por colaborador
+#
+# CSV sai direto na resposta (transferência em chunks). O XLSX precisa do arquivo
+# inteiro para fechar o zip: escrevemos com openpyxl em modo write_only (linhas vão
+# para disco, não ficam em memória) e então enviamos o arquivo. openpyxl é opcional.
+#
+# Exportações grandes rodam como tarefas em segundo plano (TarefasRelatorio): o
+# arquivo fica em `diretorio` e é baixado depois. Com vários servidores o diretório
+# precisa ser compartilhado entre eles.
+#
+# A fila é só em memória, mas o estado da tarefa está em `tarefas_relatorio`: ao
+# iniciar (e a cada verificação ociosa) o worker devolve à fila as tarefas pendentes
+# e marca como erro as que estão "executando" sem sinal de vida (o processo que as
+# rodava reiniciou ou morreu). A passagem pendente -> executando é atômica, então
+# dois workers com a mesma tarefa na fila não a executam duas vezes.
+
+import asyncio
+import csv
+import io
+import logging
+import os
+import tempfile
+import uuid
+from datetime import datetime, timezone, timedelta
+from enum import Enum
+from typing import AsyncIterator, Callable, Dict, List, Optional, Set, Tuple
+
+from conformidade import as_datetime
+
+try:
+    import openpyxl
+except ImportError:  # pragma: no cover - dependência opcional
+    openpyxl = None
+
+logger = logging.getLogger(__name__)
+
+LOTE = 1000
+
+
+class TipoRelatorio(str, Enum):
+    CONCLUSAO = "conclusao"
+    CERTIFICADOS_VENCER = "certificados_vencer"
+    HORAS_TREINADAS = "horas_treinadas"
+
+
+class FormatoRelatorio(str, Enum):
+    CSV = "csv"
+    XLSX = "xlsx"
+
+
+MEDIA_TYPES = {
+    FormatoRelatorio.CSV: "text/csv; charset=utf-8",
+    FormatoRelatorio.XLSX: "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+# Colunas de cada relatório: (campo no documento, título no arquivo)
+COLUNAS: Dict[TipoRelatorio, List[Tuple[str, str]]] = {
+    TipoRelatorio.CONCLUSAO: [
+        ("id_area", "ID área"), ("area", "Área"), ("id_cargo", "ID cargo"), ("cargo", "Cargo"),
+        ("colaboradores", "Colaboradores"), ("inscricoes", "Inscrições"), ("concluidas", "Concluídas"),
+        ("taxa_conclusao", "Taxa de conclusão (%)"),
+    ],
+    TipoRelatorio.CERTIFICADOS_VENCER: [
+        ("id_certificado", "ID certificado"), ("codigo_verificacao", "Código"), ("data_validade", "Validade"),
+        ("dias_restantes", "Dias restantes"), ("id_colaborador", "ID colaborador"), ("colaborador", "Colaborador"),
+        ("email", "Email"), ("id_curso", "ID curso"), ("curso", "Curso"),
+    ],
+    TipoRelatorio.HORAS_TREINADAS: [
+        ("id_colaborador", "ID colaborador"), ("colaborador", "Colaborador"), ("id_area", "ID área"),
+        ("id_cargo", "ID cargo"), ("cursos_concluidos", "Cursos concluídos"), ("horas", "Horas treinadas"),
+    ],
+}
+
+
+def _nome(colecao: str, campo_local: str, campo_id: str, destino: str) -> List[dict]:
+    # $lookup do nome de uma entidade de referência (área, cargo, curso...)
+    return [
+        {"$lookup": {"from": colecao, "localField": campo_local, "foreignField": campo_id,
+                     "pipeline": [{"$project": {"_id": 0, "nome": 1, "titulo": 1}}], "as": destino}},
+        {"$set": {destino: {"$ifNull": [{"$arrayElemAt": [f"${destino}.nome", 0]},
+                                        {"$arrayElemAt": [f"${destino}.titulo", 0]}]}}},
+    ]
+
+
+def pipeline_conclusao(id_area: Optional[int] = None, id_cargo: Optional[int] = None) -> List[dict]:
+    # Agrupamos por colaborador antes do $lookup: uma busca por colaborador, não por inscrição
+    filtro_colab = {"colab.ativo": {"$ne": False}}
+    if id_area is not None:
+        filtro_colab["colab.id_area"] = id_area
+    if id_cargo is not None:
+        filtro_colab["colab.id_cargo"] = id_cargo
+    return [
+        {"$match": {"status": {"$ne": "cancelado"}}},
+        {"$group": {"_id": "$id_colaborador", "inscricoes": {"$sum": 1},
+                    "concluidas": {"$sum": {"$cond": [{"$eq": ["$status", "concluido"]}, 1, 0]}}}},
+        {"$lookup": {"from": "colaboradores", "localField": "_id", "foreignField": "id_colaborador",
+                     "pipeline": [{"$project": {"_id": 0, "id_area": 1, "id_cargo": 1, "ativo": 1}}], "as": "colab"}},
+        {"$unwind": "$colab"},
+        {"$match": filtro_colab},
+        {"$group": {"_id": {"id_area": "$colab.id_area", "id_cargo": "$colab.id_cargo"},
+                    "colaboradores": {"$sum": 1}, "inscricoes": {"$sum": "$inscricoes"},
+                    "concluidas": {"$sum": "$concluidas"}}},
+        {"$project": {"_id": 0, "id_area": "$_id.id_area", "id_cargo": "$_id.id_cargo", "colaboradores": 1,
+                      "inscricoes": 1, "concluidas": 1,
+                      "taxa_conclusao": {"$round": [{"$multiply": [
+                          {"$divide": ["$concluidas", {"$max": ["$inscricoes", 1]}]}, 100]}, 2]}}},
+        {"$sort": {"id_area": 1, "id_cargo": 1}},
+        *_nome("areas", "id_area", "id_area", "area"),
+        *_nome("cargos", "id_cargo", "id_cargo", "cargo"),
+    ]
+
+
+def pipeline_certificados_vencer(filtro_validade: dict) -> List[dict]:
+    return [
+        {"$match": {"status": "ativo", **filtro_validade}},
+        {"$sort": {"data_validade": 1, "id_certificado": 1}},
+        {"$lookup": {"from": "inscricoes", "localField": "id_inscricao", "foreignField": "id_inscricao",
+                     "pipeline": [{"$project": {"_id": 0, "id_colaborador": 1, "id_curso": 1}}], "as": "insc"}},
+        {"$unwind": "$insc"},
+        {"$project": {"_id": 0, "id_certificado": 1, "codigo_verificacao": 1, "data_validade": 1,
+                      "id_colaborador": "$insc.id_colaborador", "id_curso": "$insc.id_curso"}},
+        {"$lookup": {"from": "colaboradores", "localField": "id_colaborador", "foreignField": "id_colaborador",
+                     "pipeline": [{"$project": {"_id": 0, "nome": 1, "email": 1}}], "as": "colab"}},
+        {"$set": {"colaborador": {"$arrayElemAt": ["$colab.nome", 0]},
+                  "email": {"$arrayElemAt": ["$colab.email", 0]}}},
+        {"$unset": "colab"},
+        *_nome("cursos", "id_curso", "id_curso", "curso"),
+    ]
+
+
+def pipeline_horas_treinadas(filtro_conclusao: dict, id_area: Optional[int] = None,
+                             id_cargo: Optional[int] = None) -> List[dict]:
+    filtro_colab = {}
+    if id_area is not None:
+        filtro_colab["id_area"] = id_area
+    if id_cargo is not None:
+        filtro_colab["id_cargo"] = id_cargo
+    return [
+        {"$match": {"status": "concluido", **filtro_conclusao}},
+        {"$group": {"_id": {"id_colaborador": "$id_colaborador", "id_curso": "$id_curso"}}},
+        {"$lookup": {"from": "cursos", "localField": "_id.id_curso", "foreignField": "id_curso",
+                     "pipeline": [{"$project": {"_id": 0, "carga_horaria": 1}}], "as": "curso"}},
+        {"$group": {"_id": "$_id.id_colaborador", "cursos_concluidos": {"$sum": 1},
+                    "horas": {"$sum": {"$ifNull": [{"$arrayElemAt": ["$curso.carga_horaria", 0]}, 0]}}}},
+        {"$lookup": {"from": "colaboradores", "localField": "_id", "foreignField": "id_colaborador",
+                     "pipeline": [{"$project": {"_id": 0, "nome": 1, "id_area": 1, "id_cargo": 1}}], "as": "colab"}},
+        {"$unwind": "$colab"},
+        {"$project": {"_id": 0, "id_colaborador": "$_id", "colaborador": "$colab.nome",
+                      "id_area": "$colab.id_area", "id_cargo": "$colab.id_cargo",
+                      "cursos_concluidos": 1, "horas": 1}},
+        *([{"$match": filtro_colab}] if filtro_colab else []),
+        {"$sort": {"horas": -1, "id_colaborador": 1}},
+    ]
+
+
+def _celula(valor):
+    if isinstance(valor, datetime):
+        # openpyxl não aceita datetime com fuso; as datas do banco estão em UTC
+        return valor.astimezone(timezone.utc).replace(tzinfo=None) if valor.tzinfo else valor
+    return valor
+
+
+class Relatorios:
+    def __init__(self, db, filtro_intervalo: Callable[[str, Optional[datetime], Optional[datetime]], dict]):
+        self.db = db
+        # filtro_intervalo do server.py (leitura dupla de datas enquanto a migração não termina)
+        self.filtro_intervalo = filtro_intervalo
+
+    def _agregacao(self, tipo: TipoRelatorio, parametros: dict):
+        if tipo == TipoRelatorio.CONCLUSAO:
+            return self.db.inscricoes, pipeline_conclusao(parametros.get("id_area"), parametros.get("id_cargo"))
+        if tipo == TipoRelatorio.CERTIFICADOS_VENCER:
+            agora = datetime.now(timezone.utc)
+            filtro = self.filtro_intervalo("data_validade", agora, agora + timedelta(days=parametros.get("dias") or 30))
+            return self.db.certificados, pipeline_certificados_vencer(filtro)
+        filtro = self.filtro_intervalo("data_conclusao", parametros.get("desde"), parametros.get("ate"))
+        return self.db.inscricoes, pipeline_horas_treinadas(filtro, parametros.get("id_area"), parametros.get("id_cargo"))
+
+    async def linhas(self, tipo: TipoRelatorio, parametros: dict) -> AsyncIterator[list]:
+        # Uma lista de valores por linha, na ordem de COLUNAS[tipo]
+        colecao, pipeline = self._agregacao(tipo, parametros)
+        campos = [campo for campo, _ in COLUNAS[tipo]]
+        agora = datetime.now(timezone.utc)
+        cursor = colecao.aggregate(pipeline, batchSize=LOTE, allowDiskUse=True)
+        try:
+            async for doc in cursor:
+                if tipo == TipoRelatorio.CERTIFICADOS_VENCER and doc.get("data_validade"):
+                    doc["data_validade"] = as_datetime(doc["data_validade"])
+                    doc["dias_restantes"] = (doc["data_validade"] - agora).days
+                yield [doc.get(campo) for campo in campos]
+        finally:
+            await cursor.close()
+
+    async def _csv(self, tipo: TipoRelatorio, parametros: dict) -> AsyncIterator[Tuple[bytes, int]]:
+        # Blocos de (bytes, linhas de dados no bloco); ';' e BOM para o Excel em pt-BR
+        # abrir com acentos e colunas corretas
+        buffer = io.StringIO()
+        escritor = csv.writer(buffer, delimiter=";")
+        buffer.write("\ufeff")
+        escritor.writerow([titulo for _, titulo in COLUNAS[tipo]])
+        pendentes = 0
+        async for linha in self.linhas(tipo, parametros):
+            escritor.writerow([v.isoformat() if isinstance(v, datetime) else v for v in linha])
+            pendentes += 1
+            if pendentes >= LOTE:
+                yield buffer.getvalue().encode("utf-8"), pendentes
+                buffer.seek(0)
+                buffer.truncate()
+                pendentes = 0
+        yield buffer.getvalue().encode("utf-8"), pendentes
+
+    async def csv(self, tipo: TipoRelatorio, parametros: dict) -> AsyncIterator[bytes]:
+        async for parte, _ in self._csv(tipo, parametros):
+            yield parte
+
+    async def gravar(self, tipo: TipoRelatorio, formato: FormatoRelatorio, parametros: dict, caminho: str) -> int:
+        # Grava o relatório em `caminho` (via arquivo temporário) e devolve o número de linhas
+        temporario = caminho + ".tmp"
+        linhas = 0
+        if formato == FormatoRelatorio.CSV:
+            with open(temporario, "wb") as arquivo:
+                async for parte, quantidade in self._csv(tipo, parametros):
+                    await asyncio.to_thread(arquivo.write, parte)
+                    linhas += quantidade
+        else:
+            if openpyxl is None:
+                raise RuntimeError("Exportação em XLSX requer o pacote openpyxl")
+            # write_only: cada linha vai para um arquivo temporário do openpyxl, não para a memória
+            planilha = openpyxl.Workbook(write_only=True)
+            aba = planilha.create_sheet(tipo.value)
+            aba.append([titulo for _, titulo in COLUNAS[tipo]])
+            async for linha in self.linhas(tipo, parametros):
+                aba.append([_celula(v) for v in linha])
+                linhas += 1
+            await asyncio.to_thread(planilha.save, temporario)
+        os.replace(temporario, caminho)
+        return linhas
+
+    async def xlsx_temporario(self, tipo: TipoRelatorio, parametros: dict) -> str:
+        # Para a resposta direta em XLSX: arquivo temporário removido depois do envio
+        descritor, caminho = tempfile.mkstemp(suffix=".xlsx")
+        os.close(descritor)
+        try:
+            await self.gravar(tipo, FormatoRelatorio.XLSX, parametros, caminho)
+        except BaseException:
+            os.remove(caminho)
+            raise
+        return caminho
+
+
+class TarefasRelatorio:
+    def __init__(self, relatorios: Relatorios, diretorio: str, retencao_horas: float = 24.0,
+                 intervalo: float = 30.0):
+        self.relatorios = relatorios
+        self.db = relatorios.db
+        self.diretorio = diretorio
+        self.retencao = timedelta(hours=retencao_horas)
+        # A tarefa em execução grava ativa_em a cada `intervalo` segundos; sem sinal por
+        # 4 intervalos consideramos que o processo que a rodava morreu
+        self.intervalo = intervalo
+        self.tolerancia = timedelta(seconds=4 * intervalo)
+        self._fila: Optional[asyncio.Queue] = None
+        self._enfileiradas: Set[str] = set()
+        self._tarefa: Optional[asyncio.Task] = None
+        self.interrompidas = 0
+        self.retomadas = 0
+
+    async def solicitar(self, tipo: TipoRelatorio, formato: FormatoRelatorio, parametros: dict,
+                        id_colaborador: Optional[int]) -> dict:
+        if formato == FormatoRelatorio.XLSX and openpyxl is None:
+            raise RuntimeError("Exportação em XLSX requer o pacote openpyxl")
+        tarefa = {
+            "id_tarefa": uuid.uuid4().hex,
+            "relatorio": tipo.value,
+            "formato": formato.value,
+            "parametros": parametros,
+            "id_colaborador": id_colaborador,
+            "status": "pendente",
+            "linhas": None,
+            "arquivo": None,
+            "criada_em": datetime.now(timezone.utc),
+            "concluida_em": None,
+            "erro": None,
+        }
+        await self.db.tarefas_relatorio.insert_one(dict(tarefa))
+        self._enfileirar(tarefa)
+        return {k: v for k, v in tarefa.items() if k != "arquivo"}
+
+    def _enfileirar(self, tarefa: dict):
+        if self._fila is None:
+            self._fila = asyncio.Queue()
+        if tarefa["id_tarefa"] not in self._enfileiradas:
+            self._enfileiradas.add(tarefa["id_tarefa"])
+            self._fila.put_nowait(tarefa)
+
+    async def consultar(self, id_tarefa: str, id_colaborador: Optional[int], com_arquivo: bool = False) -> Optional[dict]:
+        # Cada um só enxerga as próprias tarefas. O caminho no disco do servidor só
+        # interessa à rota de download.
+        projecao = {"_id": 0} if com_arquivo else {"_id": 0, "arquivo": 0}
+        return await self.db.tarefas_relatorio.find_one({"id_tarefa": id_tarefa, "id_colaborador": id_colaborador},
+                                                        projecao)
+
+    async def recentes(self, id_colaborador: Optional[int], limite: int = 50) -> List[dict]:
+        return await self.db.tarefas_relatorio.find({"id_colaborador": id_colaborador}, {"_id": 0, "arquivo": 0}).sort(
+            "criada_em", -1).limit(limite).to_list(limite)
+
+    async def _atualizar(self, tarefa: dict, **campos):
+        tarefa.update(campos)
+        await self.db.tarefas_relatorio.update_one({"id_tarefa": tarefa["id_tarefa"]}, {"$set": campos})
+
+    async def _reservar(self, tarefa: dict) -> bool:
+        # Só quem muda o status de pendente para executando roda a tarefa
+        agora = datetime.now(timezone.utc)
+        resultado = await self.db.tarefas_relatorio.update_one(
+            {"id_tarefa": tarefa["id_tarefa"], "status": "pendente"},
+            {"$set": {"status": "executando", "ativa_em": agora}})
+        if resultado.modified_count == 0:
+            return False
+        tarefa.update(status="executando", ativa_em=agora)
+        return True
+
+    async def _sinalizar(self, id_tarefa: str):
+        while True:
+            await asyncio.sleep(self.intervalo)
+            await self.db.tarefas_relatorio.update_one(
+                {"id_tarefa": id_tarefa, "status": "executando"},
+                {"$set": {"ativa_em": datetime.now(timezone.utc)}})
+
+    async def executar(self, tarefa: dict) -> dict:
+        if not await self._reservar(tarefa):
+            return tarefa  # outro worker já executou, ou a tarefa foi interrompida
+        os.makedirs(self.diretorio, exist_ok=True)
+        caminho = os.path.join(self.diretorio, f'{tarefa["relatorio"]}_{tarefa["id_tarefa"]}.{tarefa["formato"]}')
+        sinal = asyncio.create_task(self._sinalizar(tarefa["id_tarefa"]))
+        try:
+            linhas = await self.relatorios.gravar(
+                TipoRelatorio(tarefa["relatorio"]), FormatoRelatorio(tarefa["formato"]), tarefa["parametros"], caminho)
+            await self._atualizar(tarefa, status="concluida", linhas=linhas, arquivo=caminho,
+                                  concluida_em=datetime.now(timezone.utc))
+        except Exception as exc:
+            logger.exception("Falha no relatório %s", tarefa["id_tarefa"])
+            await self._atualizar(tarefa, status="erro", erro=str(exc), concluida_em=datetime.now(timezone.utc))
+        finally:
+            sinal.cancel()
+        return tarefa
+
+    async def recuperar(self, todas_pendentes: bool = False) -> dict:
+        # Tarefas órfãs: "executando" sem sinal de vida viram erro (o cliente para de
+        # consultar e pode pedir de novo) e as pendentes voltam para a fila. No start
+        # retomamos todas as pendentes; nas verificações seguintes só as mais antigas
+        # que a tolerância, que nenhum worker pegou.
+        agora = datetime.now(timezone.utc)
+        limite = agora - self.tolerancia
+        interrompidas = await self.db.tarefas_relatorio.update_many(
+            {"status": "executando", "$or": [{"ativa_em": {"$lt": limite}}, {"ativa_em": None}]},
+            {"$set": {"status": "erro", "erro": "Tarefa interrompida pelo reinício do servidor; solicite novamente",
+                      "concluida_em": agora}})
+        filtro = {"status": "pendente"}
+        if not todas_pendentes:
+            filtro["criada_em"] = {"$lt": limite}
+        retomadas = 0
+        async for tarefa in self.db.tarefas_relatorio.find(filtro, {"_id": 0}).sort("criada_em", 1):
+            if tarefa["id_tarefa"] not in self._enfileiradas:
+                self._enfileirar(tarefa)
+                retomadas += 1
+        self.interrompidas += interrompidas.modified_count
+        self.retomadas += retomadas
+        if interrompidas.modified_count or retomadas:
+            logger.warning("Relatórios: %d tarefas interrompidas marcadas como erro, %d pendentes retomadas",
+                           interrompidas.modified_count, retomadas)
+        return {"interrompidas": interrompidas.modified_count, "retomadas": retomadas}
+
+    async def limpar(self) -> int:
+        # Remove arquivos e tarefas mais antigos que a retenção
+        limite = datetime.now(timezone.utc) - self.retencao
+        removidas = 0
+        async for tarefa in self.db.tarefas_relatorio.find({"criada_em": {"$lt": limite}}, {"_id": 0, "arquivo": 1, "id_tarefa": 1}):
+            if tarefa.get("arquivo") and os.path.exists(tarefa["arquivo"]):
+                os.remove(tarefa["arquivo"])
+            await self.db.tarefas_relatorio.delete_one({"id_tarefa": tarefa["id_tarefa"]})
+            removidas += 1
+        return removidas
+
+    async def _executar(self):
+        try:
+            await self.recuperar(todas_pendentes=True)
+        except Exception:
+            logger.exception("Falha ao retomar as tarefas de relatório")
+        while True:
+            try:
+                tarefa = await asyncio.wait_for(self._fila.get(), timeout=self.intervalo * 2)
+            except asyncio.TimeoutError:
+                tarefa = None
+            try:
+                if tarefa is not None:
+                    self._enfileiradas.discard(tarefa["id_tarefa"])
+                    await self.executar(tarefa)
+                else:
+                    await self.recuperar()
+                await self.limpar()
+            except Exception:
+                logger.exception("Falha ao registrar a tarefa de relatório")
+            finally:
+                if tarefa is not None:
+                    self._fila.task_done()
+
+    def start(self):
+        if self._tarefa is None:
+            if self._fila is None:
+                self._fila = asyncio.Queue()
+            self._tarefa = asyncio.create_task(self._executar())
+
+    async def stop(self):
+        if self._tarefa is not None:
+            self._tarefa.cancel()
+            try:
+                await self._tarefa
+            except asyncio.CancelledError:
+                pass
+            self._tarefa = None
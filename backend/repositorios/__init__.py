@@ -0,0 +1,21 @@
+# Repositórios por agregado (ver base.py para o carregador em lote e a contagem de consultas)
+from repositorios.base import (Carregador, ContadorConsultas, Repositorio, observar_consultas,
+                               registrar_consulta)
+from repositorios.certificados import RepositorioCertificados
+from repositorios.colaboradores import RepositorioColaboradores
+from repositorios.cursos import RepositorioCursos
+from repositorios.inscricoes import RepositorioInscricoes
+from repositorios.trilhas import RepositorioTrilhas
+
+__all__ = [
+    "Carregador",
+    "ContadorConsultas",
+    "Repositorio",
+    "RepositorioCertificados",
+    "RepositorioColaboradores",
+    "RepositorioCursos",
+    "RepositorioInscricoes",
+    "RepositorioTrilhas",
+    "observar_consultas",
+    "registrar_consulta",
+]
@@ -0,0 +1,175 @@
+# Base dos repositórios: carregador em lote (estilo DataLoader) e contagem de consultas
+# As rotas chamavam db.<coleção> diretamente, cada uma com sua projeção e seu padrão
+# de busca por ID. O Repositorio concentra isso por agregado:
+#   - obter(id) de várias corrotinas na mesma volta do event loop vira um único
+#     find({campo_id: {"$in": [...]}}), um por projeção pedida;
+#   - existe(id) usa só o campo do ID (a consulta é coberta pelo índice único).
+#
+# A contagem de idas ao banco é feita no driver: o MonitorComandos (CommandListener
+# do perfil_consultas.py) chama registrar_consulta(coleção, comando) para cada
+# comando enviado ao MongoDB, passe ele por um Repositorio ou por db.<coleção>
+# direto na rota. Os nomes são os dos comandos do protocolo: find, getMore, insert,
+# update, delete, findAndModify, aggregate, distinct... Com MONGO_PERFIL=0 o listener
+# não é registrado e nada é contado.
+#
+# Observadores servem para instrumentação e testes:
+#     with observar_consultas() as consultas:
+#         client.post("/api/certificados", ...)
+#     assert consultas.total == 2
+# Os observadores são globais (valem para todas as requisições do processo e para as
+# tarefas em segundo plano), então só devem ficar registrados enquanto durar a medição.
+
+import asyncio
+from collections import Counter
+from contextlib import contextmanager
+from typing import (Any, Awaitable, Callable, Dict, Hashable, Iterable, Iterator, List, Optional,
+                    Set, Tuple)
+
+Observador = Callable[[str, str], None]
+
+_observadores: List[Observador] = []
+
+
+def registrar_consulta(colecao: str, operacao: str):
+    for observador in _observadores:
+        observador(colecao, operacao)
+
+
+class ContadorConsultas:
+    def __init__(self):
+        self.total = 0
+        self.por_colecao: Counter = Counter()
+        self.por_operacao: Counter = Counter()
+
+    def __call__(self, colecao: str, operacao: str):
+        self.total += 1
+        self.por_colecao[colecao] += 1
+        self.por_operacao[(colecao, operacao)] += 1
+
+
+@contextmanager
+def observar_consultas(contador: Optional[ContadorConsultas] = None) -> Iterator[ContadorConsultas]:
+    contador = contador or ContadorConsultas()
+    _observadores.append(contador)
+    try:
+        yield contador
+    finally:
+        _observadores.remove(contador)
+
+
+class Carregador:
+    # Junta os pedidos feitos na mesma volta do event loop e resolve todos com uma
+    # chamada a buscar_lote(chaves) -> {chave: valor}. Não guarda resultados entre
+    # voltas: cada lote vai ao banco e nunca devolve um documento desatualizado.
+    def __init__(self, buscar_lote: Callable[[List[Hashable]], Awaitable[Dict[Hashable, Any]]],
+                 max_lote: int = 1000):
+        self.buscar_lote = buscar_lote
+        self.max_lote = max_lote
+        self._pendentes: Dict[Hashable, asyncio.Future] = {}
+        self.lotes = 0
+        self.pedidos = 0
+
+    async def carregar(self, chave: Hashable) -> Any:
+        self.pedidos += 1
+        futuro = self._pendentes.get(chave)
+        if futuro is None:
+            loop = asyncio.get_running_loop()
+            if not self._pendentes:
+                # call_soon roda depois das corrotinas já prontas nesta volta do loop
+                loop.call_soon(self._despachar)
+            futuro = self._pendentes[chave] = loop.create_future()
+        # shield: quem desistir (cancelamento) não cancela o resultado dos demais
+        return await asyncio.shield(futuro)
+
+    async def carregar_varios(self, chaves: Iterable[Hashable]) -> List[Any]:
+        return list(await asyncio.gather(*(self.carregar(chave) for chave in chaves)))
+
+    def _despachar(self):
+        pendentes, self._pendentes = list(self._pendentes.items()), {}
+        for inicio in range(0, len(pendentes), self.max_lote):
+            asyncio.ensure_future(self._executar(pendentes[inicio:inicio + self.max_lote]))
+
+    async def _executar(self, lote: List[Tuple[Hashable, asyncio.Future]]):
+        self.lotes += 1
+        try:
+            resultados = await self.buscar_lote([chave for chave, _ in lote])
+        except Exception as exc:
+            for _, futuro in lote:
+                if not futuro.done():
+                    futuro.set_exception(exc)
+            return
+        for chave, futuro in lote:
+            if not futuro.done():
+                futuro.set_result(resultados.get(chave))
+
+
+class Repositorio:
+    colecao: str = ""
+    campo_id: str = ""
+
+    def __init__(self, db, projecao: Dict[str, int]):
+        # projecao: a do modelo de resposta (projecao_do_modelo), usada quando a rota não pede outra
+        self.db = db
+        self.projecao = projecao
+        self.projecao_id = {"_id": 0, self.campo_id: 1}
+        self._carregadores: Dict[Tuple, Carregador] = {}
+
+    @property
+    def _colecao(self):
+        return self.db[self.colecao]
+
+    def _carregador(self, projecao: Dict[str, int]) -> Carregador:
+        # Um carregador por projeção: pedidos com projeções diferentes não se misturam
+        chave = tuple(sorted(projecao.items()))
+        carregador = self._carregadores.get(chave)
+        if carregador is None:
+            async def buscar_lote(ids: List[Hashable]) -> Dict[Hashable, dict]:
+                return await self.obter_varios(ids, projecao)
+            carregador = self._carregadores[chave] = Carregador(buscar_lote)
+        return carregador
+
+    async def obter(self, id_registro: int, projecao: Optional[Dict[str, int]] = None) -> Optional[dict]:
+        documento = await self._carregador(projecao or self.projecao).carregar(id_registro)
+        # Cada chamador recebe sua cópia: o mesmo documento pode ter sido pedido por vários
+        return dict(documento) if documento is not None else None
+
+    async def obter_varios(self, ids: Iterable[int], projecao: Optional[Dict[str, int]] = None) -> Dict[int, dict]:
+        ids = list(dict.fromkeys(ids))
+        if not ids:
+            return {}
+        projecao = dict(projecao or self.projecao)
+        # O campo do ID precisa vir para montarmos o dicionário
+        retirar = self.campo_id not in projecao and any(v == 1 for k, v in projecao.items() if k != "_id")
+        if retirar:
+            projecao[self.campo_id] = 1
+        docs = await self._colecao.find({self.campo_id: {"$in": ids}}, projecao).to_list(None)
+        resultado = {}
+        for doc in docs:
+            id_registro = doc.pop(self.campo_id) if retirar else doc[self.campo_id]
+            resultado[id_registro] = doc
+        return resultado
+
+    async def existe(self, id_registro: int) -> bool:
+        return await self._carregador(self.projecao_id).carregar(id_registro) is not None
+
+    async def existentes(self, ids: Iterable[int]) -> Set[int]:
+        return set(await self.obter_varios(ids, self.projecao_id))
+
+    async def inserir(self, documento: dict):
+        await self._colecao.insert_one(documento)
+        # insert_one acrescenta o _id do MongoDB ao próprio dicionário
+        documento.pop("_id", None)
+
+    async def atualizar(self, id_registro: int, campos: Dict[str, Any]) -> bool:
+        resultado = await self._colecao.update_one({self.campo_id: id_registro}, {"$set": campos})
+        return resultado.matched_count > 0
+
+    async def remover(self, id_registro: int) -> Optional[dict]:
+        # Devolve o documento removido (para a auditoria) ou None se não existia
+        return await self._colecao.find_one_and_delete({self.campo_id: id_registro}, projection={"_id": 0})
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "pedidos": sum(c.pedidos for c in self._carregadores.values()),
+            "lotes": sum(c.lotes for c in self._carregadores.values()),
+        }
@@ -0,0 +1,7 @@
+# Certificados emitidos para as inscrições
+from repositorios.base import Repositorio
+
+
+class RepositorioCertificados(Repositorio):
+    colecao = "certificados"
+    campo_id = "id_certificado"
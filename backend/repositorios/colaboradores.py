@@ -0,0 +1,16 @@
+# Colaboradores: por padrão nunca devolvemos senha_hash
+from typing import Dict, List, Optional
+
+from repositorios.base import Repositorio
+
+
+class RepositorioColaboradores(Repositorio):
+    colecao = "colaboradores"
+    campo_id = "id_colaborador"
+
+    async def ids(self, filtro: Dict) -> List[int]:
+        # IDs que atendem ao filtro (ex.: ativos de uma área), pelo índice de cada campo
+        return await self._colecao.distinct(self.campo_id, filtro)
+
+    async def por_email(self, email: str, projecao: Optional[Dict[str, int]] = None) -> Optional[dict]:
+        return await self._colecao.find_one({"email": email}, projecao or self.projecao)
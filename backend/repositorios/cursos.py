@@ -0,0 +1,7 @@
+# Cursos: o slug fica fora da projeção padrão (só existe para o índice de unicidade)
+from repositorios.base import Repositorio
+
+
+class RepositorioCursos(Repositorio):
+    colecao = "cursos"
+    campo_id = "id_curso"
@@ -0,0 +1,22 @@
+# Inscrições e o progresso de cada uma (progressos é parte do mesmo agregado:
+# é criado junto com a inscrição e acompanha o status dela)
+from typing import Any, Dict, List
+
+from repositorios.base import Repositorio
+
+
+class RepositorioInscricoes(Repositorio):
+    colecao = "inscricoes"
+    campo_id = "id_inscricao"
+
+    async def inserir_com_progresso(self, inscricao: dict, progresso: dict):
+        await self.inserir(inscricao)
+        await self.db.progressos.insert_one(progresso)
+        progresso.pop("_id", None)
+
+    async def atualizar_progresso(self, id_inscricao: int, campos: Dict[str, Any]):
+        await self.db.progressos.update_one({"id_inscricao": id_inscricao}, {"$set": campos})
+
+    async def colaboradores_com_status(self, id_curso: int, status: List[str]) -> List[int]:
+        # Quem já tem inscrição no curso em algum dos status (índice idx_curso_status)
+        return await self._colecao.distinct("id_colaborador", {"id_curso": id_curso, "status": {"$in": status}})
@@ -0,0 +1,17 @@
+# Trilhas e seus vínculos com cursos (curso_trilha)
+from typing import List
+
+from repositorios.base import Repositorio
+
+
+class RepositorioTrilhas(Repositorio):
+    colecao = "trilhas"
+    campo_id = "id_trilha"
+
+    async def vincular(self, vinculo: dict):
+        await self.db.curso_trilha.insert_one(vinculo)
+        vinculo.pop("_id", None)
+
+    async def ids_regras(self, id_trilha: int) -> List[int]:
+        # Regras obrigatórias que exigem a trilha (são poucas: sem índice próprio)
+        return await self.db.regras_obrigatorias.distinct("id_regra", {"id_trilha": id_trilha})
@@ -0,0 +1,72 @@
+# Caminho rápido de resposta para listagens
+# Com response_model=List[X], o FastAPI valida e reserializa cada documento com o
+# Pydantic; em páginas de 1000 linhas isso domina o tempo de CPU da requisição.
+#
+# Contrato de projeção confiável: a rota consulta o MongoDB com projecao_do_modelo(X),
+# que traz exatamente os campos do modelo, e os handlers de escrita sempre gravam
+# documentos nesse formato (enums como string, datas nativas). Assim o documento
+# cru já tem o formato da resposta e pode ir direto para o encoder.
+#
+# O encoder é o orjson quando instalado; sem ele usamos json da biblioteca padrão.
+# As datas saem no mesmo formato do Pydantic (UTC com sufixo Z).
+
+import json
+from datetime import datetime, timezone
+from enum import Enum
+from typing import Any, Dict, Iterable, Optional
+
+from pydantic import BaseModel
+from starlette.responses import Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dependência opcional
+    orjson = None
+
+ORJSON_OPCOES = (orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+
+def _padrao(valor):
+    if isinstance(valor, datetime):
+        if valor.tzinfo is None:
+            valor = valor.replace(tzinfo=timezone.utc)
+        return valor.isoformat().replace("+00:00", "Z")
+    if isinstance(valor, Enum):
+        return valor.value
+    if isinstance(valor, BaseModel):
+        return valor.model_dump(mode="json")
+    return str(valor)
+
+
+def _padrao_orjson(valor):
+    # orjson já trata datetime e Enum; aqui chegam ObjectId, Decimal128, modelos...
+    if isinstance(valor, BaseModel):
+        return valor.model_dump(mode="json")
+    return str(valor)
+
+
+def serializar(dados: Any, ordenar: bool = False) -> bytes:
+    if orjson is not None:
+        opcoes = ORJSON_OPCOES | (orjson.OPT_SORT_KEYS if ordenar else 0)
+        return orjson.dumps(dados, default=_padrao_orjson, option=opcoes)
+    return json.dumps(dados, default=_padrao, ensure_ascii=False, sort_keys=ordenar,
+                      separators=(",", ":")).encode("utf-8")
+
+
+class RespostaJSONRapida(Response):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return serializar(content)
+
+
+def projecao_do_modelo(modelo: type, excluir: Iterable[str] = ()) -> Dict[str, int]:
+    # Projeção de inclusão com os campos do modelo: nada além do contrato sai do banco
+    excluir = set(excluir)
+    projecao = {"_id": 0}
+    projecao.update({campo: 1 for campo in modelo.model_fields if campo not in excluir})
+    return projecao
+
+
+def resposta_lista(docs: list, cabecalhos: Optional[Dict[str, str]] = None) -> RespostaJSONRapida:
+    return RespostaJSONRapida(content=docs, headers=cabecalhos)
@@ -2,23 +2,46 @@
 # Desenvolvedores: Thiago, Fabricio, Pettrin, Joseph
 # Sistema completo de gestão de treinamentos obrigatórios para trabalhadores
 
-from fastapi import FastAPI, APIRouter, HTTPException, Depends
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Query, Request, Response, File, UploadFile
+from fastapi.responses import FileResponse, StreamingResponse
+from starlette.background import BackgroundTask
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi import status as http_status
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
+import asyncio
+import hashlib
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict, EmailStr
 from typing import List, Optional
 from datetime import datetime, timezone, timedelta
-import bcrypt
 import jwt
 from enum import Enum
-import unicodedata
-from pymongo.errors import DuplicateKeyError
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from id_allocator import IdAllocator, DEFAULT_BLOCK_SIZE
+from password_pool import PasswordPool, PasswordPoolSaturated
+from ttl_cache import TTLCache
+from perfil_consultas import MonitorComandos, PerfilConsultasMiddleware
+from metricas import MetricasMiddleware, MonitorEventLoop, MonitorPoolConexoes, RegistroMetricas
+from cache_referencia import CacheReferencia, VersoesColecoes
+from autenticacao import CacheTokens, CarregadorPrincipal
+from busca_cursos import BuscaCursos, remover_acentos
+from resposta_rapida import RespostaJSONRapida, projecao_do_modelo, resposta_lista, serializar
+from auditoria import AuditoriaWriter, ParticoesAuditoria
+from arquivar_auditoria import ArquivamentoAuditoria, RETENCAO_PADRAO_MESES
+import indexes
+from conformidade import ConformidadeEngine, FilaConformidade, StatusConformidade
+from auto_inscricao import AutoInscricao
+from trilhas_grafo import GrafosTrilhas
+from importacao_colaboradores import ArquivoInvalido, ImportadorColaboradores, abrir_linhas
+from repositorios import (RepositorioCertificados, RepositorioColaboradores, RepositorioCursos,
+                          RepositorioInscricoes, RepositorioTrilhas)
+from relatorios import MEDIA_TYPES, FormatoRelatorio, Relatorios, TarefasRelatorio, TipoRelatorio
+from varredura_certificados import VarreduraCertificados
+from migrar_datas import CAMPOS_DATA, migracao_concluida, normalizar_datas
 
 ROOT_DIR = Path(__file__).parent
 # Try to load .env robustly. Some environments or editors create files with BOM
@@ -71,14 +94,49 @@ if raw_mongo:
 
 if not mongo_url:
     raise RuntimeError('MONGO_URL environment variable is missing or empty')
-client = AsyncIOMotorClient(mongo_url)
+# Perfil das consultas por requisição (ver perfil_consultas.py). Com MONGO_PERFIL=0
+# o listener não é registrado e o driver não chama nada a mais por comando.
+MONGO_PERFIL = os.environ.get('MONGO_PERFIL', '1') != '0'
+monitor_comandos = MonitorComandos(lento_ms=float(os.environ.get('MONGO_COMANDO_LENTO_MS', '100')))
+
+# Métricas para o Prometheus em GET /metrics (ver metricas.py). Com vários workers,
+# METRICAS_DIR aponta para um diretório compartilhado entre eles.
+METRICAS = os.environ.get('METRICAS', '1') != '0'
+registro_metricas = RegistroMetricas(diretorio=os.environ.get('METRICAS_DIR') or None,
+                                     intervalo=float(os.environ.get('METRICAS_INTERVALO', '5')))
+monitor_event_loop = MonitorEventLoop(registro_metricas)
+monitor_pool_conexoes = MonitorPoolConexoes(registro_metricas)
+
+# tz_aware: datas nativas do BSON voltam como datetime UTC com fuso
+client = AsyncIOMotorClient(mongo_url, tz_aware=True,
+                            event_listeners=([monitor_comandos] if MONGO_PERFIL else [])
+                            + ([monitor_pool_conexoes] if METRICAS else []))
 db = client[os.environ.get('DB_NAME', 'techsolutions_treinamentos')]
 
+# Alocador de IDs em blocos: um $inc em db.counters reserva ID_BLOCK_SIZE IDs por coleção
+id_allocator = IdAllocator(db.counters, block_size=int(os.environ.get('ID_BLOCK_SIZE', DEFAULT_BLOCK_SIZE)))
+
 # Definimos as configurações JWT para autenticação
 JWT_SECRET = os.environ.get('JWT_SECRET', 'your-secret-key-change-in-production')
 JWT_ALGORITHM = 'HS256'
 JWT_EXPIRATION_HOURS = 24
 
+# Pool dedicado ao bcrypt, para não bloquear o event loop (ver password_pool.py)
+password_pool = PasswordPool.from_env()
+
+senha_pool_pendentes = registro_metricas.medidor("senha_pool_pendentes",
+                                                 "Operações de senha em execução ou na fila do executor")
+senha_pool_limite = registro_metricas.medidor("senha_pool_limite_fila", "Tamanho máximo da fila do pool de senhas")
+senha_pool_recusadas = registro_metricas.medidor("senha_pool_recusadas",
+                                                 "Operações de senha recusadas por fila cheia desde a subida do worker")
+
+def coletar_password_pool():
+    senha_pool_pendentes.definir(password_pool.pending)
+    senha_pool_limite.definir(password_pool.max_queue)
+    senha_pool_recusadas.definir(password_pool.rejected)
+
+registro_metricas.coletor(coletar_password_pool)
+
 # Criamos nossa aplicação principal FastAPI
 app = FastAPI(
     title="TechSolutions - Sistema de Treinamentos Obrigatórios",
@@ -122,6 +180,10 @@ class TipoTreinamento(str, Enum):
     PREVENCAO_ACIDENTES = "prevencao_acidentes"
     OUTROS = "outros"
 
+class FormatoLista(str, Enum):
+    JSON = "json"
+    NDJSON = "ndjson"  # Uma linha JSON por documento, em streaming
+
 class AcaoAuditoria(str, Enum):
     CREATE = "CREATE"
     UPDATE = "UPDATE"
@@ -327,6 +389,27 @@ class InscricaoCreate(BaseModel):
     data_prevista: Optional[datetime] = None
     tipo_inscricao: TipoInscricao = TipoInscricao.MANUAL
 
+# Inscrição em lote: lista explícita de colaboradores ou seletor por área/cargo
+class InscricaoLoteCreate(BaseModel):
+    id_curso: int
+    ids_colaborador: Optional[List[int]] = None
+    id_area: Optional[int] = None
+    id_cargo: Optional[int] = None
+    data_prevista: Optional[datetime] = None
+    tipo_inscricao: TipoInscricao = TipoInscricao.MANUAL
+
+class ResultadoInscricaoLote(BaseModel):
+    id_colaborador: int
+    resultado: str  # inscrito, ja_inscrito, colaborador_invalido, erro
+    id_inscricao: Optional[int] = None
+
+class InscricaoLoteResposta(BaseModel):
+    id_curso: int
+    total: int
+    inscritos: int
+    ignorados: int
+    resultados: List[ResultadoInscricaoLote]
+
 class InscricaoUpdate(BaseModel):
     status: Optional[StatusInscricao] = None
     data_conclusao: Optional[datetime] = None
@@ -393,6 +476,12 @@ class Certificado(CertificadoBase):
     id_certificado: int
     model_config = ConfigDict(extra="ignore")
 
+# Painel do colaborador: cada inscrição com curso, progresso e certificado embutidos
+class ItemPainel(Inscricao):
+    curso: Optional[Curso] = None
+    progresso: Optional[Progresso] = None
+    certificado: Optional[Certificado] = None
+
 # Modelo de Auditoria - Mantemos log completo de todas ações no sistema
 class AuditoriaBase(BaseModel):
     id_colaborador_acao: int
@@ -417,14 +506,40 @@ class Auditoria(AuditoriaBase):
     id_auditoria: int
     model_config = ConfigDict(extra="ignore")
 
+# Modelo de Conformidade - Situação materializada de cada colaborador frente às regras obrigatórias
+class ObrigacaoConformidade(BaseModel):
+    id_regra: int
+    id_curso: Optional[int] = None
+    id_trilha: Optional[int] = None
+    status: StatusConformidade
+    data_validade: Optional[datetime] = None
+
+class Conformidade(BaseModel):
+    id_colaborador: int
+    nome: Optional[str] = None
+    id_cargo: Optional[int] = None
+    id_area: Optional[int] = None
+    status: StatusConformidade  # Pior status entre as obrigações
+    obrigacoes: List[ObrigacaoConformidade] = []
+    calculado_em: datetime
+    model_config = ConfigDict(extra="ignore")
+
 # =============== FUNÇÕES AUXILIARES ===============
 # Aqui criamos funções que utilizamos em várias partes do sistema
 
-def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+# Todo trabalho com senhas passa pelo password_pool. Se a fila estiver cheia
+# respondemos 503 com Retry-After em vez de enfileirar indefinidamente.
+async def hash_password(password: str) -> str:
+    try:
+        return await password_pool.hash(password)
+    except PasswordPoolSaturated:
+        raise HTTPException(status_code=503, detail="Servidor ocupado, tente novamente", headers={"Retry-After": "1"})
 
-def verify_password(password: str, hashed: str) -> bool:
-    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+async def verify_password(password: str, hashed: str) -> bool:
+    try:
+        return await password_pool.verify(password, hashed)
+    except PasswordPoolSaturated:
+        raise HTTPException(status_code=503, detail="Servidor ocupado, tente novamente", headers={"Retry-After": "1"})
 
 def create_access_token(data: dict) -> str:
     to_encode = data.copy()
@@ -432,32 +547,93 @@ def create_access_token(data: dict) -> str:
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
-def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
+# Tokens já decodificados ficam em cache até o exp; o principal (colaborador, perfil,
+# permissões) é carregado uma vez por requisição a partir de um cache curto (ver autenticacao.py)
+tokens_cache = CacheTokens(
+    lambda token: jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM]),
+    maxsize=int(os.environ.get('AUTH_TOKEN_CACHE', '10000')),
+)
+principais = CarregadorPrincipal(
+    db,
+    VersoesColecoes(db.versoes_cache, intervalo=float(os.environ.get('AUTH_VERIFICACAO', '1'))),
+    ttl=float(os.environ.get('AUTH_PRINCIPAL_TTL', '30')),
+)
+
+async def carregar_principal(request: Request, payload: dict) -> Optional[dict]:
+    # Guardamos em request.state: no máximo uma resolução por requisição
+    if not hasattr(request.state, "principal"):
+        sub = payload.get("sub")
+        request.state.principal = await principais.obter(int(sub)) if sub and str(sub).isdigit() else None
+    return request.state.principal
+
+async def verify_token(request: Request, credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
     try:
-        payload = jwt.decode(credentials.credentials, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-        return payload
+        payload = tokens_cache.decodificar(credentials.credentials)
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expirado")
-    except jwt.JWTError:
+    except jwt.InvalidTokenError:
+        raise HTTPException(status_code=401, detail="Token inválido")
+    sub = payload.get("sub")
+    principal = await carregar_principal(request, payload)
+    # Colaborador inativado (ou removido) perde o acesso sem esperar o token expirar
+    if sub and str(sub).isdigit() and principal is None:
         raise HTTPException(status_code=401, detail="Token inválido")
+    if principal is not None and not principal.get("ativo", True):
+        raise HTTPException(status_code=401, detail="Colaborador inativo")
+    return payload
+
+async def principal_atual(request: Request, token: dict = Depends(verify_token)) -> dict:
+    principal = await carregar_principal(request, token)
+    if principal is None:
+        raise HTTPException(status_code=401, detail="Token inválido")
+    return principal
+
+def exigir_permissao(permissao: str):
+    # Dependência para rotas restritas: Depends(exigir_permissao("admin"))
+    async def verificar(principal: dict = Depends(principal_atual)) -> dict:
+        if permissao not in principal["permissoes"]:
+            raise HTTPException(status_code=403, detail="Permissão insuficiente")
+        return principal
+    return verificar
 
 async def get_next_id(collection_name: str) -> int:
-    # Geramos IDs sequenciais para nossas coleções do MongoDB
-    counter = await db.counters.find_one_and_update(
-        {"_id": collection_name},
-        {"$inc": {"seq": 1}},
-        upsert=True,
-        return_document=True
-    )
-    return counter["seq"] if counter else 1
+    # Geramos IDs sequenciais para nossas coleções do MongoDB a partir da faixa
+    # arrendada em memória; só vamos ao db.counters quando a faixa acaba
+    return await id_allocator.next_id(collection_name)
+
+async def get_next_ids(collection_name: str, quantidade: int) -> List[int]:
+    # Reservamos vários IDs de uma vez para inserções em lote
+    return await id_allocator.next_ids(collection_name, quantidade)
+
+# Auditoria gravada em segundo plano, em lotes, em partições mensais auditoria_AAAAMM
+# (ver auditoria.py): registrar não faz I/O
+auditoria_particoes = ParticoesAuditoria(db)
+auditoria = AuditoriaWriter(
+    auditoria_particoes,
+    lambda quantidade: get_next_ids("auditoria", quantidade),
+    intervalo=float(os.environ.get('AUDITORIA_INTERVALO_MS', '200')) / 1000,
+    lote=int(os.environ.get('AUDITORIA_LOTE', '500')),
+    max_fila=int(os.environ.get('AUDITORIA_MAX_FILA', '10000')),
+)
+
+def contexto_auditoria(request: Request, token: dict = Depends(verify_token)) -> dict:
+    # Quem fez e de onde; o verify_token é o mesmo da rota (o FastAPI reaproveita a dependência)
+    sub = token.get("sub")
+    return {
+        "id_colaborador_acao": int(sub) if sub and str(sub).isdigit() else None,
+        "ip_origem": request.client.host if request.client else None,
+    }
+
+def auditar(auditor: dict, acao: AcaoAuditoria, tabela: str, id_registro: Optional[int],
+            antes: Optional[dict] = None, depois: Optional[dict] = None):
+    auditoria.registrar(auditor["id_colaborador_acao"], acao, tabela, id_registro,
+                        antes, depois, auditor["ip_origem"])
 
 # Normaliza título para comparação/índice case/acento-insensível
 def slugify_title(t: str) -> str:
     if not t:
         return ""
-    t = t.strip().lower()
-    t = unicodedata.normalize("NFKD", t)
-    t = "".join(ch for ch in t if not unicodedata.combining(ch))
+    t = remover_acentos(t.strip())
     cleaned = []
     for ch in t:
         if ch.isalnum():
@@ -469,16 +645,160 @@ def slugify_title(t: str) -> str:
         s = s.replace("--", "-")
     return s.strip("-")
 
+# =============== PAGINAÇÃO E STREAMING ===============
+# As listagens usam paginação por chave (keyset) no campo inteiro id_*:
+# ?after=<último id recebido>&limit=<n>. Quando há mais documentos devolvemos o
+# próximo cursor no cabeçalho X-Next-Cursor, mantendo o corpo como lista.
+# Com ?formato=ndjson os documentos vêm direto do cursor do Motor, sem
+# acumular em memória, para exportações completas.
+
+MAX_PAGE_SIZE = 1000
+NDJSON_BATCH_SIZE = 500
+
+# Caminho rápido (ver resposta_rapida.py): as listagens abaixo consultam com a
+# projeção do próprio modelo e devolvem os documentos direto para o orjson, sem
+# revalidar linha a linha com o Pydantic. RESPOSTA_RAPIDA escolhe as rotas:
+# "*" para todas, vazio para nenhuma ou nomes separados por vírgula.
+ROTAS_RAPIDAS = {r.strip() for r in os.environ.get('RESPOSTA_RAPIDA', '*').split(',') if r.strip()}
+
+PROJECAO_COLABORADOR = projecao_do_modelo(Colaborador)
+PROJECAO_REGRA = projecao_do_modelo(RegraObrigatorio)
+PROJECAO_INSCRICAO = projecao_do_modelo(Inscricao)
+PROJECAO_CERTIFICADO = projecao_do_modelo(Certificado)
+PROJECAO_CONFORMIDADE = projecao_do_modelo(Conformidade)
+PROJECAO_CURSO = projecao_do_modelo(Curso)
+PROJECAO_TRILHA = projecao_do_modelo(Trilha)
+
+# =============== REPOSITÓRIOS ===============
+# Acesso por ID aos agregados principais (ver repositorios/): buscas concorrentes no
+# mesmo agregado viram um único $in e as checagens de existência trazem só o ID.
+# O padrão de cada repositório é a projeção do modelo de resposta.
+repo_colaboradores = RepositorioColaboradores(db, PROJECAO_COLABORADOR)
+repo_cursos = RepositorioCursos(db, PROJECAO_CURSO)
+repo_trilhas = RepositorioTrilhas(db, PROJECAO_TRILHA)
+repo_inscricoes = RepositorioInscricoes(db, PROJECAO_INSCRICAO)
+repo_certificados = RepositorioCertificados(db, PROJECAO_CERTIFICADO)
+
+def responder_lista(rota: str, docs: list, response: Response):
+    if "*" in ROTAS_RAPIDAS or rota in ROTAS_RAPIDAS:
+        # Ao devolver um Response pronto, os cabeçalhos do parâmetro response não são copiados
+        cursor = response.headers.get("X-Next-Cursor")
+        return resposta_lista(docs, {"X-Next-Cursor": cursor} if cursor else None)
+    return docs
+
+async def paginar(colecao, query: dict, projection: dict, campo_id: str,
+                  after: Optional[int], limit: int, response: Response) -> list:
+    if after is not None:
+        query = {**query, campo_id: {"$gt": after}}
+    # Buscamos um documento a mais só para saber se existe próxima página
+    docs = await colecao.find(query, projection).sort(campo_id, 1).limit(limit + 1).to_list(limit + 1)
+    if len(docs) > limit:
+        docs = docs[:limit]
+        response.headers["X-Next-Cursor"] = str(docs[-1][campo_id])
+    return docs
+
+def stream_ndjson(colecao, query: dict, projection: dict, campo_id: str,
+                  after: Optional[int] = None) -> StreamingResponse:
+    if after is not None:
+        query = {**query, campo_id: {"$gt": after}}
+    cursor = colecao.find(query, projection).sort(campo_id, 1).batch_size(NDJSON_BATCH_SIZE)
+
+    async def linhas():
+        try:
+            async for doc in cursor:
+                yield serializar(doc) + b"\n"
+        finally:
+            await cursor.close()
+
+    return StreamingResponse(linhas(), media_type="application/x-ndjson")
+
+# =============== DATAS ===============
+# As datas são gravadas como datas nativas do BSON. Documentos antigos podem ter
+# strings ISO até que migrar_datas.py termine; enquanto isso mantemos a leitura
+# dupla. Depois da migração (marca em db.migracoes) o caminho de leitura não
+# converte nada.
+
+datas_nativas = False
+
+def _utc(valor: datetime) -> datetime:
+    return valor.replace(tzinfo=timezone.utc) if valor.tzinfo is None else valor.astimezone(timezone.utc)
+
+def ler_datas(docs: list, campos: List[str]) -> list:
+    if not datas_nativas:
+        for doc in docs:
+            normalizar_datas(doc, campos)
+    return docs
+
+def filtro_intervalo(campo: str, desde: Optional[datetime], ate: Optional[datetime]) -> dict:
+    intervalo = {}
+    if desde is not None:
+        intervalo["$gte"] = _utc(desde)
+    if ate is not None:
+        intervalo["$lte"] = _utc(ate)
+    if not intervalo:
+        return {}
+    if datas_nativas:
+        return {campo: intervalo}
+    textual = {op: valor.isoformat() for op, valor in intervalo.items()}
+    return {"$or": [{campo: intervalo}, {campo: {"$type": "string", **textual}}]}
+
+# =============== CACHE HTTP ===============
+# ETag calculado sobre o conteúdo da resposta. Se o cliente enviar o mesmo valor em
+# If-None-Match respondemos 304 sem corpo; o navegador reaproveita a cópia local.
+
+def calcular_etag(dados) -> str:
+    return '"' + hashlib.sha1(serializar(dados, ordenar=True)).hexdigest() + '"'
+
+def etag_confere(request: Request, etag: str) -> bool:
+    recebido = request.headers.get("if-none-match")
+    if not recebido:
+        return False
+    if recebido.strip() == "*":
+        return True
+    # Comparação fraca: ignoramos o prefixo W/ que proxies podem acrescentar
+    return etag in (valor.strip().removeprefix("W/") for valor in recebido.split(","))
+
+def nao_modificado(etag: str, cache_control: str) -> Response:
+    return Response(status_code=http_status.HTTP_304_NOT_MODIFIED,
+                    headers={"ETag": etag, "Cache-Control": cache_control})
+
+# =============== CACHE DE DADOS DE REFERÊNCIA ===============
+# Cargos, perfis, cursos e trilhas mudam pouco: as listagens saem de um cache em
+# memória já serializado (ver cache_referencia.py). Os handlers de escrita chamam
+# cache_referencia.invalidar(<coleção>), o que também avisa os outros workers.
+
+cache_referencia = CacheReferencia(
+    VersoesColecoes(db.versoes_cache, intervalo=float(os.environ.get('REFERENCIA_VERIFICACAO', '1'))),
+    ttl=float(os.environ.get('REFERENCIA_CACHE_TTL', '300')),
+)
+REFERENCIA_CACHE_CONTROL = "private, no-cache"
+
+async def resposta_referencia(request: Request, chave, dependencias: List[str], modelo: type, carregar) -> Response:
+    entrada = await cache_referencia.obter(chave, dependencias, modelo, carregar)
+    if etag_confere(request, entrada["etag"]):
+        return nao_modificado(entrada["etag"], REFERENCIA_CACHE_CONTROL)
+    return Response(
+        content=entrada["corpo"],
+        media_type="application/json",
+        headers={"ETag": entrada["etag"], "Cache-Control": REFERENCIA_CACHE_CONTROL, **entrada["cabecalhos"]},
+    )
+
+async def carregar_pagina(colecao, query: dict, projection: dict, campo_id: str, after: Optional[int], limit: int):
+    # paginar() grava X-Next-Cursor em um Response; guardamos o cabeçalho junto com a entrada do cache
+    rascunho = Response()
+    docs = await paginar(colecao, query, projection, campo_id, after, limit, rascunho)
+    cursor = rascunho.headers.get("X-Next-Cursor")
+    return docs, ({"X-Next-Cursor": cursor} if cursor else {})
+
 # =============== ROTAS DE AUTENTICAÇÃO ===============
 # Implementamos login e registro seguro com JWT
 
 @api_router.post("/auth/register", response_model=Colaborador)
 async def register(colaborador: ColaboradorCreate):
-    existing = await db.colaboradores.find_one({"email": colaborador.email})
-    if existing:
+    if await repo_colaboradores.por_email(colaborador.email, {"_id": 1}):
         raise HTTPException(status_code=400, detail="Email já cadastrado")
     
-    senha_hash = hash_password(colaborador.senha)
+    senha_hash = await hash_password(colaborador.senha)
     id_colaborador = await get_next_id("colaboradores")
     
     doc = {
@@ -491,17 +811,23 @@ async def register(colaborador: ColaboradorCreate):
         "id_area": colaborador.id_area,
         "id_perfil": colaborador.id_perfil,
         "id_gestor": colaborador.id_gestor,
-        "data_admissao": colaborador.data_admissao.isoformat() if colaborador.data_admissao else None,
+        "data_admissao": colaborador.data_admissao,
         "ativo": colaborador.ativo
     }
     
-    await db.colaboradores.insert_one(doc)
+    try:
+        await repo_colaboradores.inserir(doc)
+    except DuplicateKeyError:
+        # Corrida entre dois cadastros com o mesmo email (índice uniq_email)
+        raise HTTPException(status_code=400, detail="Email já cadastrado")
+    conformidade_fila.marcar_colaborador(id_colaborador)
+    await auto_inscricao.solicitar_colaborador(id_colaborador)
     return Colaborador(**{k: v for k, v in doc.items() if k != 'senha_hash'})
 
 @api_router.post("/auth/login", response_model=Token)
-async def login(credentials: ColaboradorLogin):
-    colab = await db.colaboradores.find_one({"email": credentials.email})
-    if not colab or not verify_password(credentials.senha, colab["senha_hash"]):
+async def login(credentials: ColaboradorLogin, request: Request):
+    colab = await repo_colaboradores.por_email(credentials.email, {**PROJECAO_COLABORADOR, "senha_hash": 1})
+    if not colab or not await verify_password(credentials.senha, colab["senha_hash"]):
         raise HTTPException(status_code=401, detail="Credenciais inválidas")
     
     if not colab.get("ativo", True):
@@ -509,13 +835,8 @@ async def login(credentials: ColaboradorLogin):
     
     token = create_access_token({"sub": str(colab["id_colaborador"]), "email": colab["email"]})
     
-    await db.auditoria.insert_one({
-        "id_auditoria": await get_next_id("auditoria"),
-        "id_colaborador_acao": colab["id_colaborador"],
-        "acao": AcaoAuditoria.LOGIN.value,
-        "nome_tabela": "colaboradores",
-        "data_hora": datetime.now(timezone.utc).isoformat()
-    })
+    auditoria.registrar(colab["id_colaborador"], AcaoAuditoria.LOGIN, "colaboradores", colab["id_colaborador"],
+                        ip_origem=request.client.host if request.client else None)
     
     return Token(
         access_token=token,
@@ -523,6 +844,14 @@ async def login(credentials: ColaboradorLogin):
         colaborador=Colaborador(**{k: v for k, v in colab.items() if k != 'senha_hash'})
     )
 
+@api_router.get("/auth/me")
+async def get_usuario_atual(principal: dict = Depends(principal_atual)):
+    return principal
+
+@api_router.get("/auth/cache")
+async def get_auth_cache_stats(token: dict = Depends(verify_token)):
+    return {"tokens": tokens_cache.stats(), "principais": principais.stats()}
+
 # [Continuing with all CRUD routes from previous code...]
 # I'll include key routes to stay within limits
 
@@ -532,11 +861,16 @@ async def login(credentials: ColaboradorLogin):
 # Permite vincular cursos a trilhas
 from fastapi import Body
 
+# Grafo de pré-requisitos de cada trilha em memória (ver trilhas_grafo.py); usa as
+# mesmas versões de "trilhas"/"curso_trilha" do cache de referência para invalidar
+grafos_trilhas = GrafosTrilhas(db, cache_referencia.versoes, ttl=float(os.environ.get('REFERENCIA_CACHE_TTL', '300')))
+
 # Endpoint para vincular curso a trilha
 @api_router.post("/curso_trilha")
 async def vincular_curso_trilha(
     payload: dict = Body(...),
-    token: dict = Depends(verify_token)
+    token: dict = Depends(verify_token),
+    auditor: dict = Depends(contexto_auditoria)
 ):
     # payload: {id_curso, id_trilha, ordem, obrigatorio, id_prerequisito (opcional)}
     id_curso = payload.get("id_curso")
@@ -546,6 +880,22 @@ async def vincular_curso_trilha(
     id_prerequisito = payload.get("id_prerequisito")
     if not id_curso or not id_trilha:
         raise HTTPException(status_code=400, detail="id_curso e id_trilha são obrigatórios")
+    # As checagens de curso e pré-requisito saem em uma só consulta $in
+    trilha_existe, curso_existe, prerequisito_existe = await asyncio.gather(
+        repo_trilhas.existe(id_trilha), repo_cursos.existe(id_curso),
+        repo_cursos.existe(id_prerequisito) if id_prerequisito else asyncio.sleep(0, True))
+    if not trilha_existe:
+        raise HTTPException(status_code=404, detail="Trilha não encontrada")
+    if not curso_existe:
+        raise HTTPException(status_code=404, detail="Curso não encontrado")
+    if not prerequisito_existe:
+        raise HTTPException(status_code=404, detail="Curso pré-requisito não encontrado")
+    if id_prerequisito:
+        # Recusamos o vínculo que tornaria a trilha impossível de concluir
+        ciclo = (await grafos_trilhas.obter(id_trilha)).ciclo_com(id_curso, id_prerequisito)
+        if ciclo:
+            raise HTTPException(status_code=400,
+                                detail="Pré-requisito cria ciclo na trilha: " + " -> ".join(map(str, ciclo)))
     # Gera novo id_curso_trilha
     id_curso_trilha = await get_next_id("curso_trilha")
     doc = {
@@ -557,9 +907,13 @@ async def vincular_curso_trilha(
     }
     if id_prerequisito:
         doc["id_prerequisito"] = id_prerequisito
-    result = await db.curso_trilha.insert_one(doc)
-    if '_id' in doc:
-        del doc['_id']
+    await repo_trilhas.vincular(doc)
+    auditar(auditor, AcaoAuditoria.CREATE, "curso_trilha", id_curso_trilha, depois=doc)
+    conformidade_fila.marcar_trilha(id_trilha)
+    await cache_referencia.invalidar("curso_trilha")
+    # Curso novo em trilha exigida por regra: inscrevemos quem ainda não o tem
+    for id_regra in await repo_trilhas.ids_regras(id_trilha):
+        await auto_inscricao.solicitar_regra(id_regra)
     return {"message": "Curso vinculado à trilha com sucesso", **doc}
 
 @api_router.post("/cargos", response_model=Cargo)
@@ -567,18 +921,21 @@ async def create_cargo(cargo: CargoCreate, token: dict = Depends(verify_token)):
     id_cargo = await get_next_id("cargos")
     doc = {"id_cargo": id_cargo, **cargo.model_dump()}
     await db.cargos.insert_one(doc)
+    await cache_referencia.invalidar("cargos")
     return Cargo(**doc)
 
 @api_router.get("/cargos", response_model=List[Cargo])
-async def get_cargos(token: dict = Depends(verify_token)):
-    cargos = await db.cargos.find({}, {"_id": 0}).to_list(1000)
-    return cargos
+async def get_cargos(request: Request, token: dict = Depends(verify_token)):
+    async def carregar():
+        return await db.cargos.find({}, {"_id": 0}).to_list(1000), {}
+    return await resposta_referencia(request, ("cargos",), ["cargos"], Cargo, carregar)
 
 @api_router.delete("/cargos/{id_cargo}")
 async def delete_cargo(id_cargo: int, token: dict = Depends(verify_token)):
     result = await db.cargos.delete_one({"id_cargo": id_cargo})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Cargo não encontrado")
+    await cache_referencia.invalidar("cargos")
     return {"message": "Cargo deletado com sucesso"}
 
 # =============== ROTAS DE PERFIL ===============
@@ -589,36 +946,168 @@ async def create_perfil(perfil: PerfilCreate, token: dict = Depends(verify_token
     id_perfil = await get_next_id("perfis")
     doc = {"id_perfil": id_perfil, **perfil.model_dump()}
     await db.perfis.insert_one(doc)
+    await cache_referencia.invalidar("perfis")
     return Perfil(**doc)
 
 @api_router.get("/perfis", response_model=List[Perfil])
-async def get_perfis(token: dict = Depends(verify_token)):
-    perfis = await db.perfis.find({}, {"_id": 0}).to_list(1000)
-    return perfis
+async def get_perfis(request: Request, token: dict = Depends(verify_token)):
+    async def carregar():
+        return await db.perfis.find({}, {"_id": 0}).to_list(1000), {}
+    return await resposta_referencia(request, ("perfis",), ["perfis"], Perfil, carregar)
 
 # =============== ROTAS DE COLABORADOR ===============
 # Gerenciamos nossos trabalhadores rurais
 
+# Importação em lote por CSV/XLSX (ver importacao_colaboradores.py)
+importador_colaboradores = ImportadorColaboradores(
+    db,
+    ColaboradorCreate,
+    lambda quantidade: get_next_ids("colaboradores", quantidade),
+    workers=int(os.environ['IMPORTACAO_WORKERS']) if os.environ.get('IMPORTACAO_WORKERS') else None,
+    lote=int(os.environ.get('IMPORTACAO_LOTE', '1000')),
+)
+
+def _colaboradores_importados(ids_colaborador: List[int]):
+    for id_colaborador in ids_colaborador:
+        conformidade_fila.marcar_colaborador(id_colaborador)
+
+@api_router.post("/colaboradores/importar")
+async def importar_colaboradores(
+    arquivo: UploadFile = File(...),
+    simular: bool = False,
+    admin: dict = Depends(exigir_permissao("admin")),
+    auditor: dict = Depends(contexto_auditoria)
+):
+    # simular=true valida o arquivo inteiro e devolve o relatório sem gravar nada
+    importados: List[int] = []
+
+    def ao_inserir(ids_colaborador: List[int]):
+        _colaboradores_importados(ids_colaborador)
+        importados.extend(ids_colaborador)
+
+    try:
+        linhas = abrir_linhas(arquivo.file, arquivo.filename)
+        resultado = await importador_colaboradores.importar(linhas, simular, ao_inserir)
+    except ArquivoInvalido as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    if resultado["importados"] and not simular:
+        # Inscrição automática só para os colaboradores importados, não para a base inteira
+        await auto_inscricao.solicitar_colaboradores(importados)
+        auditar(auditor, AcaoAuditoria.CREATE, "colaboradores", None,
+                depois={"arquivo": arquivo.filename, "importados": resultado["importados"]})
+    return resultado
+
 @api_router.get("/colaboradores", response_model=List[Colaborador])
-async def get_colaboradores(ativo: Optional[bool] = None, token: dict = Depends(verify_token)):
+async def get_colaboradores(
+    response: Response,
+    ativo: Optional[bool] = None,
+    after: Optional[int] = None,
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    formato: FormatoLista = FormatoLista.JSON,
+    token: dict = Depends(verify_token)
+):
     query = {}
     if ativo is not None:
         query["ativo"] = ativo
-    colaboradores = await db.colaboradores.find(query, {"_id": 0, "senha_hash": 0}).to_list(1000)
-    return colaboradores
+    if formato == FormatoLista.NDJSON:
+        return stream_ndjson(db.colaboradores, query, PROJECAO_COLABORADOR, "id_colaborador", after)
+    colaboradores = await paginar(db.colaboradores, query, PROJECAO_COLABORADOR, "id_colaborador", after, limit, response)
+    return responder_lista("colaboradores", colaboradores, response)
 
 @api_router.get("/colaboradores/{id_colaborador}", response_model=Colaborador)
 async def get_colaborador(id_colaborador: int, token: dict = Depends(verify_token)):
-    colab = await db.colaboradores.find_one({"id_colaborador": id_colaborador}, {"_id": 0, "senha_hash": 0})
+    colab = await repo_colaboradores.obter(id_colaborador)
     if not colab:
         raise HTTPException(status_code=404, detail="Colaborador não encontrado")
     return Colaborador(**colab)
 
+# Uma única agregação substitui a listagem de inscrições seguida de um GET /cursos/{id}
+# por inscrição; os $lookup usam os índices por id_curso e id_inscricao
+# Os $lookup trazem só os campos dos modelos, como as rotas de listagem (sem slug etc.)
+PAINEL_PIPELINE = [
+    {"$sort": {"id_inscricao": 1}},
+    {"$lookup": {"from": "cursos", "localField": "id_curso", "foreignField": "id_curso",
+                 "pipeline": [{"$project": PROJECAO_CURSO}], "as": "curso"}},
+    {"$lookup": {"from": "progressos", "localField": "id_inscricao", "foreignField": "id_inscricao",
+                 "pipeline": [{"$project": projecao_do_modelo(Progresso)}], "as": "progresso"}},
+    {"$lookup": {"from": "certificados", "localField": "id_inscricao", "foreignField": "id_inscricao",
+                 "pipeline": [{"$sort": {"id_certificado": -1}}, {"$limit": 1}, {"$project": PROJECAO_CERTIFICADO}],
+                 "as": "certificado"}},
+    # Só os campos do ItemPainel: com RESPOSTA_RAPIDA o response_model não filtra a saída,
+    # então o que sai do pipeline (e entra no ETag) é o que o cliente recebe
+    {"$project": projecao_do_modelo(ItemPainel)},
+    {"$set": {
+        "curso": {"$arrayElemAt": ["$curso", 0]},
+        "progresso": {"$arrayElemAt": ["$progresso", 0]},
+        "certificado": {"$arrayElemAt": ["$certificado", 0]},
+    }},
+]
+PAINEL_CACHE_CONTROL = "private, no-cache"
+
+@api_router.get("/colaboradores/{id_colaborador}/painel", response_model=List[ItemPainel])
+async def get_painel_colaborador(id_colaborador: int, request: Request, response: Response,
+                                 token: dict = Depends(verify_token)):
+    itens = await db.inscricoes.aggregate(
+        [{"$match": {"id_colaborador": id_colaborador}}, *PAINEL_PIPELINE]).to_list(None)
+    if not itens and not await repo_colaboradores.existe(id_colaborador):
+        raise HTTPException(status_code=404, detail="Colaborador não encontrado")
+    ler_datas(itens, CAMPOS_DATA["inscricoes"])
+    ler_datas([i["progresso"] for i in itens if i.get("progresso")], CAMPOS_DATA["progressos"])
+    ler_datas([i["certificado"] for i in itens if i.get("certificado")], CAMPOS_DATA["certificados"])
+
+    etag = calcular_etag(itens)
+    if etag_confere(request, etag):
+        return nao_modificado(etag, PAINEL_CACHE_CONTROL)
+    if "*" in ROTAS_RAPIDAS or "painel" in ROTAS_RAPIDAS:
+        return resposta_lista(itens, {"ETag": etag, "Cache-Control": PAINEL_CACHE_CONTROL})
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = PAINEL_CACHE_CONTROL
+    return itens
+
+# Campos que só o administrador altera: o próprio colaborador não pode se promover,
+# se reativar ou mudar de cargo/área (o que mudaria suas obrigações)
+CAMPOS_SO_ADMIN = {"id_perfil", "ativo", "id_cargo", "id_area", "id_gestor"}
+
+@api_router.put("/colaboradores/{id_colaborador}", response_model=Colaborador)
+async def update_colaborador(id_colaborador: int, update: ColaboradorUpdate,
+                             principal: dict = Depends(principal_atual),
+                             auditor: dict = Depends(contexto_auditoria)):
+    data = update.model_dump(exclude_unset=True)
+    # Administrador edita qualquer cadastro; os demais só o próprio e sem os campos restritos
+    if "admin" not in principal["permissoes"]:
+        if principal["id_colaborador"] != id_colaborador or CAMPOS_SO_ADMIN & data.keys():
+            raise HTTPException(status_code=403, detail="Permissão insuficiente")
+
+    existing = await repo_colaboradores.obter(id_colaborador)
+    if not existing:
+        raise HTTPException(status_code=404, detail="Colaborador não encontrado")
+
+    senha = data.pop("senha", None)
+    if senha:
+        data["senha_hash"] = await hash_password(senha)
+    if data:
+        try:
+            await repo_colaboradores.atualizar(id_colaborador, data)
+        except DuplicateKeyError:
+            raise HTTPException(status_code=400, detail="Email já cadastrado")
+    # Inativação ou troca de perfil vale já na próxima requisição do colaborador
+    if any(campo in data and data[campo] != existing.get(campo) for campo in ("ativo", "id_perfil", "email")):
+        await principais.invalidar()
+    # Mudança de cargo, área ou ativação altera as regras obrigatórias que se aplicam
+    if any(campo in data and data[campo] != existing.get(campo) for campo in ("id_cargo", "id_area", "ativo")):
+        conformidade_fila.marcar_colaborador(id_colaborador)
+        await auto_inscricao.solicitar_colaborador(id_colaborador)
+    antes = dict(existing)
+    existing.update({k: v for k, v in data.items() if k != "senha_hash"})
+    if data:
+        auditar(auditor, AcaoAuditoria.UPDATE, "colaboradores", id_colaborador, antes, existing)
+    return Colaborador(**existing)
+
 # =============== ROTAS DE CURSO ===============
 # Criamos e gerenciamos os treinamentos obrigatórios
 
 @api_router.post("/cursos", response_model=Curso)
-async def create_curso(curso: CursoCreate, token: dict = Depends(verify_token)):
+async def create_curso(curso: CursoCreate, token: dict = Depends(verify_token), auditor: dict = Depends(contexto_auditoria)):
     # Permissão aberta para todos os usuários
     id_curso = await get_next_id("cursos")
     data = curso.model_dump()
@@ -632,30 +1121,60 @@ async def create_curso(curso: CursoCreate, token: dict = Depends(verify_token)):
     # slug para unicidade por (titulo, modalidade)
     doc["slug"] = slugify_title(doc.get("titulo", ""))
     try:
-        await db.cursos.insert_one(doc)
+        await repo_cursos.inserir(doc)
     except DuplicateKeyError:
         raise HTTPException(status_code=409, detail="Já existe um curso com este título nesta modalidade.")
+    await cache_referencia.invalidar("cursos")
+    auditar(auditor, AcaoAuditoria.CREATE, "cursos", id_curso, depois=doc)
     # Remover campos extras ao responder, Pydantic ignora extras
     return Curso(**{k: v for k, v in doc.items() if k != "slug"})
 
 @api_router.get("/cursos", response_model=List[Curso])
-async def get_cursos(tipo: Optional[TipoTreinamento] = None, token: dict = Depends(verify_token)):
+async def get_cursos(
+    request: Request,
+    tipo: Optional[TipoTreinamento] = None,
+    after: Optional[int] = None,
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    formato: FormatoLista = FormatoLista.JSON,
+    token: dict = Depends(verify_token)
+):
     query = {}
     if tipo:
         query["tipo_treinamento"] = tipo.value
-    cursos = await db.cursos.find(query, {"_id": 0}).to_list(1000)
-    return cursos
+    projection = {"_id": 0, "slug": 0}
+    if formato == FormatoLista.NDJSON:
+        return stream_ndjson(db.cursos, query, projection, "id_curso", after)
+    return await resposta_referencia(
+        request, ("cursos", tipo, after, limit), ["cursos"], Curso,
+        lambda: carregar_pagina(db.cursos, query, projection, "id_curso", after, limit))
+
+# Busca textual sem acento/maiúsculas com índice invertido em memória (ver busca_cursos.py).
+# Precisa vir antes de /cursos/{id_curso} para "busca" não ser lido como ID.
+busca_cursos = BuscaCursos(db, cache_referencia.versoes, PROJECAO_CURSO)
+
+@api_router.get("/cursos/busca")
+async def buscar_cursos(
+    q: str = Query(..., min_length=1, max_length=200),
+    tipo: Optional[TipoTreinamento] = None,
+    skip: int = Query(0, ge=0, le=10000),
+    limit: int = Query(20, ge=1, le=100),
+    token: dict = Depends(verify_token)
+):
+    total, resultados = await busca_cursos.buscar(q, skip, limit, tipo.value if tipo else None)
+    return RespostaJSONRapida(content={"total": total, "skip": skip, "limit": limit, "resultados": resultados})
 
 @api_router.get("/cursos/{id_curso}", response_model=Curso)
 async def get_curso(id_curso: int, token: dict = Depends(verify_token)):
-    curso = await db.cursos.find_one({"id_curso": id_curso}, {"_id": 0})
+    curso = await repo_cursos.obter(id_curso)
     if not curso:
         raise HTTPException(status_code=404, detail="Curso não encontrado")
     return Curso(**curso)
 
 @api_router.put("/cursos/{id_curso}", response_model=Curso)
-async def update_curso(id_curso: int, update: CursoUpdate, token: dict = Depends(verify_token)):
-    existing = await db.cursos.find_one({"id_curso": id_curso})
+async def update_curso(id_curso: int, update: CursoUpdate, token: dict = Depends(verify_token),
+                       auditor: dict = Depends(contexto_auditoria)):
+    # Com o slug: sem ele no documento antigo, fazemos o backfill abaixo
+    existing = await repo_cursos.obter(id_curso, {"_id": 0})
     if not existing:
         raise HTTPException(status_code=404, detail="Curso não encontrado")
 
@@ -688,22 +1207,26 @@ async def update_curso(id_curso: int, update: CursoUpdate, token: dict = Depends
 
     if not data:
         # Nada para atualizar
-        doc = await db.cursos.find_one({"id_curso": id_curso}, {"_id": 0})
-        return Curso(**doc)
+        return Curso(**existing)
 
     try:
-        await db.cursos.update_one({"id_curso": id_curso}, {"$set": data})
+        await repo_cursos.atualizar(id_curso, data)
     except DuplicateKeyError:
         raise HTTPException(status_code=409, detail="Conflito: já existe curso com este título nesta modalidade.")
-    updated = await db.cursos.find_one({"id_curso": id_curso}, {"_id": 0, "slug": 0})
+    await cache_referencia.invalidar("cursos")
+    updated = await repo_cursos.obter(id_curso, {"_id": 0})
+    auditar(auditor, AcaoAuditoria.UPDATE, "cursos", id_curso, existing, updated)
+    updated.pop("slug", None)
     return Curso(**updated)
 
 @api_router.delete("/cursos/{id_curso}")
-async def delete_curso(id_curso: int, token: dict = Depends(verify_token)):
+async def delete_curso(id_curso: int, token: dict = Depends(verify_token), auditor: dict = Depends(contexto_auditoria)):
     # Permissão aberta para todos os usuários
-    result = await db.cursos.delete_one({"id_curso": id_curso})
-    if result.deleted_count == 0:
+    removido = await repo_cursos.remover(id_curso)
+    if removido is None:
         raise HTTPException(status_code=404, detail="Curso não encontrado")
+    await cache_referencia.invalidar("cursos")
+    auditar(auditor, AcaoAuditoria.DELETE, "cursos", id_curso, antes=removido)
     return {"message": "Curso deletado com sucesso"}
 
 
@@ -711,87 +1234,139 @@ async def delete_curso(id_curso: int, token: dict = Depends(verify_token)):
 # Organizamos cursos em trilhas de desenvolvimento
 
 @api_router.post("/trilhas", response_model=Trilha)
-async def create_trilha(trilha: TrilhaCreate, token: dict = Depends(verify_token)):
+async def create_trilha(trilha: TrilhaCreate, token: dict = Depends(verify_token), auditor: dict = Depends(contexto_auditoria)):
     # Permissão aberta para todos os usuários
     id_trilha = await get_next_id("trilhas")
     doc = {"id_trilha": id_trilha, **trilha.model_dump()}
-    await db.trilhas.insert_one(doc)
+    await repo_trilhas.inserir(doc)
+    await cache_referencia.invalidar("trilhas")
+    auditar(auditor, AcaoAuditoria.CREATE, "trilhas", id_trilha, depois=doc)
     return Trilha(**doc)
 
 @api_router.get("/trilhas", response_model=List[Trilha])
-async def get_trilhas(obrigatoria: Optional[bool] = None, token: dict = Depends(verify_token)):
+async def get_trilhas(
+    request: Request,
+    obrigatoria: Optional[bool] = None,
+    after: Optional[int] = None,
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    formato: FormatoLista = FormatoLista.JSON,
+    token: dict = Depends(verify_token)
+):
     query = {}
     if obrigatoria is not None:
         query["obrigatoria"] = obrigatoria
-    trilhas = await db.trilhas.find(query, {"_id": 0}).to_list(1000)
-    return trilhas
+    if formato == FormatoLista.NDJSON:
+        return stream_ndjson(db.trilhas, query, {"_id": 0}, "id_trilha", after)
+    return await resposta_referencia(
+        request, ("trilhas", obrigatoria, after, limit), ["trilhas"], Trilha,
+        lambda: carregar_pagina(db.trilhas, query, {"_id": 0}, "id_trilha", after, limit))
+
+@api_router.get("/trilhas/{id_trilha}/grafo")
+async def get_grafo_trilha(id_trilha: int, token: dict = Depends(verify_token)):
+    if not await repo_trilhas.existe(id_trilha):
+        raise HTTPException(status_code=404, detail="Trilha não encontrada")
+    return (await grafos_trilhas.obter(id_trilha)).estrutura()
+
+@api_router.get("/colaboradores/{id_colaborador}/trilhas/{id_trilha}")
+async def get_situacao_trilha(id_colaborador: int, id_trilha: int, token: dict = Depends(verify_token)):
+    # Próximo curso disponível, percentual concluído e cursos bloqueados por pré-requisito
+    if not await repo_trilhas.existe(id_trilha):
+        raise HTTPException(status_code=404, detail="Trilha não encontrada")
+    return await grafos_trilhas.situacao(id_trilha, id_colaborador)
 
 @api_router.get("/cursos/{id_curso}/trilhas", response_model=List[Trilha])
-async def get_trilhas_do_curso(id_curso: int, token: dict = Depends(verify_token)):
-    # Busca todos os ids de trilha associados ao curso
-    curso_trilhas = await db.curso_trilha.find({"id_curso": id_curso}, {"_id": 0, "id_trilha": 1}).to_list(100)
-    trilha_ids = [ct["id_trilha"] for ct in curso_trilhas]
-    if not trilha_ids:
-        return []
-    trilhas = await db.trilhas.find({"id_trilha": {"$in": trilha_ids}}, {"_id": 0}).to_list(100)
-    return trilhas
+async def get_trilhas_do_curso(id_curso: int, request: Request, token: dict = Depends(verify_token)):
+    async def carregar():
+        # Uma ida ao banco: vínculos do curso na ordem em que ele aparece em cada trilha
+        trilhas = await db.curso_trilha.aggregate([
+            {"$match": {"id_curso": id_curso}},
+            {"$sort": {"ordem": 1, "id_trilha": 1}},
+            {"$group": {"_id": "$id_trilha", "ordem": {"$first": "$ordem"}}},
+            {"$sort": {"ordem": 1, "_id": 1}},
+            {"$lookup": {"from": "trilhas", "localField": "_id", "foreignField": "id_trilha", "as": "trilha"}},
+            {"$unwind": "$trilha"},
+            {"$replaceRoot": {"newRoot": "$trilha"}},
+            {"$project": {"_id": 0}},
+        ]).to_list(None)
+        return trilhas, {}
+    return await resposta_referencia(
+        request, ("trilhas_do_curso", id_curso), ["trilhas", "curso_trilha"], Trilha, carregar)
 
 @api_router.delete("/trilhas/{id_trilha}")
-async def delete_trilha(id_trilha: int, token: dict = Depends(verify_token)):
+async def delete_trilha(id_trilha: int, token: dict = Depends(verify_token), auditor: dict = Depends(contexto_auditoria)):
     # Permissão aberta para todos os usuários
-    result = await db.trilhas.delete_one({"id_trilha": id_trilha})
-    if result.deleted_count == 0:
+    removida = await repo_trilhas.remover(id_trilha)
+    if removida is None:
         raise HTTPException(status_code=404, detail="Trilha não encontrada")
+    await cache_referencia.invalidar("trilhas")
+    auditar(auditor, AcaoAuditoria.DELETE, "trilhas", id_trilha, antes=removida)
+    conformidade_fila.marcar_trilha(id_trilha)
     return {"message": "Trilha deletada com sucesso"}
 
 # =============== ROTAS DE REGRA OBRIGATÓRIA ===============
 # Definimos regras de treinamentos obrigatórios por cargo/área
 
 @api_router.post("/regras-obrigatorias", response_model=RegraObrigatorio)
-async def create_regra(regra: RegraObrigatorioCreate, token: dict = Depends(verify_token)):
+async def create_regra(regra: RegraObrigatorioCreate, token: dict = Depends(verify_token), auditor: dict = Depends(contexto_auditoria)):
     if not regra.id_curso and not regra.id_trilha:
         raise HTTPException(status_code=400, detail="Deve especificar id_curso ou id_trilha")
     
     id_regra = await get_next_id("regras_obrigatorias")
     doc = {"id_regra": id_regra, **regra.model_dump()}
     await db.regras_obrigatorias.insert_one(doc)
+    conformidade_fila.marcar_regra(id_regra)
+    await auto_inscricao.solicitar_regra(id_regra)
+    auditar(auditor, AcaoAuditoria.CREATE, "regras_obrigatorias", id_regra, depois=doc)
     return RegraObrigatorio(**doc)
 
 @api_router.get("/regras-obrigatorias", response_model=List[RegraObrigatorio])
-async def get_regras(token: dict = Depends(verify_token)):
-    regras = await db.regras_obrigatorias.find({}, {"_id": 0}).to_list(1000)
-    return regras
+async def get_regras(
+    response: Response,
+    after: Optional[int] = None,
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    formato: FormatoLista = FormatoLista.JSON,
+    token: dict = Depends(verify_token)
+):
+    if formato == FormatoLista.NDJSON:
+        return stream_ndjson(db.regras_obrigatorias, {}, PROJECAO_REGRA, "id_regra", after)
+    regras = await paginar(db.regras_obrigatorias, {}, PROJECAO_REGRA, "id_regra", after, limit, response)
+    return responder_lista("regras", regras, response)
 
 @api_router.delete("/regras-obrigatorias/{id_regra}")
-async def delete_regra(id_regra: int, token: dict = Depends(verify_token)):
-    result = await db.regras_obrigatorias.delete_one({"id_regra": id_regra})
-    if result.deleted_count == 0:
+async def delete_regra(id_regra: int, token: dict = Depends(verify_token), auditor: dict = Depends(contexto_auditoria)):
+    removida = await db.regras_obrigatorias.find_one_and_delete({"id_regra": id_regra}, projection={"_id": 0})
+    if removida is None:
         raise HTTPException(status_code=404, detail="Regra não encontrada")
+    conformidade_fila.marcar_regra(id_regra)
+    auditar(auditor, AcaoAuditoria.DELETE, "regras_obrigatorias", id_regra, antes=removida)
     return {"message": "Regra deletada com sucesso"}
 
 # =============== ROTAS DE INSCRIÇÃO ===============
 # Gerenciamos inscrições dos colaboradores nos cursos
 
 @api_router.post("/inscricoes", response_model=Inscricao)
-async def create_inscricao(inscricao: InscricaoCreate, token: dict = Depends(verify_token)):
-    id_inscricao = await get_next_id("inscricoes")
+async def create_inscricao(inscricao: InscricaoCreate, token: dict = Depends(verify_token), auditor: dict = Depends(contexto_auditoria)):
+    colaborador_existe, curso_existe = await asyncio.gather(
+        repo_colaboradores.existe(inscricao.id_colaborador), repo_cursos.existe(inscricao.id_curso))
+    if not colaborador_existe:
+        raise HTTPException(status_code=404, detail="Colaborador não encontrado")
+    if not curso_existe:
+        raise HTTPException(status_code=404, detail="Curso não encontrado")
+    id_inscricao, id_progresso = await asyncio.gather(get_next_id("inscricoes"), get_next_id("progressos"))
     doc = {
         "id_inscricao": id_inscricao,
         "id_colaborador": inscricao.id_colaborador,
         "id_curso": inscricao.id_curso,
-        "data_inscricao": datetime.now(timezone.utc).isoformat(),
-        "data_prevista": inscricao.data_prevista.isoformat() if inscricao.data_prevista else None,
+        "data_inscricao": datetime.now(timezone.utc),
+        "data_prevista": inscricao.data_prevista,
         "status": StatusInscricao.PENDENTE.value,
         "tipo_inscricao": inscricao.tipo_inscricao.value,
         "data_conclusao": None,
         "nota": None,
         "aprovado": False
     }
-    await db.inscricoes.insert_one(doc)
-    
     # Criamos automaticamente o registro de progresso
-    id_progresso = await get_next_id("progressos")
-    await db.progressos.insert_one({
+    await repo_inscricoes.inserir_com_progresso(doc, {
         "id_progresso": id_progresso,
         "id_inscricao": id_inscricao,
         "percentual": 0.0,
@@ -799,17 +1374,133 @@ async def create_inscricao(inscricao: InscricaoCreate, token: dict = Depends(ver
         "data_conclusao": None,
         "observacoes": None
     })
+    auditar(auditor, AcaoAuditoria.CREATE, "inscricoes", id_inscricao, depois=doc)
     
-    doc["data_inscricao"] = datetime.fromisoformat(doc["data_inscricao"])
-    if doc["data_prevista"]:
-        doc["data_prevista"] = datetime.fromisoformat(doc["data_prevista"])
     return Inscricao(**doc)
 
+# Status em que a inscrição ainda está ativa; uma nova inscrição no mesmo curso seria duplicada
+STATUS_INSCRICAO_ATIVA = [StatusInscricao.PENDENTE.value, StatusInscricao.EM_ANDAMENTO.value]
+LOTE_INSERCAO = 1000
+
+async def inscrever_em_lote(id_curso: int, ids_colaborador: List[int], tipo_inscricao: TipoInscricao,
+                            data_prevista: Optional[datetime] = None) -> List[dict]:
+    # Inscreve vários colaboradores em um curso com poucos round trips: uma consulta
+    # para as inscrições ativas, uma reserva de IDs por coleção e insert_many sem ordem.
+    # Devolve um resultado por colaborador, na ordem recebida.
+    ja_inscritos = set(await repo_inscricoes.colaboradores_com_status(id_curso, STATUS_INSCRICAO_ATIVA))
+    resultados = []
+    novos = []
+    for id_colaborador in ids_colaborador:
+        if id_colaborador in ja_inscritos:
+            resultados.append({"id_colaborador": id_colaborador, "resultado": "ja_inscrito", "id_inscricao": None})
+        else:
+            ja_inscritos.add(id_colaborador)
+            resultado = {"id_colaborador": id_colaborador, "resultado": "inscrito", "id_inscricao": None}
+            resultados.append(resultado)
+            novos.append(resultado)
+    if not novos:
+        return resultados
+
+    ids_inscricao = await get_next_ids("inscricoes", len(novos))
+    ids_progresso = await get_next_ids("progressos", len(novos))
+    agora = datetime.now(timezone.utc)
+    inscricoes, progressos = [], []
+    for resultado, id_inscricao, id_progresso in zip(novos, ids_inscricao, ids_progresso):
+        resultado["id_inscricao"] = id_inscricao
+        inscricoes.append({
+            "id_inscricao": id_inscricao,
+            "id_colaborador": resultado["id_colaborador"],
+            "id_curso": id_curso,
+            "data_inscricao": agora,
+            "data_prevista": data_prevista,
+            "status": StatusInscricao.PENDENTE.value,
+            "tipo_inscricao": tipo_inscricao.value,
+            "data_conclusao": None,
+            "nota": None,
+            "aprovado": False
+        })
+        progressos.append({
+            "id_progresso": id_progresso,
+            "id_inscricao": id_inscricao,
+            "percentual": 0.0,
+            "status": StatusInscricao.PENDENTE.value,
+            "data_conclusao": None,
+            "observacoes": None
+        })
+
+    for inicio in range(0, len(inscricoes), LOTE_INSERCAO):
+        bloco = slice(inicio, inicio + LOTE_INSERCAO)
+        falhas = set()
+        try:
+            await db.inscricoes.insert_many(inscricoes[bloco], ordered=False)
+        except BulkWriteError as exc:
+            falhas = {erro["index"] for erro in exc.details.get("writeErrors", [])}
+            for indice in falhas:
+                novos[inicio + indice].update({"resultado": "erro", "id_inscricao": None})
+        # Só criamos progresso para as inscrições gravadas
+        progressos_bloco = [p for i, p in enumerate(progressos[bloco]) if i not in falhas]
+        if progressos_bloco:
+            await db.progressos.insert_many(progressos_bloco, ordered=False)
+    return resultados
+
+@api_router.post("/inscricoes/lote", response_model=InscricaoLoteResposta)
+async def create_inscricoes_lote(lote: InscricaoLoteCreate, token: dict = Depends(verify_token), auditor: dict = Depends(contexto_auditoria)):
+    if lote.ids_colaborador is None and lote.id_area is None and lote.id_cargo is None:
+        raise HTTPException(status_code=400, detail="Informe ids_colaborador ou um seletor (id_area, id_cargo)")
+    if not await repo_cursos.existe(lote.id_curso):
+        raise HTTPException(status_code=404, detail="Curso não encontrado")
+
+    filtro = {"ativo": True}
+    if lote.id_area is not None:
+        filtro["id_area"] = lote.id_area
+    if lote.id_cargo is not None:
+        filtro["id_cargo"] = lote.id_cargo
+    invalidos = []
+    if lote.ids_colaborador is not None:
+        # Removemos repetições preservando a ordem recebida
+        solicitados = list(dict.fromkeys(lote.ids_colaborador))
+        filtro["id_colaborador"] = {"$in": solicitados}
+        validos = set(await repo_colaboradores.ids(filtro))
+        ids = [i for i in solicitados if i in validos]
+        invalidos = [{"id_colaborador": i, "resultado": "colaborador_invalido", "id_inscricao": None}
+                     for i in solicitados if i not in validos]
+    else:
+        ids = await repo_colaboradores.ids(filtro)
+
+    resultados = await inscrever_em_lote(lote.id_curso, ids, lote.tipo_inscricao, lote.data_prevista)
+    resultados.extend(invalidos)
+    ids_inscritos = [r["id_inscricao"] for r in resultados if r["resultado"] == "inscrito"]
+    inscritos = len(ids_inscritos)
+    if inscritos:
+        # Um único registro de auditoria por lote (como na importação de colaboradores):
+        # um por linha encheria a fila do AuditoriaWriter, que descarta o excedente
+        auditar(auditor, AcaoAuditoria.CREATE, "inscricoes", None, depois={
+            "id_curso": lote.id_curso,
+            "tipo_inscricao": lote.tipo_inscricao.value,
+            "seletor": {"id_area": lote.id_area, "id_cargo": lote.id_cargo,
+                        "ids_colaborador": len(lote.ids_colaborador) if lote.ids_colaborador is not None else None},
+            "inscritos": inscritos,
+            "ids_inscricao": ids_inscritos,
+        })
+    return {
+        "id_curso": lote.id_curso,
+        "total": len(resultados),
+        "inscritos": inscritos,
+        "ignorados": len(resultados) - inscritos,
+        "resultados": resultados,
+    }
+
 @api_router.get("/inscricoes", response_model=List[Inscricao])
 async def get_inscricoes(
+    response: Response,
     id_colaborador: Optional[int] = None,
     id_curso: Optional[int] = None,
     status: Optional[StatusInscricao] = None,
+    desde: Optional[datetime] = None,
+    ate: Optional[datetime] = None,
+    after: Optional[int] = None,
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    formato: FormatoLista = FormatoLista.JSON,
     token: dict = Depends(verify_token)
 ):
     query = {}
@@ -819,23 +1510,50 @@ async def get_inscricoes(
         query["id_curso"] = id_curso
     if status:
         query["status"] = status.value
+    # ?desde=&ate= filtram por data_inscricao (índice idx_data_inscricao)
+    query.update(filtro_intervalo("data_inscricao", desde, ate))
     
-    inscricoes = await db.inscricoes.find(query, {"_id": 0}).to_list(1000)
-    for insc in inscricoes:
-        if isinstance(insc["data_inscricao"], str):
-            insc["data_inscricao"] = datetime.fromisoformat(insc["data_inscricao"])
-        if insc.get("data_prevista") and isinstance(insc["data_prevista"], str):
-            insc["data_prevista"] = datetime.fromisoformat(insc["data_prevista"])
-        if insc.get("data_conclusao") and isinstance(insc["data_conclusao"], str):
-            insc["data_conclusao"] = datetime.fromisoformat(insc["data_conclusao"])
-    return inscricoes
+    if formato == FormatoLista.NDJSON:
+        return stream_ndjson(db.inscricoes, query, PROJECAO_INSCRICAO, "id_inscricao", after)
+    inscricoes = await paginar(db.inscricoes, query, PROJECAO_INSCRICAO, "id_inscricao", after, limit, response)
+    return responder_lista("inscricoes", ler_datas(inscricoes, CAMPOS_DATA["inscricoes"]), response)
+
+@api_router.put("/inscricoes/{id_inscricao}", response_model=Inscricao)
+async def update_inscricao(id_inscricao: int, update: InscricaoUpdate, token: dict = Depends(verify_token),
+                           auditor: dict = Depends(contexto_auditoria)):
+    existing = await repo_inscricoes.obter(id_inscricao)
+    if not existing:
+        raise HTTPException(status_code=404, detail="Inscrição não encontrada")
+
+    data = update.model_dump(exclude_unset=True)
+    if data.get("status") is not None:
+        data["status"] = data["status"].value
+        if data["status"] == StatusInscricao.CONCLUIDO.value and not data.get("data_conclusao"):
+            data["data_conclusao"] = datetime.now(timezone.utc)
+    if data:
+        await repo_inscricoes.atualizar(id_inscricao, data)
+        # Mantemos o progresso sincronizado com o status da inscrição
+        if "status" in data:
+            progresso = {"status": data["status"]}
+            if data["status"] == StatusInscricao.CONCLUIDO.value:
+                progresso.update({"percentual": 100.0, "data_conclusao": data.get("data_conclusao")})
+            await repo_inscricoes.atualizar_progresso(id_inscricao, progresso)
+            if data["status"] != existing.get("status"):
+                conformidade_fila.marcar_curso(existing["id_colaborador"], existing["id_curso"])
+
+    antes = dict(existing)
+    existing.update(data)
+    if data:
+        auditar(auditor, AcaoAuditoria.UPDATE, "inscricoes", id_inscricao, antes, existing)
+    return Inscricao(**normalizar_datas(existing, CAMPOS_DATA["inscricoes"]))
 
 # =============== ROTAS DE CERTIFICADO ===============
 # Emitimos e validamos certificados digitais
 
 @api_router.post("/certificados", response_model=Certificado)
-async def create_certificado(certificado: CertificadoCreate, token: dict = Depends(verify_token)):
-    inscricao = await db.inscricoes.find_one({"id_inscricao": certificado.id_inscricao})
+async def create_certificado(certificado: CertificadoCreate, token: dict = Depends(verify_token), auditor: dict = Depends(contexto_auditoria)):
+    # Só precisamos saber que existe e de quem é (para a conformidade)
+    inscricao = await repo_inscricoes.obter(certificado.id_inscricao, {"_id": 0, "id_colaborador": 1, "id_curso": 1})
     if not inscricao:
         raise HTTPException(status_code=404, detail="Inscrição não encontrada")
     
@@ -844,22 +1562,27 @@ async def create_certificado(certificado: CertificadoCreate, token: dict = Depen
     doc = {
         "id_certificado": id_certificado,
         "id_inscricao": certificado.id_inscricao,
-        "data_emissao": datetime.now(timezone.utc).isoformat(),
-        "data_validade": certificado.data_validade.isoformat() if certificado.data_validade else None,
+        "data_emissao": datetime.now(timezone.utc),
+        "data_validade": certificado.data_validade,
         "codigo_verificacao": str(uuid.uuid4())[:8].upper(),
         "status": "ativo"
     }
-    await db.certificados.insert_one(doc)
+    await repo_certificados.inserir(doc)
+    conformidade_fila.marcar_curso(inscricao["id_colaborador"], inscricao["id_curso"])
+    auditar(auditor, AcaoAuditoria.CREATE, "certificados", id_certificado, depois=doc)
     
-    doc["data_emissao"] = datetime.fromisoformat(doc["data_emissao"])
-    if doc["data_validade"]:
-        doc["data_validade"] = datetime.fromisoformat(doc["data_validade"])
     return Certificado(**doc)
 
 @api_router.get("/certificados", response_model=List[Certificado])
 async def get_certificados(
+    response: Response,
     id_inscricao: Optional[int] = None,
     status: Optional[str] = None,
+    desde: Optional[datetime] = None,
+    ate: Optional[datetime] = None,
+    after: Optional[int] = None,
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    formato: FormatoLista = FormatoLista.JSON,
     token: dict = Depends(verify_token)
 ):
     query = {}
@@ -867,27 +1590,193 @@ async def get_certificados(
         query["id_inscricao"] = id_inscricao
     if status:
         query["status"] = status
+    # ?desde=&ate= filtram por data_emissao (índice idx_data_emissao)
+    query.update(filtro_intervalo("data_emissao", desde, ate))
         
-    certificados = await db.certificados.find(query, {"_id": 0}).to_list(1000)
-    for cert in certificados:
-        if isinstance(cert["data_emissao"], str):
-            cert["data_emissao"] = datetime.fromisoformat(cert["data_emissao"])
-        if cert.get("data_validade") and isinstance(cert["data_validade"], str):
-            cert["data_validade"] = datetime.fromisoformat(cert["data_validade"])
-    return certificados
+    if formato == FormatoLista.NDJSON:
+        return stream_ndjson(db.certificados, query, PROJECAO_CERTIFICADO, "id_certificado", after)
+    certificados = await paginar(db.certificados, query, PROJECAO_CERTIFICADO, "id_certificado", after, limit, response)
+    return responder_lista("certificados", ler_datas(certificados, CAMPOS_DATA["certificados"]), response)
+
+# Varredura periódica que marca certificados vencidos e gera alertas de vencimento
+varredura_certificados = VarreduraCertificados(
+    db,
+    intervalo=float(os.environ.get('VARREDURA_CERTIFICADOS_INTERVALO', '3600')),
+    ao_vencer=lambda id_colaborador, id_curso: conformidade_fila.marcar_curso(id_colaborador, id_curso),
+)
+
+@api_router.post("/certificados/varredura")
+async def executar_varredura_certificados(token: dict = Depends(verify_token)):
+    resultado = await varredura_certificados.executar()
+    if resultado is None:
+        raise HTTPException(status_code=409, detail="Varredura já em execução em outro worker")
+    return resultado
+
+# =============== ROTAS DE CONFORMIDADE ===============
+# Consultamos quem está fora de conformidade com as regras obrigatórias.
+# Os dados vêm da coleção materializada `conformidade` (ver conformidade.py).
+
+conformidade_engine = ConformidadeEngine(db)
+# Recalculo incremental: os handlers marcam o que mudou e a fila recalcula só os pares afetados
+conformidade_fila = FilaConformidade(conformidade_engine, intervalo=float(os.environ.get('CONFORMIDADE_INTERVALO', '0.5')))
+
+@api_router.post("/conformidade/recalcular")
+async def recalcular_conformidade(token: dict = Depends(verify_token)):
+    return await conformidade_engine.recalcular_tudo()
+
+@api_router.get("/conformidade/fila")
+async def get_conformidade_fila(token: dict = Depends(verify_token)):
+    # lag_segundos: idade do evento pendente mais antigo ainda não processado
+    return conformidade_fila.stats()
+
+@api_router.get("/conformidade", response_model=List[Conformidade])
+async def get_conformidade(
+    response: Response,
+    id_area: Optional[int] = None,
+    id_cargo: Optional[int] = None,
+    id_colaborador: Optional[int] = None,
+    status: Optional[StatusConformidade] = None,
+    after: Optional[int] = None,
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    formato: FormatoLista = FormatoLista.JSON,
+    token: dict = Depends(verify_token)
+):
+    query = {}
+    if id_area is not None:
+        query["id_area"] = id_area
+    if id_cargo is not None:
+        query["id_cargo"] = id_cargo
+    if id_colaborador is not None:
+        query["id_colaborador"] = id_colaborador
+    if status:
+        # Colaboradores com ao menos uma obrigação neste status
+        query["obrigacoes.status"] = status.value
+    if formato == FormatoLista.NDJSON:
+        return stream_ndjson(db.conformidade, query, PROJECAO_CONFORMIDADE, "id_colaborador", after)
+    conformidade = await paginar(db.conformidade, query, PROJECAO_CONFORMIDADE, "id_colaborador", after, limit, response)
+    return responder_lista("conformidade", conformidade, response)
+
+# =============== ROTAS DE INSCRIÇÃO AUTOMÁTICA ===============
+# Inscrevemos automaticamente quem as regras obrigatórias exigem (ver auto_inscricao.py).
+# Criar regra, cadastrar colaborador ou mudar cargo/área dispara uma tarefa em segundo plano.
+
+async def _inscrever_automaticamente(id_curso: int, ids_colaborador: List[int]) -> List[dict]:
+    return await inscrever_em_lote(id_curso, ids_colaborador, TipoInscricao.AUTOMATICA)
+
+auto_inscricao = AutoInscricao(conformidade_engine, _inscrever_automaticamente)
+
+@api_router.post("/auto-inscricao", status_code=http_status.HTTP_202_ACCEPTED)
+async def executar_auto_inscricao(id_regra: Optional[int] = None, token: dict = Depends(verify_token)):
+    # Sem id_regra avalia todas as regras; acompanhe o progresso em /auto-inscricao/tarefas/{id_tarefa}
+    if id_regra is None:
+        return await auto_inscricao.solicitar_todas()
+    if not await db.regras_obrigatorias.find_one({"id_regra": id_regra}, {"_id": 1}):
+        raise HTTPException(status_code=404, detail="Regra não encontrada")
+    return await auto_inscricao.solicitar_regra(id_regra)
+
+@api_router.get("/auto-inscricao/tarefas")
+async def get_tarefas_auto_inscricao(token: dict = Depends(verify_token)):
+    return await auto_inscricao.recentes()
+
+@api_router.get("/auto-inscricao/tarefas/{id_tarefa}")
+async def get_tarefa_auto_inscricao(id_tarefa: str, token: dict = Depends(verify_token)):
+    tarefa = await auto_inscricao.consultar(id_tarefa)
+    if not tarefa:
+        raise HTTPException(status_code=404, detail="Tarefa não encontrada")
+    return tarefa
+
+# =============== ROTAS DE AUDITORIA ===============
+# Consulta do log de auditoria, da mais recente para a mais antiga, restrita a perfis
+# com a permissão "admin". A paginação é por cursor opaco (data_hora + id_auditoria)
+# devolvido em X-Next-Cursor, e só as partições mensais do período são consultadas.
+
+PROJECAO_AUDITORIA = projecao_do_modelo(Auditoria)
+
+# Partições além da retenção vão para NDJSON compactado em disco (ver arquivar_auditoria.py)
+arquivamento_auditoria = ArquivamentoAuditoria(
+    db,
+    auditoria_particoes,
+    diretorio=os.environ.get('AUDITORIA_ARQUIVO_DIR', str(ROOT_DIR / 'arquivo_auditoria')),
+    meses=int(os.environ.get('AUDITORIA_RETENCAO_MESES', str(RETENCAO_PADRAO_MESES))),
+    intervalo=float(os.environ.get('AUDITORIA_ARQUIVAMENTO_INTERVALO', '86400')),
+)
+
+@api_router.get("/auditoria", response_model=List[Auditoria])
+async def get_auditoria(
+    response: Response,
+    id_colaborador: Optional[int] = None,
+    tabela: Optional[str] = None,
+    acao: Optional[AcaoAuditoria] = None,
+    desde: Optional[datetime] = None,
+    ate: Optional[datetime] = None,
+    after: Optional[str] = None,
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    admin: dict = Depends(exigir_permissao("admin"))
+):
+    query = {}
+    if id_colaborador is not None:
+        query["id_colaborador_acao"] = id_colaborador
+    if tabela:
+        query["nome_tabela"] = tabela
+    if acao:
+        query["acao"] = acao.value
+    try:
+        registros, cursor = await auditoria_particoes.consultar(query, PROJECAO_AUDITORIA, desde, ate, after, limit)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    if cursor:
+        response.headers["X-Next-Cursor"] = cursor
+    return responder_lista("auditoria", registros, response)
+
+@api_router.get("/auditoria/arquivos")
+async def get_auditoria_arquivos(admin: dict = Depends(exigir_permissao("admin"))):
+    return await db.auditoria_arquivos.find({}, {"_id": 0}).sort("inicio", -1).to_list(None)
+
+@api_router.post("/auditoria/arquivar")
+async def executar_arquivamento_auditoria(admin: dict = Depends(exigir_permissao("admin"))):
+    resultado = await arquivamento_auditoria.executar()
+    if resultado is None:
+        raise HTTPException(status_code=409, detail="Arquivamento já em execução em outro worker")
+    return resultado
 
 # =============== DASHBOARD E RELATÓRIOS ===============
 # Fornecemos estatísticas e relatórios do sistema
 
-@api_router.get("/dashboard/stats")
-async def get_dashboard_stats(token: dict = Depends(verify_token)):
-    total_cursos = await db.cursos.count_documents({})
-    total_colaboradores = await db.colaboradores.count_documents({"ativo": True})
-    total_inscricoes = await db.inscricoes.count_documents({})
-    inscricoes_concluidas = await db.inscricoes.count_documents({"status": StatusInscricao.CONCLUIDO.value})
-    inscricoes_pendentes = await db.inscricoes.count_documents({"status": StatusInscricao.PENDENTE.value})
-    certificados_vencidos = await db.certificados.count_documents({"status": "vencido"})
-    
+# As estatísticas ficam em cache por DASHBOARD_CACHE_TTL segundos; com single-flight,
+# vários gestores abrindo o dashboard ao mesmo tempo disparam um único cálculo
+dashboard_cache = TTLCache(ttl=float(os.environ.get('DASHBOARD_CACHE_TTL', '30')), maxsize=1)
+
+async def _contar(colecao, match: dict) -> int:
+    resultado = await colecao.aggregate([{"$match": match}, {"$count": "total"}]).to_list(1)
+    return resultado[0]["total"] if resultado else 0
+
+async def _contar_inscricoes_por_status() -> dict:
+    # Uma única passada pela coleção: total e contagem por status
+    resultado = await db.inscricoes.aggregate([{
+        "$facet": {
+            "total": [{"$count": "n"}],
+            "por_status": [{"$group": {"_id": "$status", "n": {"$sum": 1}}}],
+        }
+    }]).to_list(1)
+    facetas = resultado[0] if resultado else {}
+    total = facetas.get("total") or [{"n": 0}]
+    return {
+        "total": total[0]["n"],
+        **{g["_id"]: g["n"] for g in facetas.get("por_status", [])},
+    }
+
+async def _calcular_dashboard_stats() -> dict:
+    # Uma agregação por coleção, executadas em paralelo
+    total_cursos, total_colaboradores, inscricoes, certificados_vencidos = await asyncio.gather(
+        _contar(db.cursos, {}),
+        _contar(db.colaboradores, {"ativo": True}),
+        _contar_inscricoes_por_status(),
+        _contar(db.certificados, {"status": "vencido"}),
+    )
+    total_inscricoes = inscricoes["total"]
+    inscricoes_concluidas = inscricoes.get(StatusInscricao.CONCLUIDO.value, 0)
+    inscricoes_pendentes = inscricoes.get(StatusInscricao.PENDENTE.value, 0)
+
     return {
         "total_cursos": total_cursos,
         "total_colaboradores": total_colaboradores,
@@ -898,6 +1787,94 @@ async def get_dashboard_stats(token: dict = Depends(verify_token)):
         "taxa_conclusao": round((inscricoes_concluidas / total_inscricoes * 100) if total_inscricoes > 0 else 0, 2)
     }
 
+@api_router.get("/dashboard/stats")
+async def get_dashboard_stats(fresh: bool = False, token: dict = Depends(verify_token)):
+    # ?fresh=1 ignora o cache e recalcula (o resultado novo substitui o cacheado)
+    return await dashboard_cache.get_or_compute("stats", _calcular_dashboard_stats, fresh=fresh)
+
+@api_router.get("/dashboard/stats/cache")
+async def get_dashboard_cache_stats(token: dict = Depends(verify_token)):
+    return dashboard_cache.stats()
+
+# Relatórios exportados em CSV/XLSX a partir de agregações (ver relatorios.py).
+# Só para administradores: trazem nome e email de todos os colaboradores.
+# GET devolve o arquivo em streaming; POST .../tarefas gera em segundo plano para
+# baixar depois em /relatorios/tarefas/{id_tarefa}/arquivo.
+relatorios = Relatorios(db, filtro_intervalo)
+tarefas_relatorio = TarefasRelatorio(
+    relatorios,
+    diretorio=os.environ.get('RELATORIOS_DIR', str(ROOT_DIR / 'relatorios_gerados')),
+    retencao_horas=float(os.environ.get('RELATORIOS_RETENCAO_HORAS', '24')),
+    intervalo=float(os.environ.get('RELATORIOS_INTERVALO', '30')),
+)
+
+def parametros_relatorio(
+    dias: int = Query(30, ge=1, le=3650),
+    id_area: Optional[int] = None,
+    id_cargo: Optional[int] = None,
+    desde: Optional[datetime] = None,
+    ate: Optional[datetime] = None,
+) -> dict:
+    # dias vale para certificados_vencer; desde/ate (data de conclusão) para horas_treinadas
+    return {"dias": dias, "id_area": id_area, "id_cargo": id_cargo, "desde": desde, "ate": ate}
+
+@api_router.get("/relatorios/tarefas")
+async def get_tarefas_relatorio(admin: dict = Depends(exigir_permissao("admin"))):
+    return await tarefas_relatorio.recentes(admin["id_colaborador"])
+
+@api_router.get("/relatorios/tarefas/{id_tarefa}")
+async def get_tarefa_relatorio(id_tarefa: str, admin: dict = Depends(exigir_permissao("admin"))):
+    tarefa = await tarefas_relatorio.consultar(id_tarefa, admin["id_colaborador"])
+    if not tarefa:
+        raise HTTPException(status_code=404, detail="Tarefa não encontrada")
+    return tarefa
+
+@api_router.get("/relatorios/tarefas/{id_tarefa}/arquivo")
+async def baixar_relatorio(id_tarefa: str, admin: dict = Depends(exigir_permissao("admin"))):
+    tarefa = await tarefas_relatorio.consultar(id_tarefa, admin["id_colaborador"], com_arquivo=True)
+    if not tarefa:
+        raise HTTPException(status_code=404, detail="Tarefa não encontrada")
+    if tarefa["status"] != "concluida":
+        raise HTTPException(status_code=409, detail=f"Relatório ainda não disponível (status: {tarefa['status']})")
+    if not os.path.exists(tarefa["arquivo"]):
+        raise HTTPException(status_code=410, detail="Arquivo do relatório expirou")
+    formato = FormatoRelatorio(tarefa["formato"])
+    return FileResponse(tarefa["arquivo"], media_type=MEDIA_TYPES[formato],
+                        filename=f'{tarefa["relatorio"]}.{formato.value}')
+
+@api_router.get("/relatorios/{tipo}")
+async def exportar_relatorio(
+    tipo: TipoRelatorio,
+    formato: FormatoRelatorio = FormatoRelatorio.CSV,
+    parametros: dict = Depends(parametros_relatorio),
+    admin: dict = Depends(exigir_permissao("admin"))
+):
+    cabecalhos = {"Content-Disposition": f'attachment; filename="{tipo.value}.{formato.value}"'}
+    if formato == FormatoRelatorio.CSV:
+        return StreamingResponse(relatorios.csv(tipo, parametros), media_type=MEDIA_TYPES[formato], headers=cabecalhos)
+    try:
+        caminho = await relatorios.xlsx_temporario(tipo, parametros)
+    except RuntimeError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return FileResponse(caminho, media_type=MEDIA_TYPES[formato], headers=cabecalhos,
+                        background=BackgroundTask(os.remove, caminho))
+
+@api_router.post("/relatorios/{tipo}/tarefas", status_code=http_status.HTTP_202_ACCEPTED)
+async def solicitar_relatorio(
+    tipo: TipoRelatorio,
+    formato: FormatoRelatorio = FormatoRelatorio.CSV,
+    parametros: dict = Depends(parametros_relatorio),
+    admin: dict = Depends(exigir_permissao("admin"))
+):
+    try:
+        return await tarefas_relatorio.solicitar(tipo, formato, parametros, admin["id_colaborador"])
+    except RuntimeError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+@api_router.get("/cache/referencia")
+async def get_cache_referencia_stats(token: dict = Depends(verify_token)):
+    return {**cache_referencia.stats(), "grafos_trilhas": grafos_trilhas.stats(), "busca_cursos": busca_cursos.stats()}
+
 # Incluímos nosso router na aplicação
 app.include_router(api_router)
 
@@ -907,7 +1884,22 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Server-Timing"],
 )
+if MONGO_PERFIL:
+    app.add_middleware(PerfilConsultasMiddleware)
+if METRICAS:
+    # Por último: é o middleware mais externo e mede também o tempo dos demais
+    app.add_middleware(MetricasMiddleware, registro=registro_metricas)
+
+# Fora do /api: é o caminho padrão que o Prometheus raspa
+@app.get("/metrics", include_in_schema=False)
+async def metricas():
+    if not METRICAS:
+        raise HTTPException(status_code=404, detail="Métricas desativadas")
+    # Ler os arquivos dos outros workers é E/S de disco: fora do event loop
+    texto = await asyncio.to_thread(registro_metricas.texto)
+    return Response(content=texto, media_type="text/plain; version=0.0.4; charset=utf-8")
 
 logging.basicConfig(
     level=logging.INFO,
@@ -917,23 +1909,72 @@ logger = logging.getLogger(__name__)
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await monitor_event_loop.stop()
+    await registro_metricas.stop()
+    await varredura_certificados.stop()
+    await arquivamento_auditoria.stop()
+    await auto_inscricao.stop()
+    await tarefas_relatorio.stop()
+    await conformidade_fila.stop()
+    # Grava a auditoria pendente antes de fechar a conexão
+    await auditoria.stop()
     client.close()
+    password_pool.shutdown()
+    importador_colaboradores.shutdown()
+
+@app.on_event("startup")
+async def verificar_datas_nativas():
+    global datas_nativas
+    try:
+        datas_nativas = await migracao_concluida(db)
+    except Exception:
+        logger.exception("Falha ao verificar a migração de datas; mantendo leitura dupla")
+    if not datas_nativas:
+        logger.info("Migração de datas pendente: leitura dupla (string/data) ativa")
+
+@app.on_event("startup")
+async def start_password_pool():
+    password_pool.start()
+
+@app.on_event("startup")
+async def start_metricas():
+    if METRICAS:
+        monitor_event_loop.start()
+        registro_metricas.start()
+
+@app.on_event("startup")
+async def start_auditoria():
+    auditoria.start()
+
+@app.on_event("startup")
+async def start_conformidade_fila():
+    conformidade_fila.start()
+
+@app.on_event("startup")
+async def start_auto_inscricao():
+    auto_inscricao.start()
+
+@app.on_event("startup")
+async def start_varredura_certificados():
+    varredura_certificados.start()
+
+@app.on_event("startup")
+async def start_tarefas_relatorio():
+    tarefas_relatorio.start()
+
+@app.on_event("startup")
+async def start_arquivamento_auditoria():
+    arquivamento_auditoria.start()
 
 @app.on_event("startup")
 async def ensure_indexes():
-    # Índice único em (slug, modalidade) para evitar duplicidade de título por modalidade.
-    # partialFilterExpression evita conflitos com documentos antigos sem slug.
+    # Reconciliamos os índices declarados em indexes.INDEX_REGISTRY; índices
+    # ausentes são criados e divergências ficam registradas no log
     try:
-        await db.cursos.create_index(
-            [("slug", 1), ("modalidade", 1)],
-            unique=True,
-            name="uniq_slug_modalidade",
-            background=True,
-            partialFilterExpression={"slug": {"$exists": True}}
-        )
+        app.state.index_report = await indexes.reconcile(db)
     except Exception:
-        # Se o índice já existe ou qualquer outro erro não-crítico, seguimos em frente
-        pass
+        # Sem acesso ao banco na inicialização não impedimos a subida da API
+        logger.exception("Falha ao reconciliar índices")
 
 
 @api_router.post("/curso_trilha")
@@ -0,0 +1,135 @@
+# Grafo de pré-requisitos das trilhas
+# Cada vínculo em `curso_trilha` tem ordem, obrigatorio e, opcionalmente,
+# id_prerequisito (o curso que precisa estar concluído antes). Para cada trilha
+# montamos em memória um DAG com as listas de adjacência nos dois sentidos e a
+# lista de cursos já ordenada por `ordem`. Com ele respondemos, para um colaborador,
+# próximo curso disponível, percentual concluído e cursos bloqueados em O(arestas),
+# a partir de uma única consulta das inscrições concluídas.
+#
+# O vínculo que fecharia um ciclo é recusado na criação (ciclo_com). Os grafos ficam
+# em cache com a versão de "trilhas" e "curso_trilha" em `versoes_cache` na chave:
+# vincular_curso_trilha e delete_trilha já incrementam essas versões, o que invalida
+# o grafo em todos os workers.
+
+from typing import Dict, Iterable, List, Optional, Set
+
+from cache_referencia import VersoesColecoes
+from ttl_cache import TTLCache
+
+DEPENDENCIAS = ["trilhas", "curso_trilha"]
+
+
+class GrafoTrilha:
+    def __init__(self, id_trilha: int, vinculos: Iterable[dict]):
+        self.id_trilha = id_trilha
+        self.ordem: Dict[int, int] = {}
+        self.obrigatorio: Dict[int, bool] = {}
+        self.prerequisitos: Dict[int, List[int]] = {}
+        self.dependentes: Dict[int, List[int]] = {}
+        for vinculo in vinculos:
+            id_curso = vinculo["id_curso"]
+            # Curso vinculado mais de uma vez: vale a menor ordem e os pré-requisitos de todos
+            self.ordem[id_curso] = min(vinculo.get("ordem", 0), self.ordem.get(id_curso, vinculo.get("ordem", 0)))
+            self.obrigatorio[id_curso] = self.obrigatorio.get(id_curso, False) or vinculo.get("obrigatorio", True)
+            self.prerequisitos.setdefault(id_curso, [])
+            if vinculo.get("id_prerequisito"):
+                self._ligar(vinculo["id_prerequisito"], id_curso)
+        self.cursos: List[int] = sorted(self.ordem, key=lambda c: (self.ordem[c], c))
+
+    def _ligar(self, id_prerequisito: int, id_curso: int):
+        if id_prerequisito not in self.prerequisitos[id_curso]:
+            self.prerequisitos[id_curso].append(id_prerequisito)
+            self.dependentes.setdefault(id_prerequisito, []).append(id_curso)
+
+    def externos(self) -> Set[int]:
+        # Pré-requisitos que não fazem parte da trilha (também precisam estar concluídos)
+        return {p for prereqs in self.prerequisitos.values() for p in prereqs if p not in self.ordem}
+
+    def ciclo_com(self, id_curso: int, id_prerequisito: int) -> Optional[List[int]]:
+        # A aresta id_prerequisito -> id_curso fecha um ciclo se id_prerequisito já
+        # depende (direta ou indiretamente) de id_curso. Devolve o caminho do ciclo.
+        if id_curso == id_prerequisito:
+            return [id_curso, id_curso]
+        anterior: Dict[int, int] = {}
+        pilha = [id_curso]
+        visitados = {id_curso}
+        while pilha:
+            atual = pilha.pop()
+            for seguinte in self.dependentes.get(atual, []):
+                if seguinte in visitados:
+                    continue
+                anterior[seguinte] = atual
+                if seguinte == id_prerequisito:
+                    caminho = [seguinte]
+                    while caminho[-1] != id_curso:
+                        caminho.append(anterior[caminho[-1]])
+                    return [id_prerequisito] + caminho[::-1]
+                visitados.add(seguinte)
+                pilha.append(seguinte)
+        return None
+
+    def estrutura(self) -> dict:
+        return {
+            "id_trilha": self.id_trilha,
+            "cursos": [{"id_curso": c, "ordem": self.ordem[c], "obrigatorio": self.obrigatorio[c],
+                        "prerequisitos": self.prerequisitos[c]} for c in self.cursos],
+            "prerequisitos_externos": sorted(self.externos()),
+        }
+
+    def situacao(self, concluidos: Set[int]) -> dict:
+        # Um curso está disponível quando todos os seus pré-requisitos foram concluídos;
+        # cursos em ciclo (dados anteriores à validação) ficam bloqueados
+        disponiveis, bloqueados = [], []
+        for id_curso in self.cursos:
+            if id_curso in concluidos:
+                continue
+            pendentes = [p for p in self.prerequisitos[id_curso] if p not in concluidos]
+            if pendentes:
+                bloqueados.append({"id_curso": id_curso, "pendentes": pendentes})
+            else:
+                disponiveis.append(id_curso)
+        # O percentual considera só os cursos obrigatórios; sem nenhum, todos os cursos
+        base = [c for c in self.cursos if self.obrigatorio[c]] or self.cursos
+        feitos = sum(1 for c in base if c in concluidos)
+        return {
+            "id_trilha": self.id_trilha,
+            "total": len(base),
+            "concluidos": feitos,
+            "percentual": round(100 * feitos / len(base), 1) if base else 0.0,
+            "proximo": disponiveis[0] if disponiveis else None,
+            "disponiveis": disponiveis,
+            "bloqueados": bloqueados,
+        }
+
+
+class GrafosTrilhas:
+    def __init__(self, db, versoes: VersoesColecoes, ttl: float = 300.0, maxsize: int = 512):
+        self.db = db
+        self.versoes = versoes
+        self.cache = TTLCache(ttl=ttl, maxsize=maxsize)
+
+    async def obter(self, id_trilha: int) -> GrafoTrilha:
+        versao = await self.versoes.atuais(DEPENDENCIAS)
+
+        async def montar() -> GrafoTrilha:
+            vinculos = await self.db.curso_trilha.find(
+                {"id_trilha": id_trilha},
+                {"_id": 0, "id_curso": 1, "ordem": 1, "obrigatorio": 1, "id_prerequisito": 1},
+            ).to_list(None)
+            return GrafoTrilha(id_trilha, vinculos)
+
+        return await self.cache.get_or_compute((id_trilha, versao), montar)
+
+    async def situacao(self, id_trilha: int, id_colaborador: int) -> dict:
+        grafo = await self.obter(id_trilha)
+        ids_curso = list(grafo.ordem) + list(grafo.externos())
+        concluidos = set()
+        if ids_curso:
+            async for insc in self.db.inscricoes.find(
+                    {"id_colaborador": id_colaborador, "id_curso": {"$in": ids_curso}, "status": "concluido"},
+                    {"_id": 0, "id_curso": 1}):
+                concluidos.add(insc["id_curso"])
+        return {"id_colaborador": id_colaborador, **grafo.situacao(concluidos)}
+
+    def stats(self) -> dict:
+        return self.cache.stats()
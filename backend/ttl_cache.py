@@ -0,0 +1,99 @@
+# Cache em memória com expiração (TTL) e single-flight
+# Se várias requisições pedem a mesma chave ao mesmo tempo e ela não está no
+# cache, só a primeira executa o cálculo; as demais aguardam o mesmo resultado.
+# Os contadores de hits/misses ficam disponíveis em stats().
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+class _LiderCancelado(Exception):
+    # Entregue a quem aguardava o cálculo quando a requisição que o executava foi
+    # cancelada (cliente desconectou): quem aguardava tenta de novo e um deles assume
+    pass
+
+
+class TTLCache:
+    def __init__(self, ttl: float, maxsize: int = 1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        # chave -> (instante de expiração, valor)
+        self._dados: Dict[Hashable, Tuple[float, Any]] = {}
+        self._em_andamento: Dict[Hashable, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0  # requisições que aguardaram um cálculo já em andamento
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        item = self._dados.get(key)
+        if item is None:
+            return None
+        if item[0] <= time.monotonic():
+            self._dados.pop(key, None)
+            return None
+        return item[1]
+
+    def set(self, key: Hashable, valor: Any, ttl: Optional[float] = None):
+        if key not in self._dados and len(self._dados) >= self.maxsize:
+            self._evict()
+        self._dados[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), valor)
+
+    def _evict(self):
+        # Primeiro descartamos os expirados; se ainda estiver cheio, o mais antigo
+        agora = time.monotonic()
+        for k in [k for k, (expira, _) in self._dados.items() if expira <= agora]:
+            del self._dados[k]
+        if len(self._dados) >= self.maxsize:
+            self._dados.pop(next(iter(self._dados)))
+
+    def invalidate(self, key: Hashable = None):
+        if key is None:
+            self._dados.clear()
+        else:
+            self._dados.pop(key, None)
+
+    async def get_or_compute(self, key: Hashable, factory: Callable[[], Awaitable[Any]], fresh: bool = False) -> Any:
+        while not fresh:
+            item = self._dados.get(key)
+            if item is not None and item[0] > time.monotonic():
+                self.hits += 1
+                return item[1]
+            em_andamento = self._em_andamento.get(key)
+            if em_andamento is None:
+                break
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(em_andamento)
+            except _LiderCancelado:
+                continue
+
+        self.misses += 1
+        futuro = asyncio.get_running_loop().create_future()
+        self._em_andamento[key] = futuro
+        try:
+            valor = await factory()
+        except asyncio.CancelledError:
+            # Não cancelamos o futuro compartilhado: só esta requisição desistiu
+            futuro.set_exception(_LiderCancelado())
+            futuro.exception()
+            raise
+        except Exception as exc:
+            futuro.set_exception(exc)
+            # Marca a exceção como consumida caso ninguém esteja aguardando
+            futuro.exception()
+            raise
+        finally:
+            if self._em_andamento.get(key) is futuro:
+                del self._em_andamento[key]
+        self.set(key, valor)
+        futuro.set_result(valor)
+        return valor
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "entries": len(self._dados),
+        }
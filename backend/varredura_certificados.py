@@ -0,0 +1,214 @@
+# Varredura periódica de vencimento de certificados
+# Encontra certificados "ativo" cuja data_validade já passou e muda o status para
+# "vencido" em lotes com bulk_write. Para os que vencem dentro de
+# alerta_vencimento_dias (da regra obrigatória do curso; 30 dias se não houver
+# regra) grava um registro em `alertas_vencimento`.
+#
+# É idempotente (filtros por status e upsert dos alertas por certificado+tipo) e
+# segura com vários workers: só quem detém o lease em `locks` executa a varredura.
+
+import asyncio
+import logging
+import os
+import socket
+import time
+from datetime import datetime, timezone, timedelta
+from typing import Callable, Dict, List, Optional
+
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+ALERTA_PADRAO_DIAS = 30
+LOCK_ID = "varredura_certificados"
+
+
+class LeaseLock:
+    # Lock com prazo de validade em uma coleção do MongoDB. Se o dono morrer sem
+    # liberar, o lease expira e outro worker pode assumir.
+    def __init__(self, colecao, nome: str, duracao: float):
+        self.colecao = colecao
+        self.nome = nome
+        self.duracao = duracao
+        self.dono = f"{socket.gethostname()}:{os.getpid()}:{id(self)}"
+
+    async def adquirir(self) -> bool:
+        agora = datetime.now(timezone.utc)
+        try:
+            await self.colecao.find_one_and_update(
+                {"_id": self.nome, "$or": [{"expira_em": {"$lt": agora}}, {"dono": self.dono}]},
+                {"$set": {"dono": self.dono, "expira_em": agora + timedelta(seconds=self.duracao)}},
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            # O documento existe e pertence a outro worker com lease válido
+            return False
+        return True
+
+    async def liberar(self):
+        await self.colecao.update_one(
+            {"_id": self.nome, "dono": self.dono},
+            {"$set": {"expira_em": datetime.now(timezone.utc)}},
+        )
+
+
+def _filtro_data(operador: str, limite: datetime) -> dict:
+    # Enquanto houver datas gravadas como string ISO (antes da migração), aceitamos os dois tipos
+    return {"$or": [
+        {"data_validade": {operador: limite}},
+        {"data_validade": {"$type": "string", operador: limite.isoformat()}},
+    ]}
+
+
+def _como_data(valor) -> Optional[datetime]:
+    if isinstance(valor, str):
+        valor = datetime.fromisoformat(valor)
+    if valor is not None and valor.tzinfo is None:
+        valor = valor.replace(tzinfo=timezone.utc)
+    return valor
+
+
+class VarreduraCertificados:
+    def __init__(self, db, intervalo: float = 3600.0,
+                 ao_vencer: Optional[Callable[[int, int], None]] = None):
+        self.db = db
+        self.intervalo = intervalo
+        # Callback opcional (id_colaborador, id_curso) chamado para cada certificado vencido
+        self.ao_vencer = ao_vencer
+        self.lock = LeaseLock(db.locks, LOCK_ID, duracao=max(60.0, intervalo))
+        self._tarefa: Optional[asyncio.Task] = None
+        self.ultima_execucao: Optional[dict] = None
+
+    async def _alertas_por_curso(self) -> Dict[int, int]:
+        # Maior alerta_vencimento_dias entre as regras que exigem cada curso (direto ou via trilha)
+        alertas: Dict[int, int] = {}
+        regras = await self.db.regras_obrigatorias.find(
+            {}, {"_id": 0, "id_curso": 1, "id_trilha": 1, "alerta_vencimento_dias": 1}).to_list(None)
+        por_trilha: Dict[int, int] = {}
+        for regra in regras:
+            dias = regra.get("alerta_vencimento_dias", ALERTA_PADRAO_DIAS)
+            if regra.get("id_curso"):
+                alertas[regra["id_curso"]] = max(alertas.get(regra["id_curso"], 0), dias)
+            elif regra.get("id_trilha"):
+                por_trilha[regra["id_trilha"]] = max(por_trilha.get(regra["id_trilha"], 0), dias)
+        if por_trilha:
+            async for ct in self.db.curso_trilha.find(
+                    {"id_trilha": {"$in": list(por_trilha)}}, {"_id": 0, "id_trilha": 1, "id_curso": 1}):
+                alertas[ct["id_curso"]] = max(alertas.get(ct["id_curso"], 0), por_trilha[ct["id_trilha"]])
+        return alertas
+
+    async def _inscricoes(self, ids_inscricao: List[int]) -> Dict[int, dict]:
+        return {i["id_inscricao"]: i async for i in self.db.inscricoes.find(
+            {"id_inscricao": {"$in": ids_inscricao}},
+            {"_id": 0, "id_inscricao": 1, "id_colaborador": 1, "id_curso": 1})}
+
+    def _alerta(self, cert: dict, insc: dict, tipo: str, agora: datetime) -> UpdateOne:
+        validade = _como_data(cert["data_validade"])
+        return UpdateOne(
+            {"id_certificado": cert["id_certificado"], "tipo": tipo},
+            {"$setOnInsert": {
+                "id_certificado": cert["id_certificado"],
+                "id_inscricao": cert["id_inscricao"],
+                "id_colaborador": insc.get("id_colaborador"),
+                "id_curso": insc.get("id_curso"),
+                "tipo": tipo,
+                "data_validade": validade,
+                "dias_restantes": (validade - agora).days,
+                "criado_em": agora,
+            }},
+            upsert=True,
+        )
+
+    async def _vencer(self, agora: datetime) -> int:
+        total = 0
+        while True:
+            lote = await self.db.certificados.find(
+                {"status": "ativo", **_filtro_data("$lt", agora)},
+                {"_id": 0, "id_certificado": 1, "id_inscricao": 1, "data_validade": 1},
+            ).limit(BATCH_SIZE).to_list(BATCH_SIZE)
+            if not lote:
+                return total
+            await self.db.certificados.bulk_write([
+                UpdateOne({"id_certificado": c["id_certificado"], "status": "ativo"},
+                          {"$set": {"status": "vencido"}})
+                for c in lote
+            ], ordered=False)
+            inscricoes = await self._inscricoes([c["id_inscricao"] for c in lote])
+            await self.db.alertas_vencimento.bulk_write(
+                [self._alerta(c, inscricoes.get(c["id_inscricao"], {}), "vencido", agora) for c in lote],
+                ordered=False,
+            )
+            if self.ao_vencer is not None:
+                for insc in inscricoes.values():
+                    self.ao_vencer(insc["id_colaborador"], insc["id_curso"])
+            total += len(lote)
+
+    async def _alertar(self, agora: datetime) -> int:
+        alertas = await self._alertas_por_curso()
+        horizonte = agora + timedelta(days=max([ALERTA_PADRAO_DIAS, *alertas.values()]))
+        total = 0
+        ultimo = 0
+        while True:
+            # Paginação por id_certificado: os documentos continuam "ativo" após o alerta
+            lote = await self.db.certificados.find(
+                {"status": "ativo", "id_certificado": {"$gt": ultimo},
+                 "$and": [_filtro_data("$gte", agora), _filtro_data("$lte", horizonte)]},
+                {"_id": 0, "id_certificado": 1, "id_inscricao": 1, "data_validade": 1},
+            ).sort("id_certificado", 1).limit(BATCH_SIZE).to_list(BATCH_SIZE)
+            if not lote:
+                return total
+            ultimo = lote[-1]["id_certificado"]
+            inscricoes = await self._inscricoes([c["id_inscricao"] for c in lote])
+            operacoes = []
+            for cert in lote:
+                insc = inscricoes.get(cert["id_inscricao"], {})
+                dias = alertas.get(insc.get("id_curso"), ALERTA_PADRAO_DIAS)
+                if _como_data(cert["data_validade"]) <= agora + timedelta(days=dias):
+                    operacoes.append(self._alerta(cert, insc, "a_vencer", agora))
+            if operacoes:
+                resultado = await self.db.alertas_vencimento.bulk_write(operacoes, ordered=False)
+                total += resultado.upserted_count
+
+    async def executar(self) -> Optional[dict]:
+        # Devolve None quando outro worker detém o lease
+        if not await self.lock.adquirir():
+            return None
+        inicio = time.perf_counter()
+        agora = datetime.now(timezone.utc)
+        try:
+            vencidos = await self._vencer(agora)
+            alertas = await self._alertar(agora)
+        finally:
+            await self.lock.liberar()
+        self.ultima_execucao = {
+            "vencidos": vencidos,
+            "novos_alertas": alertas,
+            "executado_em": agora,
+            "duracao_ms": round((time.perf_counter() - inicio) * 1000, 1),
+        }
+        return self.ultima_execucao
+
+    async def _loop(self):
+        while True:
+            try:
+                resultado = await self.executar()
+                if resultado and (resultado["vencidos"] or resultado["novos_alertas"]):
+                    logger.info("Varredura de certificados: %s", resultado)
+            except Exception:
+                logger.exception("Falha na varredura de certificados")
+            await asyncio.sleep(self.intervalo)
+
+    def start(self):
+        if self._tarefa is None:
+            self._tarefa = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._tarefa is not None:
+            self._tarefa.cancel()
+            try:
+                await self._tarefa
+            except asyncio.CancelledError:
+                pass
+            self._tarefa = None
@@ -37,6 +37,7 @@ export default function Cursos() {
   const [sortOption, setSortOption] = useState('none'); // none | alphaAsc | alphaDesc | longest | shortest
   // Busca
   const [search, setSearch] = useState('');
+  const [resultadosBusca, setResultadosBusca] = useState(null);
   const [formData, setFormData] = useState({
     titulo: '',
     descricao: '',
@@ -99,20 +100,32 @@ export default function Cursos() {
       .trim();
   };
 
-  // Filtra por busca e aplica ordenação
+  // Busca no servidor (sem acento, por prefixo, ordenada por relevância), com debounce
+  useEffect(() => {
+    const q = search.trim();
+    if (!q) {
+      setResultadosBusca(null);
+      return;
+    }
+    let cancelado = false;
+    const timer = setTimeout(async () => {
+      try {
+        const response = await axios.get(`${API}/cursos/busca`, { params: { q, limit: 100 } });
+        if (!cancelado) setResultadosBusca(response.data.resultados);
+      } catch (error) {
+        if (!cancelado) toast.error('Erro ao buscar cursos');
+      }
+    }, 250);
+    return () => {
+      cancelado = true;
+      clearTimeout(timer);
+    };
+  }, [search, cursos]);
+
+  // Aplica a busca e a ordenação (sem ordenação escolhida, vale a relevância)
   const displayedCourses = React.useMemo(() => {
     const q = normalize(search);
-    let arr = q
-      ? cursos.filter((c) => {
-          const title = normalize(c.titulo);
-          const desc = normalize(c.descricao || '');
-          const publico = normalize(c.publico_alvo || '');
-          const instr = normalize(c.instrutores || '');
-          return (
-            title.includes(q) || desc.includes(q) || publico.includes(q) || instr.includes(q)
-          );
-        })
-      : [...cursos];
+    let arr = q ? [...(resultadosBusca || [])] : [...cursos];
 
     switch (sortOption) {
       case 'alphaAsc':
@@ -131,7 +144,7 @@ export default function Cursos() {
         break;
     }
     return arr;
-  }, [cursos, search, sortOption]);
+  }, [cursos, search, resultadosBusca, sortOption]);
 
   // Sugestões por similaridade simples (Levenshtein) quando não houver resultados
   const levenshtein = (a, b) => {
@@ -156,12 +169,12 @@ export default function Cursos() {
 
   const suggestions = React.useMemo(() => {
     const q = normalize(search);
-    if (!q || displayedCourses.length > 0) return [];
+    if (!q || resultadosBusca === null || displayedCourses.length > 0) return [];
     const scored = cursos.map((c) => ({ title: c.titulo, dist: levenshtein(q, c.titulo) }));
     scored.sort((a, b) => a.dist - b.dist);
     const maxDist = Math.max(1, Math.floor(q.length * 0.4));
     return scored.filter(s => s.dist <= maxDist).slice(0, 5).map(s => s.title);
-  }, [cursos, search, displayedCourses.length]);
+  }, [cursos, search, resultadosBusca, displayedCourses.length]);
 
   const handleSubmit = async (e) => {
     e.preventDefault();
@@ -19,17 +19,17 @@ export default function MeusCursos() {
 
   const fetchMeusCursos = async () => {
     try {
-      // Busca apenas as inscrições do usuário logado
-      const inscricoesRes = await axios.get(`${API}/inscricoes?id_colaborador=${user.id_colaborador}`);
-      const inscricoes = inscricoesRes.data;
-      // Para cada inscrição, busca o curso correspondente
-      const cursosPromises = inscricoes.map(insc => axios.get(`${API}/cursos/${insc.id_curso}`));
-      const cursosRes = await Promise.allSettled(cursosPromises);
-      // Monta lista de cursos com progresso e status
-      const cursosCompletos = inscricoes.map((insc, idx) => {
-        const cursoData = cursosRes[idx].status === 'fulfilled' ? cursosRes[idx].value.data : null;
-        return cursoData ? { ...cursoData, status: insc.status, id_inscricao: insc.id_inscricao } : null;
-      }).filter(Boolean);
+      // Uma única chamada traz inscrições com curso, progresso e certificado
+      const painelRes = await axios.get(`${API}/colaboradores/${user.id_colaborador}/painel`);
+      const cursosCompletos = painelRes.data
+        .filter(item => item.curso)
+        .map(item => ({
+          ...item.curso,
+          status: item.status,
+          id_inscricao: item.id_inscricao,
+          percentual: item.progresso ? item.progresso.percentual : 0,
+          certificado: item.certificado
+        }));
       setMeusCursos(cursosCompletos);
     } catch (error) {
       toast.error('Erro ao carregar seus cursos');
@@ -97,10 +97,9 @@ export default function MeusCursos() {
                   <div className="space-y-2">
                     <div className="flex items-center justify-between text-sm">
                       <span className="text-gray-600">Progresso</span>
-                      {/* Progresso não está disponível diretamente, pode ser adicionado se necessário */}
-                      <span className="font-semibold">-</span>
+                      <span className="font-semibold">{Math.round(curso.percentual)}%</span>
                     </div>
-                    <Progress value={0} className="h-2" />
+                    <Progress value={curso.percentual} className="h-2" />
                   </div>
                   <div className="flex items-center gap-4 text-sm text-gray-600">
                     <div className="flex items-center gap-1">
@@ -2,12 +2,39 @@
 import React, { useEffect, useState } from 'react';
 import Layout from '@/components/Layout';
 import { Card, CardContent } from '@/components/ui/card';
+import { Button } from '@/components/ui/button';
 import axios from 'axios';
+import { toast } from 'sonner';
 import { API } from '@/App';
 
+// Relatórios gerados no servidor (agregação no MongoDB, arquivo baixado em streaming)
+const EXPORTACOES = [
+  { tipo: 'conclusao', titulo: 'Conclusão por área e cargo' },
+  { tipo: 'certificados_vencer', titulo: 'Certificados a vencer em 30 dias' },
+  { tipo: 'horas_treinadas', titulo: 'Horas treinadas por colaborador' },
+];
+
 export default function Relatorios() {
   const [relatorio, setRelatorio] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [exportando, setExportando] = useState(null);
+
+  async function exportar(tipo, formato) {
+    setExportando(`${tipo}.${formato}`);
+    try {
+      const res = await axios.get(`${API}/relatorios/${tipo}`, { params: { formato }, responseType: 'blob' });
+      const url = window.URL.createObjectURL(res.data);
+      const link = document.createElement('a');
+      link.href = url;
+      link.download = `${tipo}.${formato}`;
+      link.click();
+      window.URL.revokeObjectURL(url);
+    } catch (error) {
+      toast.error('Erro ao exportar relatório');
+    } finally {
+      setExportando(null);
+    }
+  }
 
   useEffect(() => {
     async function fetchData() {
@@ -52,6 +79,32 @@ export default function Relatorios() {
           <p className="text-gray-600">Análises e estatísticas detalhadas</p>
         </div>
 
+        <Card className="border-0 shadow-lg">
+          <CardContent className="p-8">
+            <h3 className="text-xl font-semibold text-gray-900 mb-4">Exportar</h3>
+            <div className="space-y-3">
+              {EXPORTACOES.map(({ tipo, titulo }) => (
+                <div key={tipo} className="flex items-center justify-between gap-4">
+                  <span className="text-gray-700">{titulo}</span>
+                  <div className="flex gap-2">
+                    {['csv', 'xlsx'].map(formato => (
+                      <Button
+                        key={formato}
+                        variant="outline"
+                        disabled={exportando !== null}
+                        onClick={() => exportar(tipo, formato)}
+                        data-testid={`exportar-${tipo}-${formato}`}
+                      >
+                        {exportando === `${tipo}.${formato}` ? 'Gerando...' : formato.toUpperCase()}
+                      </Button>
+                    ))}
+                  </div>
+                </div>
+              ))}
+            </div>
+          </CardContent>
+        </Card>
+
         <Card className="border-0 shadow-lg">
           <CardContent className="p-8">
             <h3 className="text-xl font-semibold text-gray-900 mb-4">Cursos por Trilha</h3>
@@ -0,0 +1,189 @@
+# Configuração comum dos testes
+# Os módulos do backend são importados pelo nome (como o uvicorn faz a partir de
+# backend/), então colocamos a pasta no sys.path. O server.py cria o cliente do
+# MongoDB ao ser importado: trocamos o AsyncIOMotorClient pelo do mongomock-motor
+# antes do import, e todo o app passa a usar um banco em memória.
+
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND))
+
+ADMIN = {"id_colaborador": 1, "nome": "Admin", "email": "admin@example.com", "cpf": None, "senha_hash": "x",
+         "id_cargo": 1, "id_area": 1, "id_perfil": 1, "ativo": True}
+
+
+def _completar_mongomock():
+    # O mongomock não implementa alguns operadores que as agregações dos relatórios
+    # usam ($lookup com pipeline, $arrayElemAt, $round, $max de lista, $unset).
+    # Implementamos só o necessário, com a mesma semântica do MongoDB.
+    import mongomock.aggregate as agregacao
+
+    lookup_original = agregacao._handle_lookup_stage
+
+    def lookup(colecao, banco, opcoes):
+        opcoes = dict(opcoes)
+        pipeline = opcoes.pop("pipeline", None)
+        docs = lookup_original(colecao, banco, opcoes)
+        if pipeline:
+            for doc in docs:
+                doc[opcoes["as"]] = list(agregacao.process_pipeline(doc[opcoes["as"]], banco, pipeline, None))
+        return docs
+
+    def unset(colecao, banco, opcoes):
+        campos = [opcoes] if isinstance(opcoes, str) else opcoes
+        return [{k: v for k, v in doc.items() if k not in campos} for doc in colecao]
+
+    agregacao._PIPELINE_HANDLERS["$lookup"] = lookup
+    agregacao._PIPELINE_HANDLERS["$unset"] = unset
+
+    parse_original = agregacao._Parser.parse
+
+    def parse(self, expressao):
+        if isinstance(expressao, dict) and len(expressao) == 1:
+            (operador, valores), = expressao.items()
+            if operador == "$arrayElemAt":
+                lista, indice = self.parse(valores[0]), self.parse(valores[1])
+                return lista[indice] if lista and -len(lista) <= indice < len(lista) else None
+            if operador == "$round":
+                numero = self.parse(valores[0])
+                return None if numero is None else round(numero, valores[1] if len(valores) > 1 else 0)
+            if operador == "$max" and isinstance(valores, list):
+                numeros = [n for n in (self.parse(v) for v in valores) if n is not None]
+                return max(numeros) if numeros else None
+        return parse_original(self, expressao)
+
+    agregacao._Parser.parse = parse
+
+
+# Comando do protocolo que cada método da coleção envia ao MongoDB
+COMANDOS = {
+    "find": "find", "find_one": "find", "insert_one": "insert", "insert_many": "insert",
+    "update_one": "update", "update_many": "update", "replace_one": "update",
+    "delete_one": "delete", "delete_many": "delete", "find_one_and_update": "findAndModify",
+    "find_one_and_replace": "findAndModify", "find_one_and_delete": "findAndModify",
+    "aggregate": "aggregate", "count_documents": "aggregate", "estimated_document_count": "count",
+    "distinct": "distinct", "bulk_write": "bulkWrite",
+}
+
+
+def _instrumentar_mongomock():
+    # Com o driver de verdade quem conta as idas ao banco é o MonitorComandos. O
+    # mongomock não tem CommandListener: avisamos registrar_consulta a cada método
+    # público chamado (e não nas chamadas internas, como o find dentro do find_one).
+    import threading
+
+    from mongomock.collection import Collection
+    from repositorios.base import registrar_consulta
+
+    local = threading.local()
+
+    def instrumentar(metodo, comando):
+        def chamar(self, *args, **kwargs):
+            if getattr(local, "dentro", False):
+                return metodo(self, *args, **kwargs)
+            registrar_consulta(self.name, comando)
+            local.dentro = True
+            try:
+                return metodo(self, *args, **kwargs)
+            finally:
+                local.dentro = False
+        return chamar
+
+    for nome, comando in COMANDOS.items():
+        setattr(Collection, nome, instrumentar(getattr(Collection, nome), comando))
+
+
+@pytest.fixture(scope="session")
+def mongomock_completo():
+    _completar_mongomock()
+    _instrumentar_mongomock()
+
+
+@pytest.fixture(scope="session")
+def server(tmp_path_factory, mongomock_completo):
+    os.environ.setdefault("MONGO_URL", "mongodb://testes")
+    os.environ.setdefault("RELATORIOS_DIR", str(tmp_path_factory.mktemp("relatorios")))
+    import motor.motor_asyncio
+    from mongomock_motor import AsyncMongoMockClient
+
+    original = motor.motor_asyncio.AsyncIOMotorClient
+    motor.motor_asyncio.AsyncIOMotorClient = AsyncMongoMockClient
+    try:
+        import server as modulo
+    finally:
+        motor.motor_asyncio.AsyncIOMotorClient = original
+    return modulo
+
+
+@pytest.fixture(scope="session")
+def cliente_sessao(server):
+    from fastapi.testclient import TestClient
+
+    # Um único event loop (o do portal) para o app inteiro, com os eventos de startup
+    with TestClient(server.app) as cliente:
+        yield cliente
+
+
+def _limpar_caches(server):
+    # O banco é recriado a cada teste e os contadores de versão voltam para zero: os
+    # caches em memória do app (principal, referência, grafos...) precisam ir junto
+    from cache_referencia import VersoesColecoes
+    from ttl_cache import TTLCache
+
+    for objeto in list(vars(server).values()):
+        for item in [objeto, *getattr(objeto, "__dict__", {}).values()]:
+            if isinstance(item, TTLCache):
+                item.invalidate()
+            elif isinstance(item, VersoesColecoes):
+                item._versoes, item._lido_em = {}, float("-inf")
+    server.tokens_cache._dados.clear()
+
+
+@pytest.fixture
+def api(server, cliente_sessao):
+    # Banco vazio a cada teste, só com o administrador, e cliente já autenticado
+    async def preparar():
+        # delete_many e não drop: os índices criados no startup (únicos inclusive) continuam valendo
+        for nome in await server.db.list_collection_names():
+            await server.db[nome].delete_many({})
+        await server.db.perfis.insert_many([
+            {"id_perfil": 1, "nome": "Administrador", "permissoes": ["admin"]},
+            {"id_perfil": 2, "nome": "Colaborador", "permissoes": []},
+        ])
+        await server.db.colaboradores.insert_one(dict(ADMIN))
+        await server.db.counters.insert_one({"_id": "colaboradores", "seq": ADMIN["id_colaborador"]})
+
+    cliente_sessao.portal.call(preparar)
+    _limpar_caches(server)
+    server.id_allocator.reset()
+    token = server.create_access_token({"sub": str(ADMIN["id_colaborador"]), "email": ADMIN["email"]})
+    cliente_sessao.headers["Authorization"] = f"Bearer {token}"
+    return cliente_sessao
+
+
+@pytest.fixture
+def novo_colaborador(api, server):
+    # Cadastra um colaborador comum (perfil sem permissões) e devolve o id e os headers dele
+    def criar(nome="Joana", email="joana@example.com", **campos):
+        dados = {"nome": nome, "email": email, "senha": "senha123", "id_cargo": 1, "id_area": 1,
+                 "id_perfil": 2, **campos}
+        resposta = api.post("/api/auth/register", json=dados)
+        assert resposta.status_code == 200, resposta.text
+        id_colaborador = resposta.json()["id_colaborador"]
+        token = server.create_access_token({"sub": str(id_colaborador), "email": email})
+        return id_colaborador, {"Authorization": f"Bearer {token}"}
+    return criar
+
+
+@pytest.fixture
+def db(mongomock_completo):
+    # Banco em memória avulso, para testar componentes sem o app
+    from mongomock_motor import AsyncMongoMockClient
+
+    return AsyncMongoMockClient()["testes"]
+
@@ -0,0 +1,121 @@
+import asyncio
+import itertools
+
+from bson.errors import InvalidDocument
+from pymongo.errors import AutoReconnect, BulkWriteError
+
+from auditoria import COLECAO_REJEITADOS, MAX_TENTATIVAS, AuditoriaWriter, ParticoesAuditoria
+
+
+class ColecaoRecusando:
+    # Recusa (como a validação do MongoDB faria) os registros da tabela "invalida"
+    def __init__(self, colecao, particoes):
+        self.colecao = colecao
+        self.particoes = particoes
+
+    async def insert_many(self, docs, ordered=False):
+        if self.particoes.fora_do_ar:
+            raise AutoReconnect("sem conexão")
+        if self.particoes.grande_demais and any(d["nome_tabela"] == "invalida" for d in docs):
+            raise InvalidDocument("documento grande demais")
+        erros = [{"index": i, "code": 121, "errmsg": "Document failed validation"}
+                 for i, d in enumerate(docs) if d["nome_tabela"] == "invalida"]
+        aceitos = [d for d in docs if d["nome_tabela"] != "invalida"]
+        if aceitos:
+            await self.colecao.insert_many(aceitos)
+        if erros:
+            raise BulkWriteError({"writeErrors": erros, "nInserted": len(aceitos)})
+
+    async def insert_one(self, doc):
+        if doc["nome_tabela"] == "invalida":
+            raise InvalidDocument("documento grande demais")
+        return await self.colecao.insert_one(doc)
+
+
+class ParticoesTeste(ParticoesAuditoria):
+    fora_do_ar = False
+    grande_demais = False
+
+    async def para_escrita(self, nome):
+        return ColecaoRecusando(await super().para_escrita(nome), self)
+
+
+def _escritor(db):
+    contador = itertools.count(1)
+
+    async def alocar(quantidade):
+        return [next(contador) for _ in range(quantidade)]
+
+    return AuditoriaWriter(ParticoesTeste(db), alocar, lote=10)
+
+
+async def _descarregar(escritor):
+    try:
+        await escritor.descarregar()
+        return None
+    except Exception as exc:
+        return exc
+
+
+async def _registros(db):
+    nomes = [n for n in await db.list_collection_names() if n.startswith("auditoria_2")]
+    registros = []
+    for nome in nomes:
+        registros += await db[nome].find({}, {"_id": 0}).to_list(None)
+    return registros
+
+
+def test_registro_invalido_nao_trava_a_fila(db):
+    escritor = _escritor(db)
+
+    async def cenario():
+        escritor.registrar(1, "create", "cursos", 1)
+        escritor.registrar(1, "create", "invalida", 2)
+        escritor.registrar(1, "create", "cursos", 3)
+        erros = [await _descarregar(escritor)]
+        # Um registro novo chega depois da primeira falha
+        escritor.registrar(1, "create", "cursos", 4)
+        for _ in range(MAX_TENTATIVAS - 1):
+            erros.append(await _descarregar(escritor))
+        return erros, await _registros(db), await db[COLECAO_REJEITADOS].find({}, {"_id": 0}).to_list(None)
+
+    erros, gravados, rejeitados = asyncio.run(cenario())
+    assert isinstance(erros[0], BulkWriteError)
+    assert erros[-1] is None
+    assert sorted(r["id_registro_afetado"] for r in gravados) == [1, 3, 4]
+    assert [(r["nome_tabela"], r["id_registro_afetado"]) for r in rejeitados] == [("invalida", 2)]
+    assert escritor.pendentes == 0
+    assert (escritor.gravados, escritor.rejeitados) == (3, 1)
+
+
+def test_documento_recusado_pelo_driver_e_isolado(db):
+    escritor = _escritor(db)
+    escritor.particoes.grande_demais = True
+
+    async def cenario():
+        escritor.registrar(1, "create", "cursos", 1)
+        escritor.registrar(1, "create", "invalida", 2)
+        for _ in range(MAX_TENTATIVAS):
+            await _descarregar(escritor)
+        return await _registros(db)
+
+    gravados = asyncio.run(cenario())
+    assert [r["id_registro_afetado"] for r in gravados] == [1]
+    assert (escritor.pendentes, escritor.rejeitados) == (0, 1)
+
+
+def test_falha_de_conexao_nao_conta_como_recusa(db):
+    escritor = _escritor(db)
+    escritor.particoes.fora_do_ar = True
+
+    async def cenario():
+        escritor.registrar(1, "create", "cursos", 1)
+        for _ in range(MAX_TENTATIVAS + 2):
+            assert isinstance(await _descarregar(escritor), AutoReconnect)
+        escritor.particoes.fora_do_ar = False
+        await escritor.descarregar()
+        return await _registros(db)
+
+    gravados = asyncio.run(cenario())
+    assert [r["id_registro_afetado"] for r in gravados] == [1]
+    assert (escritor.rejeitados, escritor.pendentes) == (0, 0)
@@ -0,0 +1,77 @@
+import time
+
+import jwt
+
+
+def test_inativacao_vale_na_proxima_requisicao(api, novo_colaborador):
+    id_colaborador, headers = novo_colaborador()
+    # Primeira requisição deixa token e principal em cache
+    assert api.get("/api/auth/me", headers=headers).status_code == 200
+    assert api.put(f"/api/colaboradores/{id_colaborador}", json={"ativo": False}).status_code == 200
+
+    resposta = api.get("/api/auth/me", headers=headers)
+    assert resposta.status_code == 401
+    assert resposta.json()["detail"] == "Colaborador inativo"
+
+
+def test_troca_de_perfil_e_reavaliada(api, novo_colaborador):
+    id_colaborador, headers = novo_colaborador()
+    assert api.get("/api/relatorios/tarefas", headers=headers).status_code == 403
+
+    assert api.put(f"/api/colaboradores/{id_colaborador}", json={"id_perfil": 1}).status_code == 200
+    assert api.get("/api/auth/me", headers=headers).json()["permissoes"] == ["admin"]
+    assert api.get("/api/relatorios/tarefas", headers=headers).status_code == 200
+
+    assert api.put(f"/api/colaboradores/{id_colaborador}", json={"id_perfil": 2}).status_code == 200
+    assert api.get("/api/relatorios/tarefas", headers=headers).status_code == 403
+
+
+def test_alteracao_de_cadastro_invalida_o_principal(api, novo_colaborador):
+    id_colaborador, headers = novo_colaborador()
+    assert api.get("/api/auth/me", headers=headers).json()["email"] == "joana@example.com"
+    assert api.put(f"/api/colaboradores/{id_colaborador}", json={"email": "joana.silva@example.com"}).status_code == 200
+    assert api.get("/api/auth/me", headers=headers).json()["email"] == "joana.silva@example.com"
+
+
+def test_colaborador_removido_perde_acesso(api, server, novo_colaborador):
+    id_colaborador, headers = novo_colaborador()
+    assert api.get("/api/auth/me", headers=headers).status_code == 200
+
+    async def remover():
+        await server.db.colaboradores.delete_one({"id_colaborador": id_colaborador})
+        await server.principais.invalidar()
+
+    api.portal.call(remover)
+    assert api.get("/api/auth/me", headers=headers).status_code == 401
+
+
+def test_token_adulterado_e_recusado(api, novo_colaborador):
+    _, headers = novo_colaborador()
+    token = headers["Authorization"].split()[1]
+    assert api.get("/api/auth/me", headers=headers).status_code == 200
+
+    cabecalho, corpo, assinatura = token.split(".")
+    trocada = assinatura[:-2] + ("AA" if not assinatura.endswith("AA") else "BB")
+    forjado = jwt.encode({"sub": "1", "email": "admin@example.com", "exp": int(time.time()) + 3600},
+                         "outro-segredo", algorithm="HS256")
+    admin_corpo = forjado.split(".")[1]
+    for adulterado in (f"{cabecalho}.{corpo}.{trocada}", forjado, f"{cabecalho}.{admin_corpo}.{assinatura}"):
+        resposta = api.get("/api/auth/me", headers={"Authorization": f"Bearer {adulterado}"})
+        assert resposta.status_code == 401
+        assert resposta.json()["detail"] == "Token inválido"
+
+
+def test_token_expirado_sai_do_cache(api, server, novo_colaborador):
+    id_colaborador, _ = novo_colaborador()
+    token = jwt.encode({"sub": str(id_colaborador), "exp": int(time.time()) + 1},
+                       server.JWT_SECRET, algorithm=server.JWT_ALGORITHM)
+    headers = {"Authorization": f"Bearer {token}"}
+    assert api.get("/api/auth/me", headers=headers).status_code == 200
+    hits = server.tokens_cache.hits
+    assert api.get("/api/auth/me", headers=headers).status_code == 200
+    assert server.tokens_cache.hits == hits + 1
+
+    time.sleep(max(0.0, int(time.time()) + 2 - time.time()))
+    resposta = api.get("/api/auth/me", headers=headers)
+    assert resposta.status_code == 401
+    assert resposta.json()["detail"] == "Token expirado"
@@ -0,0 +1,73 @@
+from busca_cursos import IndiceCursos, termos
+
+CURSOS = [
+    {"id_curso": 1, "titulo": "Segurança em Máquinas NR-12", "tipo_treinamento": "nr12",
+     "conteudo_programatico": "proteções, dispositivos de parada"},
+    {"id_curso": 2, "titulo": "Manutenção de Tratores", "tipo_treinamento": "mecanica",
+     "descricao": "manutenção preventiva com foco em segurança"},
+    {"id_curso": 3, "titulo": "Aplicação de Agrotóxicos NR-31", "tipo_treinamento": "nr31",
+     "conteudo_programatico": "seguro uso de EPI"},
+    {"id_curso": 4, "titulo": "Primeiros Socorros", "tipo_treinamento": "nr31",
+     "descricao": "atendimento inicial em acidentes"},
+]
+
+
+def _ids(resultado):
+    return [c["id_curso"] for c in resultado[1]]
+
+
+def test_termos_normaliza_acentos_e_pontuacao():
+    assert termos("Manutenção NR-12") == ["manutencao", "nr", "12"]
+    assert termos(None) == []
+
+
+def test_busca_sem_acento_e_por_prefixo():
+    indice = IndiceCursos(CURSOS)
+    assert _ids(indice.buscar("manutencao")) == [2]
+    assert _ids(indice.buscar("MANUTENÇÃO")) == [2]
+    assert sorted(_ids(indice.buscar("segur"))) == [1, 2, 3]
+
+
+def test_todas_as_palavras_precisam_casar():
+    indice = IndiceCursos(CURSOS)
+    assert _ids(indice.buscar("nr 12")) == [1]
+    assert _ids(indice.buscar("seguranca tratores")) == [2]
+    assert indice.buscar("seguranca socorros") == (0, [])
+    assert indice.buscar("inexistente") == (0, [])
+
+
+def test_relevancia_titulo_e_termo_exato():
+    indice = IndiceCursos(CURSOS)
+    # "seguranca" está no título do 1 e só na descrição do 2; o 3 casa por prefixo ("seguro")
+    assert _ids(indice.buscar("seguranca")) == [1, 2]
+    ids = _ids(indice.buscar("segur"))
+    assert ids.index(1) < ids.index(3)
+    resultado = indice.buscar("seguranca")[1]
+    assert resultado[0]["relevancia"] > resultado[1]["relevancia"]
+
+
+def test_filtro_por_tipo_e_paginacao():
+    indice = IndiceCursos(CURSOS)
+    assert _ids(indice.buscar("nr", tipo="nr31")) == [3]
+    total, pagina = indice.buscar("segur", skip=1, limit=1)
+    assert total == 3
+    assert _ids((total, pagina)) == [_ids(indice.buscar("segur"))[1]]
+
+
+def test_stopwords_e_palavras_curtas():
+    indice = IndiceCursos(CURSOS)
+    assert "de" not in indice.postings
+    # Conectivos são ignorados quando há outras palavras na consulta
+    assert _ids(indice.buscar("manutencao de tratores")) == [2]
+    assert indice.buscar("de") == (0, [])
+    # Uma letra só casa por termo exato, não como prefixo
+    assert indice.buscar("m") == (0, [])
+
+
+def test_consultas_repetidas_nao_alteram_o_indice():
+    indice = IndiceCursos(CURSOS)
+    primeira = indice.buscar("segur")
+    for consulta in ["segur", "segur nr", "seguranca", "segur"]:
+        indice.buscar(consulta)
+    assert indice.buscar("segur") == primeira
+    assert set(indice.postings["seguranca"]) == {1, 2}
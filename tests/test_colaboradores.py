@@ -0,0 +1,27 @@
+def test_admin_altera_qualquer_colaborador(api, novo_colaborador):
+    id_colaborador, _ = novo_colaborador()
+    resposta = api.put(f"/api/colaboradores/{id_colaborador}", json={"id_perfil": 1, "id_area": 3})
+    assert resposta.status_code == 200
+    assert (resposta.json()["id_perfil"], resposta.json()["id_area"]) == (1, 3)
+
+
+def test_colaborador_nao_altera_outro(api, novo_colaborador):
+    _, headers = novo_colaborador()
+    resposta = api.put("/api/colaboradores/1", json={"senha": "tomada", "email": "eu@example.com"}, headers=headers)
+    assert resposta.status_code == 403
+    assert api.get("/api/auth/me").json()["email"] == "admin@example.com"
+
+
+def test_colaborador_nao_se_promove(api, novo_colaborador):
+    id_colaborador, headers = novo_colaborador()
+    for campos in ({"id_perfil": 1}, {"ativo": True}, {"id_cargo": 2}, {"id_area": 2}):
+        resposta = api.put(f"/api/colaboradores/{id_colaborador}", json=campos, headers=headers)
+        assert resposta.status_code == 403, campos
+    assert api.get("/api/auth/me", headers=headers).json()["id_perfil"] == 2
+
+
+def test_colaborador_edita_o_proprio_cadastro(api, novo_colaborador):
+    id_colaborador, headers = novo_colaborador()
+    resposta = api.put(f"/api/colaboradores/{id_colaborador}", json={"nome": "Joana Silva"}, headers=headers)
+    assert resposta.status_code == 200
+    assert resposta.json()["nome"] == "Joana Silva"
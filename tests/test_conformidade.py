@@ -0,0 +1,128 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from conformidade import ConformidadeEngine, StatusConformidade, as_datetime, somar_meses
+
+AGORA = datetime(2025, 6, 15, tzinfo=timezone.utc)
+REGRA = {"id_regra": 1, "id_curso": 10, "validade_certificado_meses": 12, "alerta_vencimento_dias": 30}
+
+
+def _regra(id_regra, id_cargo=None, id_area=None, **extra):
+    return {"id_regra": id_regra, "id_cargo": id_cargo, "id_area": id_area, **extra}
+
+
+def test_somar_meses_ajusta_fim_do_mes():
+    assert somar_meses(datetime(2025, 1, 31), 1) == datetime(2025, 2, 28)
+    assert somar_meses(datetime(2024, 1, 31), 1) == datetime(2024, 2, 29)
+    assert somar_meses(datetime(2025, 11, 15), 3) == datetime(2026, 2, 15)
+    assert somar_meses(datetime(2025, 3, 10), 24) == datetime(2027, 3, 10)
+
+
+def test_as_datetime_aceita_string_e_datetime():
+    assert as_datetime(None) is None
+    assert as_datetime("") is None
+    assert as_datetime("2025-06-15T00:00:00") == AGORA
+    assert as_datetime(datetime(2025, 6, 15)) == AGORA
+
+
+def test_regras_aplicaveis_por_cargo_e_area():
+    regras = [_regra(1, 1, 1), _regra(2, 1, None), _regra(3, None, 1), _regra(4), _regra(5, 2, 1), _regra(6, 1, 2)]
+    por_chave = ConformidadeEngine._indexar_regras(regras)
+
+    def ids(cargo, area):
+        return sorted(r["id_regra"] for r in ConformidadeEngine.regras_aplicaveis(por_chave, cargo, area))
+
+    assert ids(1, 1) == [1, 2, 3, 4]
+    assert ids(1, 2) == [2, 4, 6]
+    assert ids(2, 1) == [3, 4, 5]
+    assert ids(3, 3) == [4]
+    # Colaborador sem cargo/área só recebe as regras genéricas
+    assert ids(None, None) == [4]
+    assert ids(None, 1) == [3, 4]
+
+
+def test_avaliar_curso():
+    avaliar = ConformidadeEngine._avaliar_curso
+    assert avaliar([], REGRA, AGORA) == (StatusConformidade.AUSENTE, None)
+
+    emissao = datetime(2025, 1, 10, tzinfo=timezone.utc)
+    assert avaliar([(emissao, None)], REGRA, AGORA) == (StatusConformidade.OK, datetime(2026, 1, 10, tzinfo=timezone.utc))
+
+    # Validade calculada a partir da emissão cai dentro da janela de alerta
+    emissao = datetime(2024, 7, 1, tzinfo=timezone.utc)
+    assert avaliar([(emissao, None)], REGRA, AGORA) == (StatusConformidade.A_VENCER, datetime(2025, 7, 1, tzinfo=timezone.utc))
+
+    vencida = AGORA - timedelta(days=1)
+    assert avaliar([(None, vencida)], REGRA, AGORA) == (StatusConformidade.VENCIDO, vencida)
+
+    # Vale a evidência com a maior validade
+    renovada = AGORA + timedelta(days=200)
+    assert avaliar([(None, vencida), (None, renovada)], REGRA, AGORA) == (StatusConformidade.OK, renovada)
+
+    # Conclusão sem data não permite calcular vencimento
+    assert avaliar([(None, None)], REGRA, AGORA) == (StatusConformidade.OK, None)
+
+
+def test_trilha_fica_com_o_pior_status():
+    engine = ConformidadeEngine(None)
+    regra = {"id_regra": 2, "id_trilha": 7, "validade_certificado_meses": 12}
+    trilha_cursos = {7: [10, 11, 12]}
+    evidencias = {
+        (1, 10): [(None, AGORA + timedelta(days=300))],
+        (1, 11): [(None, AGORA + timedelta(days=10))],
+        (1, 12): [(None, AGORA + timedelta(days=100))],
+    }
+    [obrigacao] = engine.avaliar_obrigacoes(1, [regra], trilha_cursos, evidencias, AGORA)
+    assert obrigacao["status"] == "a_vencer"
+    assert obrigacao["data_validade"] == AGORA + timedelta(days=10)
+    assert (obrigacao["id_curso"], obrigacao["id_trilha"]) == (None, 7)
+
+    del evidencias[(1, 12)]
+    [obrigacao] = engine.avaliar_obrigacoes(1, [regra], trilha_cursos, evidencias, AGORA)
+    assert obrigacao["status"] == "ausente"
+
+
+def test_montar_documento():
+    obrigacoes = [
+        {"id_regra": 3, "status": "a_vencer"},
+        {"id_regra": 1, "status": "vencido"},
+        {"id_regra": 2, "status": "ok"},
+    ]
+    doc = ConformidadeEngine.montar_documento({"id_colaborador": 5, "nome": "Ana"}, obrigacoes, AGORA)
+    assert doc["status"] == "vencido"
+    assert [o["id_regra"] for o in doc["obrigacoes"]] == [1, 2, 3]
+    assert ConformidadeEngine.montar_documento({"id_colaborador": 5}, [], AGORA)["status"] == "ok"
+
+
+def test_recalcular_tudo(db):
+    engine = ConformidadeEngine(db)
+    hoje = datetime.now(timezone.utc)
+
+    async def cenario():
+        await db.regras_obrigatorias.insert_many([
+            _regra(1, 1, None, id_curso=10, validade_certificado_meses=12, alerta_vencimento_dias=30),
+            _regra(2, None, None, id_curso=11, validade_certificado_meses=12),
+        ])
+        await db.colaboradores.insert_many([
+            {"id_colaborador": 1, "nome": "Ana", "id_cargo": 1, "id_area": 1},
+            {"id_colaborador": 2, "nome": "Bia", "id_cargo": 2, "id_area": 1},
+            {"id_colaborador": 3, "nome": "Caio", "id_cargo": 1, "id_area": 1, "ativo": False},
+        ])
+        await db.inscricoes.insert_many([
+            {"id_inscricao": 1, "id_colaborador": 1, "id_curso": 10, "status": "concluido", "data_conclusao": hoje},
+            {"id_inscricao": 2, "id_colaborador": 1, "id_curso": 11, "status": "concluido", "data_conclusao": hoje},
+            {"id_inscricao": 3, "id_colaborador": 2, "id_curso": 11, "status": "cancelado"},
+        ])
+        await db.certificados.insert_one({"id_inscricao": 2, "data_emissao": hoje,
+                                          "data_validade": hoje - timedelta(days=1), "status": "valido"})
+        resultado = await engine.recalcular_tudo()
+        docs = {d["id_colaborador"]: d async for d in db.conformidade.find({}, {"_id": 0})}
+        return resultado, docs
+
+    resultado, docs = asyncio.run(cenario())
+    assert resultado["colaboradores"] == 2
+    assert sorted(docs) == [1, 2]
+    assert [(o["id_regra"], o["status"]) for o in docs[1]["obrigacoes"]] == [(1, "ok"), (2, "vencido")]
+    assert docs[1]["status"] == "vencido"
+    # Inscrição cancelada não conta como evidência
+    assert [(o["id_regra"], o["status"]) for o in docs[2]["obrigacoes"]] == [(2, "ausente")]
@@ -0,0 +1,105 @@
+import asyncio
+
+import pytest
+
+from id_allocator import IdAllocator
+
+
+class ContadorChamadas:
+    # Envolve db.counters contando os round trips de arrendamento
+    def __init__(self, colecao):
+        self.colecao = colecao
+        self.chamadas = 0
+
+    async def find_one_and_update(self, *args, **kwargs):
+        self.chamadas += 1
+        return await self.colecao.find_one_and_update(*args, **kwargs)
+
+
+def test_block_size_invalido(db):
+    with pytest.raises(ValueError):
+        IdAllocator(db.counters, block_size=0)
+
+
+def test_um_round_trip_por_bloco(db):
+    counters = ContadorChamadas(db.counters)
+    alocador = IdAllocator(counters, block_size=3)
+
+    async def cenario():
+        return [await alocador.next_id("cursos") for _ in range(7)], await db.counters.find_one({"_id": "cursos"})
+
+    ids, contador = asyncio.run(cenario())
+    assert ids == [1, 2, 3, 4, 5, 6, 7]
+    assert counters.chamadas == 3
+    # O contador no banco aponta para o fim da última faixa arrendada
+    assert contador["seq"] == 9
+
+
+def test_continua_do_contador_existente(db):
+    alocador = IdAllocator(db.counters, block_size=10)
+
+    async def cenario():
+        await db.counters.insert_one({"_id": "cursos", "seq": 41})
+        return await alocador.next_id("cursos")
+
+    assert asyncio.run(cenario()) == 42
+
+
+def test_next_ids_atravessa_faixas(db):
+    counters = ContadorChamadas(db.counters)
+    alocador = IdAllocator(counters, block_size=4)
+
+    async def cenario():
+        primeiro = await alocador.next_id("inscricoes")
+        lote = await alocador.next_ids("inscricoes", 10)
+        chamadas = counters.chamadas
+        depois = await alocador.next_id("inscricoes")
+        return primeiro, lote, chamadas, depois
+
+    primeiro, lote, chamadas, depois = asyncio.run(cenario())
+    assert primeiro == 1
+    # 3 IDs sobram da primeira faixa e o resto vem de uma faixa nova, de uma vez
+    assert lote == list(range(2, 12))
+    assert chamadas == 2
+    # A faixa do lote foi do tamanho exato do que faltava, então o próximo arrenda outra
+    assert depois == 12
+    assert counters.chamadas == 3
+    assert asyncio.run(alocador.next_ids("inscricoes", 0)) == []
+
+
+def test_ids_unicos_com_concorrencia(db):
+    alocador = IdAllocator(db.counters, block_size=5)
+
+    async def cenario():
+        simples = [alocador.next_id("progressos") for _ in range(40)]
+        lotes = [alocador.next_ids("progressos", 3) for _ in range(10)]
+        resultados = await asyncio.gather(*simples, *lotes)
+        return [r for r in resultados if isinstance(r, int)] + [i for r in resultados if isinstance(r, list) for i in r]
+
+    ids = asyncio.run(cenario())
+    assert len(ids) == 70
+    assert sorted(ids) == list(range(1, 71))
+
+
+def test_alocadores_separados_nao_repetem(db):
+    # Dois processos compartilhando o mesmo banco recebem faixas disjuntas
+    a = IdAllocator(db.counters, block_size=5)
+    b = IdAllocator(db.counters, block_size=5)
+
+    async def cenario():
+        return await asyncio.gather(*(x.next_id("cursos") for x in [a, b] * 8))
+
+    ids = asyncio.run(cenario())
+    assert len(set(ids)) == len(ids)
+
+
+def test_reset_descarta_faixa(db):
+    alocador = IdAllocator(db.counters, block_size=5)
+
+    async def cenario():
+        antes = await alocador.next_id("cursos")
+        alocador.reset()
+        return antes, await alocador.next_id("cursos")
+
+    # Os IDs restantes da faixa viram gap
+    assert asyncio.run(cenario()) == (1, 6)
@@ -0,0 +1,60 @@
+CABECALHO = "nome;email;cpf;senha;id_cargo;id_area;id_perfil\n"
+
+
+def _importar(api, linhas, simular=False):
+    arquivo = (CABECALHO + "".join(l + "\n" for l in linhas)).encode("utf-8")
+    resposta = api.post("/api/colaboradores/importar", params={"simular": simular},
+                        files={"arquivo": ("colaboradores.csv", arquivo, "text/csv")})
+    assert resposta.status_code == 200, resposta.text
+    return resposta.json()
+
+
+def _erros(resultado):
+    return {e["linha"]: e["erros"] for e in resultado["erros"]}
+
+
+def test_importa_linhas_validas_e_rejeita_repetidas(api):
+    resultado = _importar(api, [
+        "Ana;ana@example.com;111;senha1;1;1;2",
+        "Bia;bia@example.com;222;senha2;1;1;2",
+        "Ana de novo;ana@example.com;333;senha3;1;1;2",
+        "Caio;caio@example.com;222;senha4;1;1;2",
+        "",
+        "Sem email;;444;senha5;1;1;2",
+        "Admin;admin@example.com;555;senha6;1;1;2",
+    ])
+    assert (resultado["linhas"], resultado["importados"], resultado["rejeitados"]) == (6, 2, 4)
+    erros = _erros(resultado)
+    assert erros[4] == ["email: repetido no arquivo"]
+    assert erros[5] == ["cpf: repetido no arquivo"]
+    assert erros[7][0].startswith("email")
+    assert erros[8] == ["email: já cadastrado"]
+
+    emails = {c["email"] for c in api.get("/api/colaboradores").json()}
+    assert {"ana@example.com", "bia@example.com"} <= emails
+    assert "caio@example.com" not in emails
+    login = api.post("/api/auth/login", json={"email": "bia@example.com", "senha": "senha2"})
+    assert login.status_code == 200
+
+
+def test_referencias_conferidas_quando_cadastradas(api, server):
+    async def cadastrar():
+        await server.db.cargos.insert_many([{"id_cargo": 1, "nome": "Operador"}])
+        await server.db.areas.insert_many([{"id_area": 1, "nome": "Campo"}])
+
+    api.portal.call(cadastrar)
+    resultado = _importar(api, [
+        "Ana;ana@example.com;;senha1;1;1;2",
+        "Bia;bia@example.com;;senha2;9;1;2",
+        "Caio;caio@example.com;;senha3;1;7;5",
+    ], simular=True)
+    assert (resultado["importados"], resultado["rejeitados"]) == (1, 2)
+    erros = _erros(resultado)
+    assert erros[3] == ["id_cargo: 9 não existe"]
+    assert erros[4] == ["id_area: 7 não existe", "id_perfil: 5 não existe"]
+
+
+def test_banco_sem_areas_nao_rejeita_tudo(api):
+    # Sem o seed não existem cargos nem áreas, e o cadastro individual aceita qualquer ID
+    resultado = _importar(api, ["Ana;ana@example.com;;senha1;3;4;2"], simular=True)
+    assert (resultado["importados"], resultado["rejeitados"]) == (1, 0)
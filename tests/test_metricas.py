@@ -0,0 +1,101 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+
+from metricas import RegistroMetricas
+
+
+def _pid_morto() -> int:
+    processo = subprocess.Popen([sys.executable, "-c", "pass"])
+    processo.wait()
+    return processo.pid
+
+
+def _linhas(texto, prefixo):
+    return [linha for linha in texto.splitlines() if linha.startswith(prefixo)]
+
+
+def test_texto_do_histograma_acumula_faixas():
+    registro = RegistroMetricas()
+    latencia = registro.histograma("http_latencia_segundos", "Latência", ("rota",), limites=(0.1, 0.5, 1.0))
+    for valor in (0.05, 0.1, 0.3, 0.7, 3.0):
+        latencia.observar(valor, ("/api/cursos",))
+
+    texto = registro.texto()
+    assert "# TYPE http_latencia_segundos histogram" in texto
+    assert _linhas(texto, "http_latencia_segundos_") == [
+        'http_latencia_segundos_bucket{rota="/api/cursos",le="0.1"} 2.0',
+        'http_latencia_segundos_bucket{rota="/api/cursos",le="0.5"} 3.0',
+        'http_latencia_segundos_bucket{rota="/api/cursos",le="1.0"} 4.0',
+        'http_latencia_segundos_bucket{rota="/api/cursos",le="+Inf"} 5.0',
+        'http_latencia_segundos_sum{rota="/api/cursos"} 4.15',
+        'http_latencia_segundos_count{rota="/api/cursos"} 5.0',
+    ]
+
+
+def test_contador_soma_fragmentos_de_threads_e_escapa_rotulos():
+    registro = RegistroMetricas()
+    erros = registro.contador("http_erros_total", "Erros", ("rota", "status"))
+
+    def contar():
+        for _ in range(1000):
+            erros.inc(('/api/"x"', "500"))
+
+    threads = [threading.Thread(target=contar) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    erros.inc(('/api/"x"', "500"))
+    assert _linhas(registro.texto(), "http_erros_total{") == ['http_erros_total{rota="/api/\\"x\\"",status="500"} 4001.0']
+
+
+def test_juntar_instantaneos_de_workers():
+    vivo, morto = os.getpid(), _pid_morto()
+
+    def instantaneo(pid, requisicoes, em_andamento, atraso, faixas):
+        return {"pid": pid, "metricas": {
+            "requisicoes_total": {"tipo": "counter", "ajuda": "", "rotulos": ["rota"],
+                                  "valores": [[["/a"], requisicoes]]},
+            "em_andamento": {"tipo": "gauge", "ajuda": "", "rotulos": [], "agregacao": "soma",
+                             "valores": [[[], em_andamento]]},
+            "atraso": {"tipo": "gauge", "ajuda": "", "rotulos": [], "agregacao": "max", "valores": [[[], atraso]]},
+            "latencia": {"tipo": "histogram", "ajuda": "", "rotulos": [], "limites": [1.0],
+                         "valores": [[[], faixas]]},
+        }}
+
+    juntas = RegistroMetricas._juntar([
+        instantaneo(vivo, 10, 2, 0.2, [1, 0, 0.5, 1]),
+        instantaneo(vivo, 5, 3, 0.05, [0, 2, 6.0, 2]),
+        instantaneo(morto, 7, 9, 9.0, [1, 1, 2.5, 2]),
+    ])
+    # Contadores e histogramas somam inclusive o worker que morreu; medidores não
+    assert juntas["requisicoes_total"]["valores"] == {("/a",): 22}
+    assert juntas["latencia"]["valores"] == {(): [2, 3, 9.0, 5]}
+    assert juntas["em_andamento"]["valores"] == {(): 5}
+    assert juntas["atraso"]["valores"] == {(): 0.2}
+
+
+def test_texto_junta_arquivos_de_outros_workers(tmp_path):
+    registro = RegistroMetricas(diretorio=str(tmp_path))
+    requisicoes = registro.contador("requisicoes_total", "Requisições")
+    em_andamento = registro.medidor("em_andamento", "Em andamento")
+    requisicoes.inc(valor=3)
+    em_andamento.definir(1)
+
+    for pid, valor in ((os.getppid(), 4), (_pid_morto(), 10)):
+        outro = RegistroMetricas()
+        outro.contador("requisicoes_total", "Requisições").inc(valor=valor)
+        outro.medidor("em_andamento", "Em andamento").definir(valor)
+        (tmp_path / f"metricas_{pid}.json").write_text(json.dumps({**outro.instantaneo(), "pid": pid}))
+    (tmp_path / "metricas_123.json").write_text("{incompleto")
+
+    texto = registro.texto()
+    assert _linhas(texto, "requisicoes_total ") == ["requisicoes_total 17.0"]
+    assert _linhas(texto, "em_andamento ") == ["em_andamento 5.0"]
+
+    registro.gravar()
+    gravado = json.loads((tmp_path / f"metricas_{os.getpid()}.json").read_text())
+    assert gravado["metricas"]["requisicoes_total"]["valores"] == [[[], 3.0]]
@@ -0,0 +1,125 @@
+import asyncio
+import csv
+import io
+import time
+from datetime import datetime, timedelta, timezone
+
+from relatorios import Relatorios, TarefasRelatorio
+
+
+def _semear(api, server):
+    async def semear():
+        db = server.db
+        agora = datetime.now(timezone.utc)
+        await db.areas.insert_one({"id_area": 1, "nome": "Campo"})
+        await db.cargos.insert_many([{"id_cargo": 1, "nome": "Operador"}, {"id_cargo": 2, "nome": "Tratorista"}])
+        await db.cursos.insert_many([{"id_curso": 1, "titulo": "NR-31", "carga_horaria": 8},
+                                     {"id_curso": 2, "titulo": "NR-12", "carga_horaria": 16}])
+        await db.colaboradores.insert_many([
+            {"id_colaborador": 10, "nome": "Ana", "email": "ana@example.com", "id_cargo": 1, "id_area": 1},
+            {"id_colaborador": 11, "nome": "Bia", "email": "bia@example.com", "id_cargo": 2, "id_area": 1},
+            {"id_colaborador": 12, "nome": "Caio", "email": "caio@example.com", "id_cargo": 2, "id_area": 1,
+             "ativo": False},
+        ])
+        await db.inscricoes.insert_many([
+            {"id_inscricao": 1, "id_colaborador": 10, "id_curso": 1, "status": "concluido", "data_conclusao": agora},
+            {"id_inscricao": 2, "id_colaborador": 10, "id_curso": 2, "status": "inscrito"},
+            {"id_inscricao": 3, "id_colaborador": 11, "id_curso": 1, "status": "cancelado"},
+            {"id_inscricao": 4, "id_colaborador": 11, "id_curso": 2, "status": "concluido", "data_conclusao": agora},
+            {"id_inscricao": 5, "id_colaborador": 12, "id_curso": 1, "status": "concluido", "data_conclusao": agora},
+        ])
+        await db.certificados.insert_many([
+            {"id_certificado": 1, "id_inscricao": 1, "codigo_verificacao": "A1", "status": "ativo",
+             "data_validade": agora + timedelta(days=10, hours=1)},
+            {"id_certificado": 2, "id_inscricao": 4, "codigo_verificacao": "B2", "status": "ativo",
+             "data_validade": agora + timedelta(days=400)},
+        ])
+
+    api.portal.call(semear)
+
+
+def _csv(texto):
+    assert texto.startswith("﻿")
+    return list(csv.reader(io.StringIO(texto[1:]), delimiter=";"))
+
+
+def test_csv_conclusao(api, server):
+    _semear(api, server)
+    resposta = api.get("/api/relatorios/conclusao")
+    assert resposta.status_code == 200
+    assert resposta.headers["content-type"].startswith("text/csv")
+    # Inscrição cancelada não conta e colaborador inativo fica de fora
+    assert _csv(resposta.text) == [
+        ["ID área", "Área", "ID cargo", "Cargo", "Colaboradores", "Inscrições", "Concluídas", "Taxa de conclusão (%)"],
+        ["1", "Campo", "1", "Operador", "1", "2", "1", "50.0"],
+        ["1", "Campo", "2", "Tratorista", "1", "1", "1", "100.0"],
+    ]
+    assert len(_csv(api.get("/api/relatorios/conclusao", params={"id_cargo": 2}).text)) == 2
+
+
+def test_csv_horas_treinadas_e_certificados(api, server):
+    _semear(api, server)
+    horas = _csv(api.get("/api/relatorios/horas_treinadas").text)
+    assert [linha[:2] + linha[4:] for linha in horas[1:]] == [["11", "Bia", "1", "16"], ["10", "Ana", "1", "8"],
+                                                              ["12", "Caio", "1", "8"]]
+
+    certificados = _csv(api.get("/api/relatorios/certificados_vencer", params={"dias": 30}).text)
+    assert len(certificados) == 2
+    linha = dict(zip(certificados[0], certificados[1]))
+    assert (linha["Código"], linha["Dias restantes"], linha["Colaborador"], linha["Curso"]) == ("A1", "10", "Ana", "NR-31")
+
+
+def test_tarefa_de_outro_usuario_nao_aparece(api, server, novo_colaborador):
+    _semear(api, server)
+    resposta = api.post("/api/relatorios/conclusao/tarefas")
+    assert resposta.status_code == 202
+    id_tarefa = resposta.json()["id_tarefa"]
+
+    for _ in range(100):
+        tarefa = api.get(f"/api/relatorios/tarefas/{id_tarefa}").json()
+        if tarefa["status"] == "concluida":
+            break
+        time.sleep(0.02)
+    assert tarefa["status"] == "concluida"
+    assert tarefa["linhas"] == 2
+    assert _csv(api.get(f"/api/relatorios/tarefas/{id_tarefa}/arquivo").text)[1][3] == "Operador"
+
+    # Outro administrador não enxerga nem baixa a tarefa
+    _, outro = novo_colaborador(id_perfil=1)
+    assert api.get(f"/api/relatorios/tarefas/{id_tarefa}", headers=outro).status_code == 404
+    assert api.get(f"/api/relatorios/tarefas/{id_tarefa}/arquivo", headers=outro).status_code == 404
+    assert api.get("/api/relatorios/tarefas", headers=outro).json() == []
+    assert [t["id_tarefa"] for t in api.get("/api/relatorios/tarefas").json()] == [id_tarefa]
+
+
+def test_tarefas_orfas_sao_recuperadas(db, tmp_path):
+    tarefas = TarefasRelatorio(Relatorios(db, lambda campo, desde, ate: {}), str(tmp_path), intervalo=1)
+    agora = datetime.now(timezone.utc)
+
+    def tarefa(id_tarefa, status, **campos):
+        return {"id_tarefa": id_tarefa, "relatorio": "conclusao", "formato": "csv", "parametros": {},
+                "id_colaborador": 1, "status": status, "criada_em": agora - timedelta(minutes=1), **campos}
+
+    async def cenario():
+        await db.tarefas_relatorio.insert_many([
+            tarefa("morta", "executando", ativa_em=agora - timedelta(seconds=30)),
+            tarefa("antiga", "executando"),
+            tarefa("viva", "executando", ativa_em=agora),
+            tarefa("pendente", "pendente"),
+        ])
+        resultado = await tarefas.recuperar(todas_pendentes=True)
+        # Segunda verificação não enfileira de novo o que já está na fila
+        await tarefas.recuperar(todas_pendentes=True)
+        fila = tarefas._fila.qsize()
+        executada = await tarefas.executar(await tarefas._fila.get())
+        # Já executada: outra cópia da mesma tarefa não roda de novo
+        repetida = await tarefas.executar(tarefa("pendente", "pendente"))
+        status = {t["id_tarefa"]: t["status"] async for t in db.tarefas_relatorio.find({}, {"_id": 0})}
+        return resultado, fila, executada, repetida, status
+
+    resultado, fila, executada, repetida, status = asyncio.run(cenario())
+    assert resultado == {"interrompidas": 2, "retomadas": 1}
+    assert fila == 1
+    assert executada["status"] == "concluida"
+    assert repetida["status"] == "pendente"
+    assert status == {"morta": "erro", "antiga": "erro", "viva": "executando", "pendente": "concluida"}
@@ -0,0 +1,146 @@
+import asyncio
+from types import SimpleNamespace
+
+from perfil_consultas import MonitorComandos
+
+from repositorios import Carregador, ContadorConsultas, RepositorioCursos, observar_consultas
+
+CURSO = {"titulo": "NR-31", "carga_horaria": 8, "modalidade": "presencial", "tipo_treinamento": "nr31"}
+
+
+def test_carregador_junta_pedidos_da_mesma_volta():
+    lotes = []
+
+    async def buscar_lote(chaves):
+        lotes.append(sorted(chaves))
+        return {c: c * 10 for c in chaves if c != 3}
+
+    async def cenario():
+        carregador = Carregador(buscar_lote)
+        resultados = await asyncio.gather(*(carregador.carregar(c) for c in [1, 2, 2, 3]))
+        # Pedido feito depois que o lote anterior saiu vai em um lote novo
+        depois = await carregador.carregar(4)
+        return resultados, depois, carregador
+
+    resultados, depois, carregador = asyncio.run(cenario())
+    assert resultados == [10, 20, 20, None]
+    assert depois == 40
+    assert lotes == [[1, 2, 3], [4]]
+    assert (carregador.pedidos, carregador.lotes) == (5, 2)
+
+
+def test_carregador_respeita_max_lote():
+    lotes = []
+
+    async def buscar_lote(chaves):
+        lotes.append(len(chaves))
+        return {c: c for c in chaves}
+
+    async def cenario():
+        return await Carregador(buscar_lote, max_lote=2).carregar_varios(range(5))
+
+    assert asyncio.run(cenario()) == [0, 1, 2, 3, 4]
+    assert lotes == [2, 2, 1]
+
+
+def test_carregador_propaga_erro_para_todos():
+    async def buscar_lote(chaves):
+        raise RuntimeError("banco fora")
+
+    async def cenario():
+        carregador = Carregador(buscar_lote)
+        return await asyncio.gather(carregador.carregar(1), carregador.carregar(2), return_exceptions=True)
+
+    assert all(isinstance(r, RuntimeError) for r in asyncio.run(cenario()))
+
+
+def test_obter_concorrente_vira_um_find(db):
+    repo = RepositorioCursos(db, {"_id": 0, "id_curso": 1, "titulo": 1})
+
+    async def cenario():
+        await db.cursos.insert_many([{"id_curso": i, "titulo": f"Curso {i}", "slug": "x"} for i in range(1, 4)])
+        with observar_consultas() as consultas:
+            docs = await asyncio.gather(repo.obter(1), repo.obter(2), repo.obter(2), repo.obter(9))
+            existe = await repo.existe(3)
+        return docs, existe, consultas
+
+    docs, existe, consultas = asyncio.run(cenario())
+    assert docs == [{"id_curso": 1, "titulo": "Curso 1"}, {"id_curso": 2, "titulo": "Curso 2"},
+                    {"id_curso": 2, "titulo": "Curso 2"}, None]
+    # Cada chamador recebe a sua cópia
+    assert docs[1] is not docs[2]
+    assert existe is True
+    assert consultas.total == 2
+    assert consultas.por_operacao == {("cursos", "find"): 2}
+
+
+def test_observador_so_conta_durante_o_bloco(db):
+    repo = RepositorioCursos(db, {"_id": 0})
+    contador = ContadorConsultas()
+
+    async def cenario():
+        with observar_consultas(contador):
+            await repo.obter(1)
+        await repo.obter(1)
+
+    asyncio.run(cenario())
+    assert contador.total == 1
+
+
+def test_monitor_de_comandos_alimenta_os_observadores():
+    # Com o driver de verdade a contagem vem do CommandListener
+    monitor = MonitorComandos()
+
+    def comando(nome, corpo, request_id):
+        return SimpleNamespace(command_name=nome, command=corpo, connection_id=("h", 1), request_id=request_id)
+
+    with observar_consultas() as consultas:
+        monitor.started(comando("find", {"find": "cursos", "filter": {}}, 1))
+        monitor.started(comando("getMore", {"getMore": 7, "collection": "cursos"}, 2))
+        monitor.started(comando("insert", {"insert": "inscricoes", "documents": [{}]}, 3))
+        monitor.started(comando("hello", {"hello": 1}, 4))
+    assert consultas.por_operacao == {("cursos", "find"): 1, ("cursos", "getMore"): 1, ("inscricoes", "insert"): 1}
+
+
+def _criar_curso_e_inscricao(api, titulo):
+    id_curso = api.post("/api/cursos", json={**CURSO, "titulo": titulo}).json()["id_curso"]
+    return id_curso, api.post("/api/inscricoes", json={"id_colaborador": 1, "id_curso": id_curso}).json()
+
+
+# As contagens abaixo vêm do driver (todo comando enviado ao banco, não só os dos
+# repositórios). Antes de medir fazemos a mesma operação uma vez: o principal do
+# token fica em cache e o alocador já tem faixas de IDs (o $inc em counters só
+# acontece a cada ID_BLOCK_SIZE inserções), então medimos o custo de regime.
+
+def test_idas_ao_banco_create_inscricao(api):
+    _criar_curso_e_inscricao(api, "NR-31")
+    id_curso = api.post("/api/cursos", json={**CURSO, "titulo": "NR-12"}).json()["id_curso"]
+    with observar_consultas() as consultas:
+        resposta = api.post("/api/inscricoes", json={"id_colaborador": 1, "id_curso": id_curso})
+    assert resposta.status_code == 200
+    # Existência de colaborador e curso (em paralelo), inscrição e progresso
+    assert consultas.por_operacao == {
+        ("colaboradores", "find"): 1,
+        ("cursos", "find"): 1,
+        ("inscricoes", "insert"): 1,
+        ("progressos", "insert"): 1,
+    }
+
+
+def test_idas_ao_banco_create_inscricao_inexistente(api):
+    api.get("/api/auth/me")
+    with observar_consultas() as consultas:
+        resposta = api.post("/api/inscricoes", json={"id_colaborador": 1, "id_curso": 999})
+    assert resposta.status_code == 404
+    assert consultas.por_operacao == {("colaboradores", "find"): 1, ("cursos", "find"): 1}
+
+
+def test_idas_ao_banco_create_certificado(api):
+    _, anterior = _criar_curso_e_inscricao(api, "NR-31")
+    assert api.post("/api/certificados", json={"id_inscricao": anterior["id_inscricao"]}).status_code == 200
+    _, inscricao = _criar_curso_e_inscricao(api, "NR-12")
+    with observar_consultas() as consultas:
+        resposta = api.post("/api/certificados", json={"id_inscricao": inscricao["id_inscricao"]})
+    assert resposta.status_code == 200
+    assert resposta.json()["id_inscricao"] == inscricao["id_inscricao"]
+    assert consultas.por_operacao == {("inscricoes", "find"): 1, ("certificados", "insert"): 1}
@@ -0,0 +1,62 @@
+from trilhas_grafo import GrafoTrilha
+
+
+def _vinculo(id_curso, ordem, id_prerequisito=None, obrigatorio=True):
+    return {"id_curso": id_curso, "ordem": ordem, "id_prerequisito": id_prerequisito, "obrigatorio": obrigatorio}
+
+
+# 1 -> 2 -> 3 e 1 -> 4 (o curso à esquerda é pré-requisito do da direita)
+CADEIA = [_vinculo(1, 1), _vinculo(2, 2, 1), _vinculo(3, 3, 2), _vinculo(4, 4, 1, obrigatorio=False)]
+
+
+def test_ciclo_com_o_proprio_curso():
+    assert GrafoTrilha(1, CADEIA).ciclo_com(2, 2) == [2, 2]
+
+
+def test_ciclo_indireto_devolve_o_caminho():
+    grafo = GrafoTrilha(1, CADEIA)
+    # Tornar 3 pré-requisito de 1 fecharia 3 -> 1 -> 2 -> 3
+    assert grafo.ciclo_com(1, 3) == [3, 1, 2, 3]
+    assert grafo.ciclo_com(2, 3) == [3, 2, 3]
+
+
+def test_sem_ciclo():
+    grafo = GrafoTrilha(1, CADEIA)
+    assert grafo.ciclo_com(3, 1) is None
+    assert grafo.ciclo_com(4, 3) is None
+    # Curso novo, ainda fora do grafo
+    assert grafo.ciclo_com(9, 3) is None
+
+
+def test_vinculo_repetido_e_prerequisito_externo():
+    grafo = GrafoTrilha(1, CADEIA + [_vinculo(3, 0, 50), _vinculo(2, 5, 1)])
+    assert grafo.cursos == [3, 1, 2, 4]
+    assert grafo.prerequisitos[3] == [2, 50]
+    assert grafo.prerequisitos[2] == [1]
+    assert grafo.externos() == {50}
+
+
+def test_situacao():
+    grafo = GrafoTrilha(1, CADEIA)
+    inicio = grafo.situacao(set())
+    assert inicio["proximo"] == 1
+    assert inicio["disponiveis"] == [1]
+    assert inicio["bloqueados"] == [{"id_curso": 2, "pendentes": [1]}, {"id_curso": 3, "pendentes": [2]},
+                                    {"id_curso": 4, "pendentes": [1]}]
+    assert (inicio["total"], inicio["concluidos"], inicio["percentual"]) == (3, 0, 0.0)
+
+    meio = grafo.situacao({1, 4})
+    assert meio["disponiveis"] == [2]
+    assert meio["bloqueados"] == [{"id_curso": 3, "pendentes": [2]}]
+    # O curso 4 é opcional e não entra no percentual
+    assert (meio["concluidos"], meio["percentual"]) == (1, 33.3)
+
+    fim = grafo.situacao({1, 2, 3})
+    assert fim["proximo"] == 4
+    assert fim["percentual"] == 100.0
+
+
+def test_situacao_sem_obrigatorios_usa_todos():
+    grafo = GrafoTrilha(1, [_vinculo(1, 1, obrigatorio=False), _vinculo(2, 2, obrigatorio=False)])
+    assert grafo.situacao({2})["percentual"] == 50.0
+    assert GrafoTrilha(1, []).situacao(set())["percentual"] == 0.0